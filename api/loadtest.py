@@ -0,0 +1,159 @@
+"""
+Teste de carga da API local do diário.
+
+Simula vários clientes simultâneos, cada um com uma conexão keep-alive,
+executando uma mistura de listagens, buscas, leituras e criações de
+entradas. Uso (com o servidor já em execução):
+
+    python -m api.loadtest --clients 50 --duration 20
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+PASSWORD = "Carga#2024teste"
+
+
+class ApiClient:
+    """Cliente mínimo que reaproveita a mesma conexão HTTP/1.1"""
+
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, payload=None):
+        headers = {}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            # Reabre a conexão caso o servidor a tenha encerrado
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            raise
+        return response.status, data
+
+    def close(self):
+        self.connection.close()
+
+
+def prepare_users(host, port, count, seed_entries):
+    """Cria (ou reutiliza) os usuários de teste e devolve seus tokens"""
+    tokens = []
+    for i in range(count):
+        username = f"carga_{i}"
+        client = ApiClient(host, port)
+        client.request('POST', '/api/register', {'username': username, 'password': PASSWORD})
+        status, data = client.request('POST', '/api/login', {'username': username, 'password': PASSWORD})
+        if status != 200:
+            raise SystemExit(f"Falha ao autenticar {username}: {status} {data[:200]}")
+        client.token = json.loads(data)['token']
+        for n in range(seed_entries):
+            client.request('POST', '/api/entries', {
+                'title': f"Entrada {n}",
+                'content': f"Conteúdo de teste número {n}. " * random.randint(5, 50),
+            })
+        tokens.append(client.token)
+        client.close()
+    return tokens
+
+
+def worker(host, port, token, deadline, results, lock):
+    client = ApiClient(host, port, token)
+    latencies = []
+    statuses = Counter()
+    errors = 0
+    while time.perf_counter() < deadline:
+        roll = random.random()
+        if roll < 0.55:
+            method, path, payload = 'GET', '/api/entries?limit=50', None
+        elif roll < 0.75:
+            method, path, payload = 'GET', f"/api/entries?q=teste+{random.randint(0, 50)}&limit=20", None
+        elif roll < 0.90:
+            method, path, payload = 'POST', '/api/entries', {
+                'title': "Carga", 'content': "Texto gerado pelo teste de carga. " * 10
+            }
+        else:
+            method, path, payload = 'GET', '/api/entries?limit=1', None
+
+        start = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, payload)
+            statuses[status] += 1
+        except (http.client.HTTPException, OSError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    client.close()
+
+    with lock:
+        results['latencies'].extend(latencies)
+        results['statuses'].update(statuses)
+        results['errors'] += errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API do Diário Digital")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--seed-entries', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    print(f"Preparando {args.users} usuários...")
+    tokens = prepare_users(args.host, args.port, args.users, args.seed_entries)
+
+    results = {'latencies': [], 'statuses': Counter(), 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker,
+                         args=(args.host, args.port, tokens[i % len(tokens)], deadline, results, lock))
+        for i in range(args.clients)
+    ]
+
+    print(f"Executando {args.clients} clientes por {args.duration:.0f}s...")
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = results['latencies']
+    total = len(latencies)
+    print(f"Requisições: {total} ({total / elapsed:.1f} req/s), erros de conexão: {results['errors']}")
+    print(f"Status: {dict(results['statuses'])}")
+    if latencies:
+        print(f"Latência média: {statistics.mean(latencies) * 1000:.1f} ms | "
+              f"p50: {percentile(latencies, 0.50) * 1000:.1f} ms | "
+              f"p95: {percentile(latencies, 0.95) * 1000:.1f} ms | "
+              f"p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
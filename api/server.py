@@ -0,0 +1,553 @@
+"""
+Servidor HTTP/JSON local sobre o banco do diário.
+
+Expõe autenticação, CRUD de entradas, busca e exportação sem depender de
+tkinter. Uso (a partir da raiz do projeto):
+
+    python -m api.server --port 8765
+
+Rotas:
+    POST   /api/register                {username, password, confirm_password}
+    POST   /api/login                   {username, password} -> {token}
+    POST   /api/logout
+    GET    /api/entries?q=&tags=&start=&end=&limit=&offset=   (resposta em streaming)
+    GET    /api/entries?q=&fuzzy=1      busca aproximada, ordenada por semelhança
+    POST   /api/entries                 {title, content, date?}
+    GET    /api/entries/<id>
+    PUT    /api/entries/<id>            {title, content, date}
+    DELETE /api/entries/<id>
+    PUT    /api/entries/<id>/favorite   {favorite: bool}
+    GET    /api/tags                    -> [{name, count}]
+    GET    /api/export?format=txt|pdf&scope=all|favorites|range&start=&end=
+
+As rotas autenticadas exigem o cabeçalho "Authorization: Bearer <token>".
+"""
+import argparse
+import json
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import security
+from attachments import AttachmentReader
+from database import DatabaseManager
+from tags import parse_tags
+from export import formatters
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+class ApiError(Exception):
+    """Erro com status HTTP a ser devolvido ao cliente"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ConnectionPool:
+    """Pool de DatabaseManager, cada um com sua própria conexão SQLite"""
+
+    def __init__(self, db_name="diario.db", size=8, timeout=5):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        db = None
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    db = DatabaseManager(self.db_name, check_same_thread=False)
+        if db is None:
+            try:
+                db = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Servidor ocupado, tente novamente")
+
+        try:
+            yield db
+        finally:
+            if db.connection.in_transaction:
+                db.connection.rollback()
+            self._idle.put(db)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SessionStore:
+    """Tokens de sessão em memória com expiração deslizante"""
+
+    TTL = 8 * 3600
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, user):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (user, time.monotonic() + self.TTL)
+        return token
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            user, expires = session
+            if expires < now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (user, now + self.TTL)
+            return user
+
+    def revoke(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+
+class LoginThrottle:
+    """Bloqueio temporário após tentativas de login falhas, como no AuthManager"""
+
+    MAX_LOGIN_ATTEMPTS = 3
+    LOCKOUT_TIME = 300
+
+    def __init__(self):
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def is_locked(self, username):
+        with self._lock:
+            count, last = self._attempts.get(username, (0, 0))
+            if count < self.MAX_LOGIN_ATTEMPTS:
+                return False
+            if time.time() - last > self.LOCKOUT_TIME:
+                del self._attempts[username]
+                return False
+            return True
+
+    def record(self, username, success):
+        with self._lock:
+            if success:
+                self._attempts.pop(username, None)
+            else:
+                count, _ = self._attempts.get(username, (0, 0))
+                self._attempts[username] = (count + 1, time.time())
+
+
+def entry_to_dict(row):
+    entry_id, title, content, created_at, updated_at, favorite = row
+    return {
+        'id': entry_id,
+        'title': title,
+        'content': content,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'favorite': bool(favorite),
+    }
+
+
+def validate_date(value):
+    if value in (None, ''):
+        return None
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Data inválida, use o formato YYYY-MM-DD")
+    return value
+
+
+class DiaryApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    server_version = 'DiarioAPI/1.0'
+    timeout = 30  # conexões ociosas são encerradas após 30s
+
+    ROUTES = [
+        ('POST', r'/api/register', 'register', False),
+        ('POST', r'/api/login', 'login', False),
+        ('POST', r'/api/logout', 'logout', True),
+        ('GET', r'/api/entries', 'list_entries', True),
+        ('POST', r'/api/entries', 'create_entry', True),
+        ('GET', r'/api/entries/(\d+)', 'get_entry', True),
+        ('PUT', r'/api/entries/(\d+)', 'update_entry', True),
+        ('DELETE', r'/api/entries/(\d+)', 'delete_entry', True),
+        ('PUT', r'/api/entries/(\d+)/favorite', 'set_favorite', True),
+        ('GET', r'/api/tags', 'list_tags', True),
+        ('GET', r'/api/export', 'export', True),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(pattern + '$'), name, auth)
+                       for method, pattern, name, auth in ROUTES]
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    # Infraestrutura
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.user = None
+        self.token = None
+        self.response_started = False
+        try:
+            # O corpo é sempre consumido para não corromper a próxima requisição da conexão
+            self.body = self._read_json()
+            handler, args = self._match_route(method, url.path)
+            if handler[1]:
+                self._authenticate()
+            getattr(self, handler[0])(*args)
+        except Exception as e:
+            if self.response_started:
+                # Falha no meio de uma resposta em streaming: só resta fechar a conexão
+                logger.error(f"Erro durante o envio de {method} {url.path}: {e}")
+                self.close_connection = True
+            elif isinstance(e, ApiError):
+                self._send_json(e.status, {'error': e.message})
+            else:
+                logger.error(f"Erro ao processar {method} {url.path}: {e}")
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Erro interno"})
+
+    def _match_route(self, method, path):
+        path_matched = False
+        for route_method, pattern, name, auth in self.COMPILED_ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            path_matched = True
+            if route_method == method:
+                return (name, auth), [int(arg) for arg in match.groups()]
+        if path_matched:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Método não permitido")
+        raise ApiError(HTTPStatus.NOT_FOUND, "Rota não encontrada")
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            # O corpo não será lido, então a conexão não pode ser reaproveitada
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo da requisição muito grande")
+        if not length:
+            return {}
+        raw = self.rfile.read(length)
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "JSON inválido")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON")
+        return body
+
+    def _authenticate(self):
+        header = self.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            self.token = header[7:].strip()
+            self.user = self.server.sessions.get(self.token)
+        if not self.user:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Autenticação necessária")
+
+    def _field(self, name, required=True):
+        value = self.body.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if required and not value:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Campo obrigatório: {name}")
+        return value
+
+    def _int_param(self, name, default=None):
+        value = self.query.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            return max(0, int(value))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Parâmetro inválido: {name}")
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self._send_bytes(status, 'application/json; charset=utf-8', data)
+
+    def _send_bytes(self, status, content_type, data, extra_headers=None):
+        self.response_started = True
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, status, content_type, chunks, extra_headers=None):
+        """Envia a resposta com Transfer-Encoding: chunked, agrupando partes pequenas"""
+        self.response_started = True
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        buffer = []
+        buffered = 0
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            buffer.append(data)
+            buffered += len(data)
+            if buffered >= 64 * 1024:
+                self._write_chunk(b''.join(buffer))
+                buffer, buffered = [], 0
+        if buffer:
+            self._write_chunk(b''.join(buffer))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+
+    # Autenticação
+    def register(self):
+        username = self._field('username')
+        password = self._field('password')
+        confirm = self.body.get('confirm_password', password)
+
+        is_valid, error_msg = security.validate_username(username)
+        if not is_valid:
+            raise ApiError(HTTPStatus.BAD_REQUEST, error_msg)
+        if password != confirm:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "As senhas não coincidem")
+        is_valid, error_msg = security.validate_password_strength(password)
+        if not is_valid:
+            raise ApiError(HTTPStatus.BAD_REQUEST, error_msg)
+
+        password_hash, salt = security.hash_password(password)
+        with self.server.pool.acquire() as db:
+            if not db.create_user(username, password_hash, salt):
+                raise ApiError(HTTPStatus.CONFLICT, "Nome de usuário já existe")
+        logger.info(f"Novo usuário registrado via API: {username}")
+        self._send_json(HTTPStatus.CREATED, {'username': username})
+
+    def login(self):
+        username = self._field('username')
+        password = self._field('password')
+
+        throttle = self.server.throttle
+        if throttle.is_locked(username):
+            raise ApiError(HTTPStatus.TOO_MANY_REQUESTS, "Muitas tentativas de login, tente mais tarde")
+
+        with self.server.pool.acquire() as db:
+            user_data = db.get_user_by_username(username)
+
+        # A verificação da senha é feita fora do pool para não reter a conexão
+        if not user_data or not security.verify_password(password, user_data[2], user_data[3]):
+            throttle.record(username, False)
+            logger.warning(f"Tentativa de login falhada via API: {username}")
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Usuário ou senha incorretos")
+
+        throttle.record(username, True)
+        user_id, stored_username, _, _, theme = user_data
+        user = {'id': user_id, 'username': stored_username, 'theme': theme or 'light'}
+        token = self.server.sessions.create(user)
+        self._send_json(HTTPStatus.OK, {'token': token, 'user': user})
+
+    def logout(self):
+        self.server.sessions.revoke(self.token)
+        self._send_json(HTTPStatus.OK, {'ok': True})
+
+    # Entradas
+    def list_entries(self):
+        search_term = self.query.get('q', '')
+        limit = self._int_param('limit')
+        offset = self._int_param('offset', 0)
+        tags = parse_tags(self.query.get('tags', ''))
+        start = validate_date(self.query.get('start'))
+        end = validate_date(self.query.get('end'))
+
+        with self.server.pool.acquire() as db:
+            if search_term and self.query.get('fuzzy') in ('1', 'true'):
+                rows = db.fuzzy_search(self.user['id'], search_term, tags, start, end,
+                                       limit=offset + (200 if limit is None else limit))[offset:]
+            else:
+                rows = db.iter_entries(self.user['id'], search_term, limit=limit, offset=offset,
+                                       tags=tags, start_date=start, end_date=end)
+            self._send_stream(HTTPStatus.OK, 'application/json; charset=utf-8', self._json_array(rows))
+
+    def list_tags(self):
+        with self.server.pool.acquire() as db:
+            tags = db.get_tags(self.user['id'])
+        self._send_json(HTTPStatus.OK, [{'name': name, 'count': count} for name, count in tags])
+
+    def _json_array(self, rows):
+        yield '['
+        separator = ''
+        for row in rows:
+            yield separator + json.dumps(entry_to_dict(row), ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+    def get_entry(self, entry_id):
+        with self.server.pool.acquire() as db:
+            entry = self._require_entry(db, entry_id)
+        entry_id, title, content, created_at = entry
+        self._send_json(HTTPStatus.OK, {
+            'id': entry_id, 'title': title, 'content': content, 'created_at': created_at
+        })
+
+    def _require_entry(self, db, entry_id):
+        entry = db.get_entry(entry_id, self.user['id'])
+        if not entry:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Entrada não encontrada")
+        return entry
+
+    def create_entry(self):
+        title = self._field('title')
+        content = self._field('content')
+        date = validate_date(self.body.get('date'))
+
+        with self.server.pool.acquire() as db:
+            entry_id = db.create_entry(self.user['id'], title, content, date)
+        if not entry_id:
+            raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Falha ao criar entrada")
+        self._send_json(HTTPStatus.CREATED, {'id': entry_id})
+
+    def update_entry(self, entry_id):
+        title = self._field('title')
+        content = self._field('content')
+
+        with self.server.pool.acquire() as db:
+            current = self._require_entry(db, entry_id)
+            date = validate_date(self.body.get('date')) or current[3][:10]
+            if not db.update_entry(entry_id, self.user['id'], date, title, content):
+                raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Falha ao atualizar entrada")
+        self._send_json(HTTPStatus.OK, {'id': entry_id})
+
+    def delete_entry(self, entry_id):
+        with self.server.pool.acquire() as db:
+            self._require_entry(db, entry_id)
+            if not db.delete_entry(entry_id, self.user['id']):
+                raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Falha ao excluir entrada")
+        self._send_json(HTTPStatus.OK, {'id': entry_id})
+
+    def set_favorite(self, entry_id):
+        favorite = bool(self.body.get('favorite', True))
+        with self.server.pool.acquire() as db:
+            self._require_entry(db, entry_id)
+            if not db.set_entry_favorite(entry_id, self.user['id'], favorite):
+                raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Falha ao atualizar favorito")
+        self._send_json(HTTPStatus.OK, {'id': entry_id, 'favorite': favorite})
+
+    # Exportação
+    def export(self):
+        export_format = self.query.get('format', 'txt')
+        scope = self.query.get('scope', 'all')
+        if export_format not in ('txt', 'pdf'):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Formato inválido (txt ou pdf)")
+
+        user_id = self.user['id']
+        username = self.user['username']
+        filename = f"diario_{username}.{export_format}"
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+
+        with self.server.pool.acquire() as db:
+            if scope == 'all':
+                entries = db.get_entries_by_user_id(user_id)
+            elif scope == 'favorites':
+                entries = db.get_favorite_entries(user_id)
+            elif scope == 'range':
+                start = validate_date(self.query.get('start'))
+                end = validate_date(self.query.get('end'))
+                if not start or not end:
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "Informe start e end")
+                entries = db.get_entries_by_date_range(user_id, start, end)
+            else:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Escopo inválido (all, favorites ou range)")
+
+            if export_format == 'pdf':
+                # Os anexos são lidos do banco durante a montagem do PDF
+                try:
+                    data = formatters.render_pdf(entries, username, AttachmentReader(db, user_id))
+                except ImportError:
+                    raise ApiError(HTTPStatus.NOT_IMPLEMENTED, "Exportação em PDF requer o pacote fpdf")
+
+        if export_format == 'txt':
+            self._send_stream(HTTPStatus.OK, 'text/plain; charset=utf-8',
+                              formatters.iter_txt(entries, username), headers)
+            return
+
+        self._send_bytes(HTTPStatus.OK, 'application/pdf', data, headers)
+
+
+class DiaryApiServer(ThreadingHTTPServer):
+    """Servidor HTTP com uma thread por conexão e estado compartilhado"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, db_name="diario.db", pool_size=8):
+        super().__init__(address, DiaryApiHandler)
+        self.pool = ConnectionPool(db_name, size=pool_size)
+        self.sessions = SessionStore()
+        self.throttle = LoginThrottle()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor da API local do Diário Digital")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default='diario.db')
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    from log_config import setup_logging
+    from settings import Settings
+    setup_logging(Settings().get('logging'))
+
+    server = DiaryApiServer((args.host, args.port), db_name=args.db, pool_size=args.pool_size)
+    logger.info(f"API do diário escutando em http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Servidor interrompido pelo usuário")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Anexos das entradas (imagens e outros arquivos).
+
+O conteúdo fica na tabela blobs, identificado pelo sha256: o mesmo arquivo
+anexado várias vezes é guardado uma única vez. Leitura e escrita usam o
+acesso incremental a BLOBs do SQLite (Connection.blobopen), em blocos de
+CHUNK_SIZE, de modo que arquivos grandes nunca são carregados inteiros na
+memória. As miniaturas das imagens são geradas uma vez por conteúdo e
+guardadas na tabela thumbnails.
+"""
+import hashlib
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+CHUNK_SIZE = 256 * 1024
+THUMBNAIL_SIZE = 128
+# Formatos de imagem aceitos pelo fpdf ao incorporar no PDF
+PDF_IMAGE_TYPES = ('image/jpeg', 'image/png')
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    """(sha256, tamanho) do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def guess_mime_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def is_image(mime_type):
+    return bool(mime_type) and mime_type.startswith('image/')
+
+
+def copy_blob(blob, out, chunk_size=CHUNK_SIZE):
+    """Copia um BLOB aberto com blobopen para um arquivo, em blocos"""
+    blob.seek(0)
+    for chunk in iter(lambda: blob.read(chunk_size), b''):
+        out.write(chunk)
+
+
+def make_thumbnail(blob, size=THUMBNAIL_SIZE):
+    """
+    Miniatura PNG de uma imagem, lida direto do BLOB (que aceita seek/read).
+    Requer Pillow; retorna None se ele não estiver instalado ou a imagem
+    não puder ser lida.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        blob.seek(0)
+        with Image.open(blob) as image:
+            # Em JPEGs, draft decodifica já reduzido, sem expandir a imagem inteira
+            image.draft('RGB', (size, size))
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.save(output, format='PNG')
+            return output.getvalue()
+    except Exception:
+        return None
+
+
+class AttachmentReader:
+    """Acesso de leitura aos anexos de um usuário, usado pelas exportações"""
+
+    def __init__(self, db, user_id):
+        self.db = db
+        self.user_id = user_id
+
+    def list(self, entry_id):
+        """Anexos da entrada: (id, blob_id, nome, tipo, tamanho, sha256)"""
+        return self.db.get_attachments(entry_id, self.user_id)
+
+    @contextmanager
+    def temp_file(self, attachment):
+        """Copia o anexo em blocos para um arquivo temporário, removido ao sair"""
+        _, blob_id, filename, _, _, _ = attachment
+        suffix = os.path.splitext(filename)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                with self.db.open_blob(blob_id) as blob:
+                    copy_blob(blob, out)
+            yield path
+        finally:
+            os.remove(path)
+
+
+def save_to_file(db, blob_id, dest_path):
+    """Grava o conteúdo do BLOB em dest_path, passando por um arquivo temporário"""
+    directory = os.path.dirname(os.path.abspath(dest_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            with db.open_blob(blob_id) as blob:
+                copy_blob(blob, out)
+        shutil.move(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
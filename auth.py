@@ -1,9 +1,7 @@
-import hashlib
-import secrets
 import logging
-import re
 from typing import Dict, Optional, Callable
 from tkinter import messagebox
+import security
 from ui.login_ui import LoginUI
 
 logger = logging.getLogger(__name__)
@@ -12,12 +10,13 @@ class AuthManager:
     """Gerenciador de autenticação com segurança aprimorada"""
     
     # Configurações de segurança
-    MIN_PASSWORD_LENGTH = 8
+    MIN_PASSWORD_LENGTH = security.MIN_PASSWORD_LENGTH
     MAX_LOGIN_ATTEMPTS = 3
     LOCKOUT_TIME = 300  # 5 minutos em segundos
     
-    def __init__(self, db, theme_manager, on_login_success: Callable, root):
+    def __init__(self, db, theme_manager, on_login_success: Callable, root, writer=None):
         self.db = db
+        self.writer = writer
         self.theme_manager = theme_manager
         self.on_login_success = on_login_success
         self.root = root
@@ -31,31 +30,19 @@ class AuthManager:
     
     def _generate_salt(self) -> str:
         """Gera um salt aleatório para hash da senha"""
-        return secrets.token_hex(32)
+        return security.generate_salt()
     
     def _hash_password(self, password: str, salt: str = None) -> tuple:
         """
         Gera hash seguro da senha com salt
         Retorna (hash, salt)
         """
-        if salt is None:
-            salt = self._generate_salt()
-        
-        # Combina senha com salt e faz múltiplas iterações
-        combined = f"{password}{salt}"
-        hashed = combined.encode()
-        
-        # Aplica hash múltiplas vezes para maior segurança
-        for _ in range(100000):  # PBKDF2-like approach
-            hashed = hashlib.sha256(hashed).digest()
-        
-        return hashed.hex(), salt
+        return security.hash_password(password, salt)
     
     def _verify_password(self, password: str, stored_hash: str, salt: str) -> bool:
         """Verifica se a senha fornecida corresponde ao hash armazenado"""
         try:
-            computed_hash, _ = self._hash_password(password, salt)
-            return secrets.compare_digest(computed_hash, stored_hash)
+            return security.verify_password(password, stored_hash, salt)
         except Exception as e:
             logger.error(f"Erro ao verificar senha: {e}")
             return False
@@ -65,46 +52,14 @@ class AuthManager:
         Valida a força da senha
         Retorna (is_valid, error_message)
         """
-        if len(password) < self.MIN_PASSWORD_LENGTH:
-            return False, f"A senha deve ter pelo menos {self.MIN_PASSWORD_LENGTH} caracteres"
-        
-        # Verifica se tem pelo menos uma letra maiúscula
-        if not re.search(r'[A-Z]', password):
-            return False, "A senha deve conter pelo menos uma letra maiúscula"
-        
-        # Verifica se tem pelo menos uma letra minúscula
-        if not re.search(r'[a-z]', password):
-            return False, "A senha deve conter pelo menos uma letra minúscula"
-        
-        # Verifica se tem pelo menos um número
-        if not re.search(r'\d', password):
-            return False, "A senha deve conter pelo menos um número"
-        
-        # Verifica se tem pelo menos um caractere especial
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
-            return False, "A senha deve conter pelo menos um caractere especial (!@#$%^&*(),.?\":{}|<>)"
-        
-        return True, ""
+        return security.validate_password_strength(password, self.MIN_PASSWORD_LENGTH)
     
     def _validate_username(self, username: str) -> tuple:
         """
         Valida o nome de usuário
         Retorna (is_valid, error_message)
         """
-        if not username or len(username.strip()) == 0:
-            return False, "Nome de usuário não pode estar vazio"
-        
-        if len(username) < 3:
-            return False, "Nome de usuário deve ter pelo menos 3 caracteres"
-        
-        if len(username) > 50:
-            return False, "Nome de usuário deve ter no máximo 50 caracteres"
-        
-        # Apenas letras, números e alguns caracteres especiais
-        if not re.match(r'^[a-zA-Z0-9._-]+$', username):
-            return False, "Nome de usuário pode conter apenas letras, números, pontos, hífens e underscores"
-        
-        return True, ""
+        return security.validate_username(username)
     
     def _is_user_locked(self, username: str) -> bool:
         """Verifica se o usuário está bloqueado por tentativas excessivas"""
@@ -171,6 +126,10 @@ class AuthManager:
             user_data = self.db.get_user_by_username(username)
             
             if not user_data:
+                if self.db.is_user_disabled(username):
+                    messagebox.showerror("Erro", "Esta conta foi desativada e está sendo excluída")
+                    logger.warning(f"Tentativa de login em conta desativada: {username}")
+                    return False
                 self._record_login_attempt(username, False)
                 messagebox.showerror("Erro", "Usuário ou senha incorretos")
                 logger.warning(f"Tentativa de login com usuário inexistente: {username}")
@@ -398,6 +357,18 @@ class AuthManager:
             messagebox.showerror("Erro", "Senha incorreta")
             return False
 
+        if self.writer is not None:
+            # A conta é desativada na hora e os dados são removidos em lotes, em segundo plano
+            if self.db.disable_user(self.current_user['id']):
+                from background import AccountDeletion
+                AccountDeletion(self.writer, self.current_user['id']).start()
+                messagebox.showinfo("Sucesso", "Conta desativada. Os dados serão excluídos em segundo plano.")
+                logger.info(f"Conta desativada para exclusão: {self.current_user['username']}")
+                self.logout()
+                return True
+            messagebox.showerror("Erro", "Erro ao excluir a conta")
+            return False
+
         if self.db.delete_user(self.current_user['id']):
             messagebox.showinfo("Sucesso", "Conta excluída com sucesso")
             logger.info(f"Conta excluída: {self.current_user['username']}")
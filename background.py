@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Pausa entre os lotes de um trabalho longo. Uma conexão que espera pelo lock
+# (ex.: um salvamento na thread do Tk) tenta de novo a cada até 100 ms; sem a
+# pausa, os lotes seguidos retomariam o lock antes dela por segundos
+BATCH_PAUSE = 0.12
+
+
+class BackgroundWriter:
+    """
+    Executa escritas no banco em uma thread própria, fora da thread do Tk.
+
+    As tarefas são identificadas por uma chave: enviar uma nova tarefa com a
+    mesma chave substitui a pendente, de modo que existe no máximo uma
+    escrita aguardando por chave (ex.: um rascunho ou a preferência de tema).
+    Cada tarefa recebe como primeiro argumento um DatabaseManager com
+    conexão exclusiva da thread de escrita.
+    """
+
+    def __init__(self, db_name="diario.db"):
+        self.db_name = db_name
+        self._pending = OrderedDict()  # {chave: (função, args)}
+        self._in_flight = None
+        self._condition = threading.Condition()
+        self._running = True
+        self.closing = False
+        self._thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, func, *args):
+        """Agenda func(db, *args), substituindo a tarefa pendente com a mesma chave"""
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("BackgroundWriter já foi encerrado")
+            self._pending.pop(key, None)
+            self._pending[key] = (func, args)
+            self._condition.notify_all()
+
+    def submit_batches(self, key, step, state=None):
+        """
+        Executa um trabalho longo em lotes: step(db, state) processa um lote e
+        retorna o estado do próximo, ou None ao terminar. Cada lote é uma
+        tarefa separada, de modo que outras escritas são intercaladas.
+        """
+        def run(db, state):
+            next_state = step(db, state)
+            if next_state is not None and not self.closing:
+                time.sleep(BATCH_PAUSE)
+                self.submit(key, run, next_state)
+
+        self.submit(key, run, state)
+
+    def discard(self, key):
+        """Descarta a tarefa pendente da chave e espera a que estiver em execução terminar"""
+        with self._condition:
+            self._pending.pop(key, None)
+            while self._in_flight == key:
+                self._condition.wait()
+
+    def pending(self, key):
+        with self._condition:
+            return key in self._pending or self._in_flight == key
+
+    def flush(self, timeout=None):
+        """Espera todas as tarefas pendentes serem gravadas"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and self._in_flight is None, timeout
+            )
+
+    def close(self, timeout=5):
+        """Grava o que estiver pendente e encerra a thread"""
+        # Tarefas que se reagendam (ex.: migrações em lotes) param de se reagendar
+        self.closing = True
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        db = None
+        try:
+            while True:
+                with self._condition:
+                    while self._running and not self._pending:
+                        self._condition.wait()
+                    if not self._pending:
+                        break
+                    key, (func, args) = self._pending.popitem(last=False)
+                    self._in_flight = key
+
+                try:
+                    if db is None:
+                        db = DatabaseManager(self.db_name)
+                    func(db, *args)
+                except Exception as e:
+                    logger.error(f"Erro na escrita em segundo plano ({key}): {e}")
+                finally:
+                    with self._condition:
+                        self._in_flight = None
+                        self._condition.notify_all()
+        finally:
+            if db is not None:
+                db.close()
+
+
+class AccountDeletion:
+    """
+    Exclui em lotes os dados de uma conta já desativada, na thread de escrita.
+
+    Cada lote remove até batch_size entradas (revisões, rascunhos e índice
+    de busca saem em cascata), mantendo curto o tempo de cada transação.
+    Como a conta fica marcada como desativada até o fim, uma exclusão
+    interrompida é retomada na próxima abertura da aplicação.
+    """
+
+    def __init__(self, writer, user_id, batch_size=200, on_progress=None):
+        self.writer = writer
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.total = None
+        self.deleted = 0
+        self.done = False
+
+    def start(self):
+        self.writer.submit_batches(('delete_user', self.user_id), self._step)
+        return self
+
+    @property
+    def progress(self):
+        """Fração já excluída (0 a 1), ou None antes do primeiro lote"""
+        if self.done:
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.deleted / self.total, 1.0)
+
+    def _step(self, db, state):
+        if self.total is None:
+            self.total = db.count_user_entries(self.user_id)
+        deleted = db.delete_user_batch(self.user_id, self.batch_size)
+        if deleted is None:
+            return None
+        if deleted == 0:
+            self.done = True
+            logger.info(f"Conta {self.user_id} excluída ({self.deleted} entradas)")
+        else:
+            self.deleted += deleted
+            logger.info(f"Excluindo conta {self.user_id}: {self.deleted}/{self.total} entradas")
+        if self.on_progress:
+            self.on_progress(self)
+        return None if self.done else self.deleted
@@ -0,0 +1,319 @@
+"""
+Cópias de segurança do banco do diário.
+
+As cópias são feitas com a API de backup do SQLite em passos de poucas
+páginas, numa thread própria, enquanto a aplicação continua gravando.
+Cada cópia é comprimida com gzip e registrada em um manifesto com sha256;
+apenas as mais recentes são mantidas. Uso pela linha de comando:
+
+    python -m backup criar
+    python -m backup listar
+    python -m backup restaurar diario-20240101-120000.db.gz
+    python -m backup compactar
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKUP_DIR = "backups"
+MANIFEST_FILE = "manifest.json"
+# Páginas copiadas por passo e pausa entre passos: a cada pausa o banco fica
+# livre para as escritas da aplicação
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.01
+
+
+class BackupError(Exception):
+    pass
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def integrity_check(db_path):
+    """Retorna None se o banco estiver íntegro, ou a descrição do problema"""
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = connection.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        connection.close()
+    if rows == [('ok',)]:
+        return None
+    return "; ".join(row[0] for row in rows[:5])
+
+
+class BackupManager:
+    """Cria, lista, agenda e restaura cópias de segurança do banco"""
+
+    def __init__(self, db_name="diario.db", backup_dir=DEFAULT_BACKUP_DIR, keep=7, interval_hours=24):
+        self.db_name = db_name
+        self.backup_dir = Path(backup_dir)
+        self.keep = keep
+        self.interval = interval_hours * 3600
+        self.progress = None  # (páginas restantes, total) da cópia em andamento
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls, settings, db_name="diario.db"):
+        """Cria o gerenciador a partir da seção 'backup' das configurações"""
+        config = settings.get('backup', {}) or {}
+        return cls(db_name,
+                   backup_dir=config.get('dir', DEFAULT_BACKUP_DIR),
+                   keep=config.get('keep', 7),
+                   interval_hours=config.get('interval_hours', 24))
+
+    # Manifesto
+    @property
+    def manifest_path(self):
+        return self.backup_dir / MANIFEST_FILE
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifesto de backups ilegível ({self.manifest_path}): {e}")
+            return []
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path.with_name(MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def last_backup_time(self):
+        manifest = self.load_manifest()
+        if not manifest:
+            return None
+        return max(item['timestamp'] for item in manifest)
+
+    # Criação
+    def create_backup(self):
+        """Copia o banco em passos, comprime e registra a cópia. Retorna o item do manifesto"""
+        if not self._lock.acquire(blocking=False):
+            raise BackupError("Já existe uma cópia de segurança em andamento")
+        try:
+            return self._create_backup()
+        finally:
+            self.progress = None
+            self._lock.release()
+
+    def _create_backup(self):
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        started = time.time()
+        name = f"diario-{datetime.fromtimestamp(started).strftime('%Y%m%d-%H%M%S')}.db.gz"
+        target = self.backup_dir / name
+
+        fd, tmp_db = tempfile.mkstemp(suffix='.db', dir=self.backup_dir)
+        os.close(fd)
+        try:
+            source = sqlite3.connect(self.db_name, timeout=10)
+            destination = sqlite3.connect(tmp_db)
+            try:
+                source.backup(destination, pages=PAGES_PER_STEP, progress=self._on_progress, sleep=STEP_SLEEP)
+            finally:
+                destination.close()
+                source.close()
+
+            db_sha256 = file_sha256(tmp_db)
+            size = os.path.getsize(tmp_db)
+            with open(tmp_db, 'rb') as src, gzip.open(str(target) + '.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(str(target) + '.tmp', target)
+        finally:
+            os.remove(tmp_db)
+
+        item = {
+            'file': name,
+            'timestamp': started,
+            'created_at': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+            'size': size,
+            'compressed_size': target.stat().st_size,
+            'sha256': file_sha256(target),
+            'db_sha256': db_sha256,
+        }
+        manifest = self.load_manifest()
+        manifest.append(item)
+        self._save_manifest(self._rotate(manifest))
+        logger.info(f"Cópia de segurança criada: {target} ({item['compressed_size'] / 1024:.1f} KB, "
+                    f"{time.time() - started:.1f}s)")
+        return item
+
+    def _on_progress(self, status, remaining, total):
+        self.progress = (remaining, total)
+
+    def _rotate(self, manifest):
+        """Mantém apenas as self.keep cópias mais recentes"""
+        manifest.sort(key=lambda item: item['timestamp'])
+        expired, manifest = manifest[:-self.keep], manifest[-self.keep:]
+        for item in expired:
+            try:
+                (self.backup_dir / item['file']).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível remover a cópia antiga {item['file']}: {e}")
+        return manifest
+
+    # Agendamento
+    def start_schedule(self, first_delay=60):
+        """Cria cópias periodicamente em uma thread própria, enquanto a aplicação estiver aberta"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._schedule_loop, args=(first_delay,),
+                                        name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop_schedule(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _schedule_loop(self, first_delay):
+        if self._stop.wait(first_delay):
+            return
+        while True:
+            last = self.last_backup_time()
+            due = self.interval - (time.time() - last) if last else 0
+            if due <= 0:
+                try:
+                    self.create_backup()
+                except Exception as e:
+                    logger.error(f"Erro na cópia de segurança agendada: {e}")
+                due = self.interval
+            if self._stop.wait(due):
+                return
+
+    # Restauração
+    def find(self, file_name):
+        for item in self.load_manifest():
+            if item['file'] == os.path.basename(file_name):
+                return item
+        return None
+
+    def restore(self, file_name):
+        """
+        Restaura uma cópia sobre o banco atual, depois de conferir o checksum
+        e a integridade. O banco atual é preservado ao lado com sufixo .antes-da-restauracao
+        """
+        item = self.find(file_name)
+        if item is None:
+            raise BackupError(f"Cópia não encontrada no manifesto: {file_name}")
+        archive = self.backup_dir / item['file']
+        if file_sha256(archive) != item['sha256']:
+            raise BackupError(f"Checksum do arquivo não confere: {archive}")
+
+        db_path = Path(self.db_name).resolve()
+        fd, tmp_db = tempfile.mkstemp(suffix='.db', dir=db_path.parent)
+        os.close(fd)
+        try:
+            with gzip.open(archive, 'rb') as src, open(tmp_db, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            if file_sha256(tmp_db) != item['db_sha256']:
+                raise BackupError("O conteúdo descomprimido não confere com o manifesto")
+            problem = integrity_check(tmp_db)
+            if problem:
+                raise BackupError(f"A cópia não passou na verificação de integridade: {problem}")
+
+            if db_path.exists():
+                # Incorpora o WAL ao arquivo principal antes de substituí-lo
+                connection = sqlite3.connect(str(db_path), timeout=10)
+                try:
+                    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                finally:
+                    connection.close()
+                previous = db_path.with_name(db_path.name + '.antes-da-restauracao')
+                os.replace(db_path, previous)
+                for suffix in ('-wal', '-shm'):
+                    leftover = db_path.with_name(db_path.name + suffix)
+                    if leftover.exists():
+                        leftover.unlink()
+            os.replace(tmp_db, db_path)
+        finally:
+            if os.path.exists(tmp_db):
+                os.remove(tmp_db)
+        logger.info(f"Banco restaurado a partir de {archive}")
+        return item
+
+
+def main(argv=None):
+    from settings import Settings
+    from single_instance import SingleInstance
+
+    parser = argparse.ArgumentParser(description="Cópias de segurança do Diário Digital")
+    parser.add_argument('--db', default='diario.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('criar', help='cria uma cópia agora')
+    subparsers.add_parser('listar', help='lista as cópias disponíveis')
+    restore_parser = subparsers.add_parser('restaurar', help='restaura uma cópia')
+    restore_parser.add_argument('arquivo')
+    subparsers.add_parser('compactar', help='VACUUM completo (ativa o auto_vacuum incremental)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    manager = BackupManager.from_settings(Settings(), args.db)
+
+    try:
+        if args.command == 'criar':
+            item = manager.create_backup()
+            print(f"Cópia criada: {item['file']}")
+        elif args.command == 'listar':
+            for item in sorted(manager.load_manifest(), key=lambda i: i['timestamp'], reverse=True):
+                print(f"{item['file']}  {item['created_at']}  "
+                      f"{item['size'] / 1024:.1f} KB -> {item['compressed_size'] / 1024:.1f} KB")
+        elif args.command == 'restaurar':
+            # A aplicação não pode estar com o banco aberto durante a troca dos arquivos
+            instance = SingleInstance(args.db)
+            if not instance.acquire():
+                raise BackupError("Feche o Diário Digital antes de restaurar uma cópia")
+            try:
+                item = manager.restore(args.arquivo)
+            finally:
+                instance.release()
+            print(f"Banco restaurado a partir de {item['file']} ({item['created_at']})")
+        elif args.command == 'compactar':
+            from database import DatabaseManager
+            # Prende o banco durante todo o VACUUM: só com a aplicação fechada
+            instance = SingleInstance(args.db)
+            if not instance.acquire():
+                raise BackupError("Feche o Diário Digital antes de compactar o banco")
+            db = DatabaseManager(args.db)
+            try:
+                # Também ativa o auto_vacuum incremental em bancos antigos (ver maintenance.py)
+                db.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                db.connection.execute("VACUUM")
+            finally:
+                db.close()
+                instance.release()
+            print("Banco compactado")
+    except BackupError as e:
+        raise SystemExit(f"Erro: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,233 @@
 import sqlite3
 import logging
+import hashlib
+import json
+import os
+import zlib
 from datetime import datetime
 
+import attachments
+import dedup
+import fuzzy
+import sync
+import revisions
+from tags import normalize_tag
+
 logger = logging.getLogger(__name__)
 
+# Conteúdos a partir deste tamanho (em bytes) são gravados comprimidos
+COMPRESS_THRESHOLD = 2048
+# Prefixo que identifica um conteúdo comprimido (gravado como BLOB)
+COMPRESSED_MARKER = b'DZ1'
+
+# Versão do esquema, gravada em PRAGMA user_version (ver DatabaseManager.migrate)
+SCHEMA_VERSION = 1
+
+# Tabelas com chaves estrangeiras; {name} permite recriá-las com outro nome nas migrações
+TABLE_SCHEMAS = {
+    'entries': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            favorite INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''',
+    # Rascunhos do editor: um por usuário e entrada ('new' para entradas novas)
+    'drafts': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            draft_key TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            entry_id INTEGER,
+            title TEXT NOT NULL DEFAULT '',
+            content TEXT NOT NULL DEFAULT '',
+            entry_date TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        )
+    ''',
+    # Versões anteriores das entradas (ver revisions.py)
+    'revisions': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            title TEXT NOT NULL,
+            entry_date TEXT,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(entry_id, revision),
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        )
+    ''',
+    # Tags por usuário; entry_count é mantido pelos triggers de entry_tags
+    'tags': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            entry_count INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(user_id, name),
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''',
+    'entry_tags': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            entry_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY(entry_id, tag_id),
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE,
+            FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''',
+    # Conteúdo dos anexos, um por sha256 (ver attachments.py); rowid necessário para blobopen
+    'blobs': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sha256 TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'attachments': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL,
+            blob_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            mime_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE,
+            FOREIGN KEY(blob_id) REFERENCES blobs(id)
+        )
+    ''',
+    # Miniaturas das imagens, geradas uma vez por conteúdo
+    'thumbnails': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            blob_id INTEGER PRIMARY KEY,
+            data BLOB NOT NULL,
+            FOREIGN KEY(blob_id) REFERENCES blobs(id) ON DELETE CASCADE
+        )
+    ''',
+    # Contador de alterações das entradas de cada usuário (chave do cache de estatísticas)
+    'entry_versions': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''',
+    # Assinatura MinHash de cada entrada (NULL se ela não tem palavras) e seus baldes LSH
+    'entry_signatures': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            entry_id INTEGER PRIMARY KEY,
+            signature BLOB,
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        )
+    ''',
+    'entry_lsh': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            user_id INTEGER NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            entry_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, band, bucket, entry_id),
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''',
+}
+
+
+def compress_content(content):
+    """Comprime conteúdos grandes; textos curtos ou pouco compressíveis ficam como estão"""
+    if content is None:
+        return None
+    data = content.encode('utf-8')
+    if len(data) < COMPRESS_THRESHOLD:
+        return content
+    packed = COMPRESSED_MARKER + zlib.compress(data, 6)
+    return packed if len(packed) < len(data) else content
+
+
+def decompress_content(value):
+    if isinstance(value, bytes) and value.startswith(COMPRESSED_MARKER):
+        return zlib.decompress(value[len(COMPRESSED_MARKER):]).decode('utf-8')
+    return value
+
+
+def word_count(text):
+    return len(text.split()) if text else 0
+
+
+def connect(db_name="diario.db", check_same_thread=True):
+    """Abre uma conexão configurada para acesso concorrente (WAL + espera por locks)"""
+    connection = sqlite3.connect(db_name, timeout=10, check_same_thread=check_same_thread)
+    # Só tem efeito em bancos novos; os existentes mudam de modo na manutenção (maintenance.py)
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("PRAGMA journal_mode=WAL")
+    # Exclusões de contas e entradas se propagam pelas tabelas dependentes (ON DELETE CASCADE)
+    connection.execute("PRAGMA foreign_keys=ON")
+    # Usada nas consultas e nos triggers do índice de busca para ler o conteúdo original
+    connection.create_function('content_text', 1, decompress_content, deterministic=True)
+    connection.create_function('word_count', 1, word_count, deterministic=True)
+    # Índice da busca aproximada (ver fuzzy.py)
+    connection.create_function('fold_text', 1, fuzzy.fold_text, deterministic=True)
+    connection.create_function('fold_terms', 1, fuzzy.fold_terms, deterministic=True)
+    connection.create_function('term_trigrams', 1, fuzzy.term_trigrams, deterministic=True)
+    # Identificadores globais das linhas já existentes ao ativar a sincronização (ver sync.py)
+    connection.create_function('sync_key', -1, sync.row_key, deterministic=True)
+    return connection
+
+
+def needs_migration(db_name="diario.db"):
+    """Se o banco existe e foi criado por uma versão anterior do esquema (ver DatabaseManager.migrate)"""
+    if not os.path.exists(db_name):
+        return False
+    connection = sqlite3.connect(db_name)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION
+    finally:
+        connection.close()
+
+
 class DatabaseManager:
-    def __init__(self, db_name="diario.db"):
-        self.connection = sqlite3.connect(db_name)
-        self.create_tables()
+    def __init__(self, db_name="diario.db", lazy=False, check_same_thread=True):
+        self.db_name = db_name
+        self.check_same_thread = check_same_thread
+        self._connection = None
+        self.fts_enabled = False
+        self.fuzzy_enabled = False
+        self._backfills_done = set()
+        if not lazy:
+            self.open()
         logger.info("DatabaseManager inicializado")
 
+    @property
+    def connection(self):
+        """Conexão com o banco, aberta no primeiro acesso"""
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    def open(self):
+        if self._connection is None:
+            self._connection = connect(self.db_name, self.check_same_thread)
+            self.create_tables()
+            self.migrate()
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
     def create_tables(self):
         with self.connection:
             self.connection.execute('''
@@ -18,21 +236,659 @@ class DatabaseManager:
                     username TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
                     salt TEXT NOT NULL,
-                    theme TEXT
+                    theme TEXT,
+                    disabled INTEGER NOT NULL DEFAULT 0
                 )
             ''')
+            for name in TABLE_SCHEMAS:
+                self.connection.execute(TABLE_SCHEMAS[name].format(name=name))
+            # Bancos criados antes das colunas de favoritos e de contas desativadas
+            self._ensure_column('entries', 'favorite', 'INTEGER NOT NULL DEFAULT 0')
+            self._ensure_column('users', 'disabled', 'INTEGER NOT NULL DEFAULT 0')
+            self._create_search_index()
+            self._create_fuzzy_index()
+            self._create_activity_aggregates()
+            self._create_indexes()
+            self._create_tag_counts()
+            self._create_blob_release()
+            self._create_duplicate_index()
+            self._create_entry_versions()
+            self._create_sync_log()
+
+    def _create_sync_log(self):
+        """
+        Registro de alterações para a sincronização entre dispositivos (ver
+        sync.py). Cada usuário e entrada tem um identificador global (uuid) e a
+        versão da sua última alteração: relógio lógico (Lamport) e dispositivo
+        que a fez. seq numera as alterações gravadas neste banco, de modo que
+        exportar o que mudou desde a última sincronização lê só essas linhas.
+        Exclusões ficam registradas (deleted = 1) para serem propagadas.
+
+        Em bancos anteriores ao registro, as entradas existentes são
+        registradas depois, em lotes, na thread de escrita (sync_log_batch);
+        uma entrada alterada ou excluída antes do seu lote é registrada pelo
+        próprio trigger. SyncManager completa o registro antes de sincronizar.
+        """
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_log'"
+        ).fetchone()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID"
+        )
+        self.connection.execute('''
+            INSERT OR IGNORE INTO sync_meta (key, value)
+            VALUES ('device', lower(hex(randomblob(16)))), ('clock', 0), ('seq', 1)
+        ''')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS sync_log (
+                uuid TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                clock INTEGER NOT NULL,
+                device TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                alias INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Dispositivos conhecidos: até onde as alterações de cada um foram aplicadas
+        # aqui (received_seq) e até onde ele confirmou ter aplicado as daqui (sent_seq)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS sync_peers (
+                device TEXT PRIMARY KEY,
+                sent_seq INTEGER NOT NULL DEFAULT 0,
+                received_seq INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_sync_log_row ON sync_log(table_name, row_id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_sync_log_seq ON sync_log(table_name, seq)")
+
+        # Nova versão local: incrementa o relógio e a sequência antes de gravá-la
+        bump = "UPDATE sync_meta SET value = value + 1 WHERE key IN ('clock', 'seq');"
+        version = '''
+            clock = (SELECT value FROM sync_meta WHERE key = 'clock'),
+            device = (SELECT value FROM sync_meta WHERE key = 'device'),
+            seq = (SELECT value FROM sync_meta WHERE key = 'seq')
+        '''
+        changed = {
+            'users': '''old.username IS NOT new.username OR old.password_hash IS NOT new.password_hash
+                        OR old.salt IS NOT new.salt OR old.theme IS NOT new.theme
+                        OR old.disabled IS NOT new.disabled''',
+            'entries': '''old.user_id IS NOT new.user_id OR old.title IS NOT new.title
+                          OR content_text(old.content) IS NOT content_text(new.content)
+                          OR old.created_at IS NOT new.created_at OR old.favorite IS NOT new.favorite''',
+        }
+        self._create_backfill('sync_backfill', not exists)
+        # Entrada anterior ao registro ainda sem linha no sync_log: registra com o identificador
+        # derivado do conteúdo antes de gravar a nova versão (o mesmo que o lote calcularia)
+        seed = {
+            'users': '',
+            'entries': f'''
+                INSERT OR IGNORE INTO sync_log (uuid, table_name, row_id, clock, device, seq)
+                SELECT {self._entry_sync_key('old')}, 'entries', old.id, 0, '', 1
+                WHERE NOT {self._backfilled('sync_backfill')}
+                  AND NOT EXISTS (SELECT 1 FROM sync_log WHERE table_name = 'entries' AND row_id = old.id);
+            ''',
+        }
+        for table, condition in changed.items():
+            self.connection.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} BEGIN
+                    {bump}
+                    INSERT INTO sync_log (uuid, table_name, row_id, clock, device, seq)
+                    SELECT lower(hex(randomblob(16))), '{table}', new.id, clock.value, device.value, seq.value
+                    FROM sync_meta clock, sync_meta device, sync_meta seq
+                    WHERE clock.key = 'clock' AND device.key = 'device' AND seq.key = 'seq';
+                END
+            ''')
+            self.connection.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE ON {table}
+                WHEN {condition}
+                BEGIN
+                    {seed[table]}
+                    {bump}
+                    UPDATE sync_log SET {version} WHERE table_name = '{table}' AND row_id = new.id;
+                END
+            ''')
+            self.connection.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_sync_delete AFTER DELETE ON {table} BEGIN
+                    {seed[table]}
+                    {bump}
+                    UPDATE sync_log SET deleted = 1, {version} WHERE table_name = '{table}' AND row_id = old.id;
+                END
+            ''')
+
+        if not exists:
+            # Linhas gravadas antes da sincronização: o identificador vem do conteúdo, de modo
+            # que cópias do mesmo banco em outros dispositivos chegam aos mesmos identificadores.
+            # Os usuários são poucos e entram já; as entradas, em lotes (sync_log_batch)
             self.connection.execute('''
-                CREATE TABLE IF NOT EXISTS entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(user_id) REFERENCES users(id)
-                )
+                INSERT INTO sync_log (uuid, table_name, row_id, clock, device, seq)
+                SELECT sync_key('users', username), 'users', id, 0, '', 1 FROM users
             ''')
 
+    @staticmethod
+    def _entry_sync_key(row: str) -> str:
+        """
+        Identificador de uma entrada anterior ao registro: hash do conteúdo e,
+        entre entradas idênticas, numerado pela ordem dos ids
+        """
+        key = (f"sync_key('entries', (SELECT username FROM users WHERE id = {row}.user_id), "
+               f"{row}.created_at, {row}.title, content_text({row}.content))")
+        earlier = f'''(
+            SELECT COUNT(*) FROM entries same
+            WHERE same.user_id = {row}.user_id AND same.created_at = {row}.created_at AND same.id < {row}.id
+              AND same.title = {row}.title AND content_text(same.content) = content_text({row}.content)
+        )'''
+        return f"CASE WHEN {earlier} = 0 THEN {key} ELSE sync_key({key}, {earlier} + 1) END"
+
+    def sync_log_batch(self, batch_size: int = 500):
+        """
+        Registra no sync_log um lote de entradas anteriores a ele. Retorna o
+        último id processado ou None ao terminar
+        """
+        def register(rows):
+            # Entradas alteradas antes do lote já foram registradas pelos triggers
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO sync_log (uuid, table_name, row_id, clock, device, seq) "
+                "SELECT ?, 'entries', ?, 0, '', 1 "
+                "WHERE NOT EXISTS (SELECT 1 FROM sync_log WHERE table_name = 'entries' AND row_id = ?)",
+                [(key, entry_id, entry_id) for entry_id, key in rows]
+            )
+
+        try:
+            return self._backfill_batch('sync_backfill', self._entry_sync_key('entries'), register,
+                                        batch_size, "Registro de sincronização concluído")
+        except Exception as e:
+            logger.error(f"Erro ao registrar entradas para a sincronização: {e}")
+            return None
+
+    def _create_duplicate_index(self):
+        """
+        Assinaturas de duplicadas: calculá-las custa caro em entradas longas, por
+        isso os triggers apenas descartam as de entradas alteradas, e
+        signatures_batch as recalcula na thread de escrita
+        """
+        # Versões anteriores calculavam a assinatura dentro dos triggers, a cada gravação
+        self.connection.execute("DROP TRIGGER IF EXISTS entries_signature_insert")
+        self.connection.execute("DROP TRIGGER IF EXISTS entries_signature_update")
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS entries_signature_stale AFTER UPDATE OF title, content ON entries
+            WHEN old.title IS NOT new.title OR content_text(old.content) IS NOT content_text(new.content)
+            BEGIN
+                DELETE FROM entry_lsh WHERE entry_id = old.id;
+                DELETE FROM entry_signatures WHERE entry_id = old.id;
+            END
+        ''')
+
+    def _create_blob_release(self):
+        """Remove o conteúdo quando o último anexo que o usa é excluído (inclusive em cascata)"""
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS attachments_release_blob AFTER DELETE ON attachments
+            WHEN NOT EXISTS (SELECT 1 FROM attachments WHERE blob_id = old.blob_id)
+            BEGIN
+                DELETE FROM blobs WHERE id = old.blob_id;
+            END
+        ''')
+
+    def _create_tag_counts(self):
+        """Contagem de entradas por tag, ajustada a cada vínculo criado ou removido"""
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS entry_tags_count_insert AFTER INSERT ON entry_tags BEGIN
+                UPDATE tags SET entry_count = entry_count + 1 WHERE id = new.tag_id;
+            END
+        ''')
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS entry_tags_count_delete AFTER DELETE ON entry_tags BEGIN
+                UPDATE tags SET entry_count = entry_count - 1 WHERE id = old.tag_id;
+            END
+        ''')
+
+    def _create_entry_versions(self):
+        """
+        Incrementa entry_versions a cada entrada criada, excluída ou com data ou
+        texto alterados, inclusive por sincronização (ver get_stats_key)
+        """
+        bump = '''
+            INSERT INTO entry_versions (user_id, version) VALUES ({user}.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+        '''
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entry_versions_insert AFTER INSERT ON entries BEGIN
+                {bump.format(user='new')}
+            END
+        ''')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entry_versions_delete AFTER DELETE ON entries BEGIN
+                {bump.format(user='old')}
+            END
+        ''')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entry_versions_update AFTER UPDATE OF user_id, created_at, content ON entries
+            WHEN old.user_id IS NOT new.user_id OR old.created_at IS NOT new.created_at
+                 OR content_text(old.content) IS NOT content_text(new.content)
+            BEGIN
+                {bump.format(user='old')}
+                {bump.format(user='new')}
+            END
+        ''')
+
+    def _create_indexes(self):
+        # Substituído por entry_versions como chave do cache de estatísticas
+        self.connection.execute("DROP INDEX IF EXISTS idx_entries_user_updated")
+        # "Neste dia": a consulta precisa usar exatamente a mesma expressão para buscar pelo índice
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_user_month_day "
+            "ON entries(user_id, strftime('%m-%d', created_at))"
+        )
+        # Listagem ordenada por data e filtros por período
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_user_created ON entries(user_id, created_at)"
+        )
+        # Filtro por tag: entradas de uma tag lidas só do índice (a chave primária cobre entry_id -> tag_id)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entry_tags_tag ON entry_tags(tag_id, entry_id)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_attachments_entry ON attachments(entry_id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_attachments_blob ON attachments(blob_id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_entry_lsh_entry ON entry_lsh(entry_id)")
+
+    def _create_activity_aggregates(self):
+        """
+        Totais por usuário e dia (entradas, palavras, caracteres), mantidos
+        pelos triggers de entries; consultas de atividade leem poucas linhas
+        agregadas em vez de todas as entradas.
+
+        Em bancos anteriores aos totais, as entradas existentes são somadas
+        depois, em lotes, na thread de escrita (activity_batch); até lá
+        activity_ready() é falso e os totais estão incompletos.
+        """
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_activity'"
+        ).fetchone()
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS daily_activity (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                word_count INTEGER NOT NULL DEFAULT 0,
+                char_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day),
+                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''')
+
+        add_new = '''
+            INSERT INTO daily_activity (user_id, day, entry_count, word_count, char_count)
+            VALUES (new.user_id, date(new.created_at), 1,
+                    word_count(content_text(new.content)), length(content_text(new.content)))
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                entry_count = entry_count + 1,
+                word_count = word_count + excluded.word_count,
+                char_count = char_count + excluded.char_count;
+        '''
+        remove_old = '''
+            UPDATE daily_activity SET
+                entry_count = entry_count - 1,
+                word_count = word_count - word_count(content_text(old.content)),
+                char_count = char_count - length(content_text(old.content))
+            WHERE user_id = old.user_id AND day = date(old.created_at);
+            DELETE FROM daily_activity
+            WHERE user_id = old.user_id AND day = date(old.created_at) AND entry_count <= 0;
+        '''
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_activity_insert AFTER INSERT ON entries BEGIN
+                {add_new}
+            END
+        ''')
+        self._create_backfill('activity_backfill', not exists)
+        # Entradas ainda não somadas não são descontadas; o lote delas soma o estado atual
+        counted = self._backfilled('activity_backfill')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_activity_delete AFTER DELETE ON entries
+            WHEN {counted}
+            BEGIN
+                {remove_old}
+            END
+        ''')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS daily_activity_update AFTER UPDATE OF user_id, created_at, content ON entries
+            WHEN (old.user_id IS NOT new.user_id OR date(old.created_at) IS NOT date(new.created_at)
+                  OR content_text(old.content) IS NOT content_text(new.content))
+                 AND {counted}
+            BEGIN
+                {remove_old}
+                {add_new}
+            END
+        ''')
+
+    def activity_ready(self) -> bool:
+        """Se daily_activity já inclui todas as entradas"""
+        return self._backfill_done('activity_backfill')
+
+    def activity_batch(self, batch_size: int = 500):
+        """
+        Soma aos totais diários um lote de entradas anteriores a eles. Retorna
+        o último id processado ou None ao terminar
+        """
+        def add(rows):
+            totals = {}
+            for _, user_id, day, content in rows:
+                entries, words, chars = totals.get((user_id, day), (0, 0, 0))
+                totals[(user_id, day)] = (entries + 1, words + word_count(content), chars + len(content))
+            self.connection.executemany(
+                '''
+                INSERT INTO daily_activity (user_id, day, entry_count, word_count, char_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, day) DO UPDATE SET
+                    entry_count = entry_count + excluded.entry_count,
+                    word_count = word_count + excluded.word_count,
+                    char_count = char_count + excluded.char_count
+                ''',
+                [(user_id, day, *values) for (user_id, day), values in totals.items()]
+            )
+
+        try:
+            return self._backfill_batch('activity_backfill', "user_id, date(created_at), content_text(content)",
+                                        add, batch_size, "Totais diários de atividade concluídos")
+        except Exception as e:
+            logger.error(f"Erro ao calcular os totais diários: {e}")
+            return None
+
+    def _create_search_index(self):
+        """
+        Índice de busca sobre o texto original das entradas (FTS5 com trigramas,
+        sem cópia do conteúdo), mantido por triggers. Como o conteúdo pode estar
+        comprimido, a busca não depende mais de LIKE sobre a coluna.
+
+        Em bancos anteriores ao índice, as entradas existentes são indexadas
+        depois, em lotes, na thread de escrita (search_index_batch); até lá a
+        busca usa LIKE.
+        """
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries_fts'"
+        ).fetchone()
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                "USING fts5(title, content, content='', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Índice de busca indisponível, usando busca sequencial: {e}")
+            self.fts_enabled = False
+            return
+
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fts (rowid, title, content)
+                VALUES (new.id, new.title, content_text(new.content));
+            END
+        ''')
+        self._create_backfill('search_backfill', not exists)
+        # Como no índice da busca aproximada: entradas ainda não indexadas ficam para o lote delas
+        indexed = self._backfilled('search_backfill')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries
+            WHEN {indexed}
+            BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, content_text(old.content));
+            END
+        ''')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entries_fts_update AFTER UPDATE OF title, content ON entries
+            WHEN (old.title IS NOT new.title OR content_text(old.content) IS NOT content_text(new.content))
+                 AND {indexed}
+            BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, content_text(old.content));
+                INSERT INTO entries_fts (rowid, title, content)
+                VALUES (new.id, new.title, content_text(new.content));
+            END
+        ''')
+        self.fts_enabled = True
+
+    def search_ready(self) -> bool:
+        """Se a busca pode usar entries_fts (FTS5 disponível e índice completo)"""
+        return self.fts_enabled and self._backfill_done('search_backfill')
+
+    def search_index_batch(self, batch_size: int = 200):
+        """
+        Indexa para a busca um lote de entradas anteriores ao índice. Retorna
+        o último id processado ou None ao terminar
+        """
+        if not self.fts_enabled:
+            return None
+
+        def index(rows):
+            self.connection.executemany("INSERT INTO entries_fts (rowid, title, content) VALUES (?, ?, ?)", rows)
+
+        try:
+            return self._backfill_batch('search_backfill', "title, content_text(content)", index,
+                                        batch_size, "Índice de busca concluído")
+        except Exception as e:
+            logger.error(f"Erro ao indexar entradas para a busca: {e}")
+            return None
+
+    def _create_fuzzy_index(self):
+        """
+        Índice da busca aproximada: entries_fuzzy guarda, para cada entrada, as
+        palavras sem acentos (FTS5 sem posições, só para saber quais entradas
+        contêm cada palavra); fuzzy_terms é o vocabulário e fuzzy_trigrams os
+        trigramas de cada palavra dele. Tudo mantido por triggers.
+
+        Em bancos anteriores ao índice, as entradas existentes (ids até
+        fuzzy_backfill.end_id) são indexadas depois, em lotes, na thread de
+        escrita (fuzzy_index_batch); até lá a busca aproximada não é usada.
+        """
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries_fuzzy'"
+        ).fetchone()
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fuzzy "
+                "USING fts5(title, content, content='', detail='none', tokenize='unicode61')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Busca aproximada indisponível: {e}")
+            self.fuzzy_enabled = False
+            return
+
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS fuzzy_terms (term TEXT PRIMARY KEY) WITHOUT ROWID
+        ''')
+        self._create_backfill('fuzzy_backfill', not exists)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS fuzzy_trigrams (
+                trigram TEXT NOT NULL,
+                term TEXT NOT NULL,
+                PRIMARY KEY (trigram, term)
+            ) WITHOUT ROWID
+        ''')
+        # Palavras novas entram no vocabulário; as que deixam de ser usadas ficam (não atrapalham a busca)
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS fuzzy_terms_insert AFTER INSERT ON fuzzy_terms BEGIN
+                INSERT OR IGNORE INTO fuzzy_trigrams (trigram, term)
+                SELECT value, new.term FROM json_each(term_trigrams(new.term));
+            END
+        ''')
+        self.connection.execute('''
+            CREATE TRIGGER IF NOT EXISTS entries_fuzzy_insert AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fuzzy (rowid, title, content)
+                VALUES (new.id, fold_text(new.title), fold_text(content_text(new.content)));
+                INSERT OR IGNORE INTO fuzzy_terms (term)
+                SELECT value FROM json_each(fold_terms(new.title || ' ' || content_text(new.content)));
+            END
+        ''')
+        # Entradas ainda não indexadas não podem ser removidas do FTS sem contentless (corromperia o
+        # índice); quando o lote delas chegar, é o conteúdo atual que será indexado
+        indexed = self._backfilled('fuzzy_backfill')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entries_fuzzy_delete AFTER DELETE ON entries
+            WHEN {indexed}
+            BEGIN
+                INSERT INTO entries_fuzzy (entries_fuzzy, rowid, title, content)
+                VALUES ('delete', old.id, fold_text(old.title), fold_text(content_text(old.content)));
+            END
+        ''')
+        self.connection.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS entries_fuzzy_update AFTER UPDATE OF title, content ON entries
+            WHEN (old.title IS NOT new.title OR content_text(old.content) IS NOT content_text(new.content))
+                 AND {indexed}
+            BEGIN
+                INSERT INTO entries_fuzzy (entries_fuzzy, rowid, title, content)
+                VALUES ('delete', old.id, fold_text(old.title), fold_text(content_text(old.content)));
+                INSERT INTO entries_fuzzy (rowid, title, content)
+                VALUES (new.id, fold_text(new.title), fold_text(content_text(new.content)));
+                INSERT OR IGNORE INTO fuzzy_terms (term)
+                SELECT value FROM json_each(fold_terms(new.title || ' ' || content_text(new.content)));
+            END
+        ''')
+        self.fuzzy_enabled = True
+
+    def fuzzy_ready(self) -> bool:
+        """Se a busca aproximada pode ser usada (FTS5 disponível e índice completo)"""
+        return self.fuzzy_enabled and self._backfill_done('fuzzy_backfill')
+
+    def fuzzy_index_batch(self, batch_size: int = 200):
+        """
+        Indexa para a busca aproximada um lote de entradas anteriores ao índice.
+        Retorna o último id processado ou None ao terminar
+        """
+        if not self.fuzzy_enabled:
+            return None
+
+        def index(rows):
+            self.connection.executemany(
+                "INSERT INTO entries_fuzzy (rowid, title, content) VALUES (?, ?, ?)",
+                [(entry_id, fuzzy.fold_text(title), fuzzy.fold_text(content)) for entry_id, title, content in rows]
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO fuzzy_terms (term) VALUES (?)",
+                [(term,) for _, title, content in rows for term in fuzzy.words(f"{title} {content}")]
+            )
+
+        try:
+            return self._backfill_batch('fuzzy_backfill', "title, content_text(content)", index,
+                                        batch_size, "Índice da busca aproximada concluído")
+        except Exception as e:
+            logger.error(f"Erro ao indexar entradas para a busca aproximada: {e}")
+            return None
+
+    # Preenchimentos em lotes: tabelas derivadas das entradas criadas num banco que já tem
+    # entradas são completadas na thread de escrita, não na abertura do banco
+    def _create_backfill(self, table: str, start: bool):
+        """Faixa de ids de entries ainda não processada; sem linha, o preenchimento está completo"""
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (next_id INTEGER NOT NULL, end_id INTEGER NOT NULL)"
+        )
+        if start:
+            self.connection.execute(
+                f"INSERT INTO {table} (next_id, end_id) SELECT MIN(id), MAX(id) FROM entries HAVING COUNT(*) > 0"
+            )
+
+    @staticmethod
+    def _backfilled(table: str, row: str = 'old') -> str:
+        """Condição dos triggers: a entrada row já foi processada pelo preenchimento de table"""
+        return f"NOT EXISTS (SELECT 1 FROM {table} WHERE {row}.id BETWEEN next_id AND end_id)"
+
+    def _backfill_done(self, table: str) -> bool:
+        if table not in self._backfills_done:
+            if self.connection.execute(f"SELECT 1 FROM {table}").fetchone() is None:
+                self._backfills_done.add(table)
+        return table in self._backfills_done
+
+    def _backfill_batch(self, table: str, columns: str, process, batch_size: int, done_message: str):
+        """
+        Passa um lote de entradas pendentes em table para process(rows), com
+        rows = (id, *columns). Retorna o último id processado ou None ao terminar
+        """
+        with self.connection:
+            # Lê e grava na mesma transação: uma edição da entrada não fica entre as duas
+            self.connection.execute("BEGIN IMMEDIATE")
+            pending = self.connection.execute(f"SELECT next_id, end_id FROM {table}").fetchone()
+            if pending is None:
+                return None
+            rows = self.connection.execute(
+                f"SELECT id, {columns} FROM entries WHERE id BETWEEN ? AND ? ORDER BY id LIMIT ?",
+                (*pending, batch_size)
+            ).fetchall()
+            if not rows:
+                self.connection.execute(f"DELETE FROM {table}")
+                logger.info(done_message)
+                return None
+            process(rows)
+            self.connection.execute(f"UPDATE {table} SET next_id = ?", (rows[-1][0] + 1,))
+        return rows[-1][0]
+
+    def migrate(self):
+        """Atualiza bancos criados por versões anteriores, conforme PRAGMA user_version"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        if version < 1:
+            self._rebuild_foreign_keys()
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logger.info(f"Esquema do banco atualizado da versão {version} para {SCHEMA_VERSION}")
+
+    def _has_cascade(self, table: str) -> bool:
+        keys = self.connection.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+        expected = TABLE_SCHEMAS[table].count('ON DELETE CASCADE')
+        return len(keys) == expected and all(key[6] == 'CASCADE' for key in keys)
+
+    def _rebuild_foreign_keys(self):
+        """
+        Recria as tabelas dependentes com ON DELETE CASCADE. O SQLite não altera
+        chaves estrangeiras de uma tabela existente: cada uma é copiada para uma
+        nova, que substitui a antiga, com as chaves desligadas durante a troca.
+        """
+        tables = [name for name in ('entries', 'drafts', 'revisions') if not self._has_cascade(name)]
+        if not tables:
+            return
+
+        self.connection.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                # Registros órfãos deixados por exclusões anteriores às chaves em cascata
+                self.connection.execute("DELETE FROM revisions WHERE entry_id NOT IN (SELECT id FROM entries)")
+                self.connection.execute(
+                    "DELETE FROM drafts WHERE user_id NOT IN (SELECT id FROM users) "
+                    "OR (entry_id IS NOT NULL AND entry_id NOT IN (SELECT id FROM entries))"
+                )
+                for table in tables:
+                    new_table = f"{table}_new"
+                    self.connection.execute(TABLE_SCHEMAS[table].format(name=new_table))
+                    old_columns = [row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")]
+                    new_columns = [row[1] for row in self.connection.execute(f"PRAGMA table_info({new_table})")]
+                    columns = ", ".join(c for c in new_columns if c in old_columns)
+                    self.connection.execute(f"INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table}")
+                    self.connection.execute(f"DROP TABLE {table}")
+                    self.connection.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+                # Os triggers do índice de busca e dos totais diários são removidos junto com a tabela antiga
+                self._create_search_index()
+                self._create_fuzzy_index()
+                self._create_activity_aggregates()
+                self._create_indexes()
+                self._create_duplicate_index()
+                self._create_entry_versions()
+                self._create_sync_log()
+                problems = self.connection.execute("PRAGMA foreign_key_check").fetchall()
+                if problems:
+                    logger.warning(f"Chaves estrangeiras inconsistentes após a migração: {problems[:5]}")
+        finally:
+            self.connection.execute("PRAGMA foreign_keys = ON")
+        logger.info(f"Tabelas recriadas com exclusão em cascata: {', '.join(tables)}")
+
+    def _ensure_column(self, table: str, column: str, definition: str):
+        columns = [row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def data_version(self):
+        """Identifica o estado dos dados; muda a cada escrita desta ou de outra conexão"""
+        version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        return (self.connection.total_changes, version)
+
     # Autenticação
     def user_exists(self, username: str) -> bool:
         result = self.connection.execute(
@@ -52,11 +908,68 @@ class DatabaseManager:
             return False
 
     def get_user_by_username(self, username: str):
+        """Busca uma conta ativa; contas desativadas (em exclusão) não são retornadas"""
         return self.connection.execute(
-            "SELECT id, username, password_hash, salt, theme FROM users WHERE username = ?",
+            "SELECT id, username, password_hash, salt, theme FROM users WHERE username = ? AND disabled = 0",
             (username,)
         ).fetchone()
 
+    def is_user_disabled(self, username: str) -> bool:
+        result = self.connection.execute(
+            "SELECT 1 FROM users WHERE username = ? AND disabled = 1", (username,)
+        ).fetchone()
+        return result is not None
+
+    def disable_user(self, user_id: int) -> bool:
+        """Desativa a conta de imediato; os dados são removidos depois, em lotes"""
+        try:
+            with self.connection:
+                self.connection.execute("UPDATE users SET disabled = 1 WHERE id = ?", (user_id,))
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao desativar usuário: {e}")
+            return False
+
+    def get_disabled_users(self):
+        return [row[0] for row in self.connection.execute("SELECT id FROM users WHERE disabled = 1")]
+
+    def count_user_entries(self, user_id: int) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM entries WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def delete_user_batch(self, user_id: int, batch_size: int = 200):
+        """
+        Exclui um lote de entradas de uma conta desativada (revisões, rascunhos e
+        índice de busca saem junto). Sem entradas restantes, exclui a própria conta.
+        Retorna quantas entradas foram excluídas (0 quando a conta foi removida) ou None em caso de erro
+        """
+        try:
+            with self.connection:
+                cursor = self.connection.execute(
+                    "DELETE FROM entries WHERE id IN (SELECT id FROM entries WHERE user_id = ? LIMIT ?)",
+                    (user_id, batch_size)
+                )
+                deleted = cursor.rowcount
+                if deleted == 0:
+                    self.connection.execute("DELETE FROM users WHERE id = ? AND disabled = 1", (user_id,))
+            return deleted
+        except Exception as e:
+            logger.error(f"Erro ao excluir entradas do usuário {user_id}: {e}")
+            return None
+
+    def update_user_theme(self, user_id: int, theme: str) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE users SET theme = ? WHERE id = ?",
+                    (theme, user_id)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao atualizar tema: {e}")
+            return False
+
     def update_user_password(self, user_id: int, new_hash: str, new_salt: str) -> bool:
         try:
             with self.connection:
@@ -70,25 +983,155 @@ class DatabaseManager:
             return False
 
     # CRUD de Entradas
-    def get_entries(self, user_id: int, search_term: str = ""):
+    def _entries_query(self, user_id: int, search_term: str = "", tags=None,
+                       start_date: str = None, end_date: str = None, ids=None):
+        """
+        Consulta da listagem: busca, tags (a entrada precisa ter todas) e
+        período combinados em um único SELECT
+        """
         query = '''
-            SELECT id, title, content, created_at, updated_at, favorite
+            SELECT id, title, content_text(content) AS content, created_at, updated_at, favorite
             FROM entries
             WHERE user_id = ?
         '''
         params = [user_id]
 
-        if search_term:
-            query += " AND (title LIKE ? OR content LIKE ?)"
+        if ids is not None:
+            query += " AND id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(ids)))
+        if start_date:
+            query += " AND created_at >= ?"
+            params.append(start_date)
+        if end_date:
+            # Inclui o dia final inteiro (created_at pode ter hora)
+            query += " AND created_at < date(?, '+1 day')"
+            params.append(end_date)
+
+        tags = [normalize_tag(tag) for tag in tags or ()]
+        if tags:
+            query += f'''
+                AND id IN (
+                    SELECT entry_tags.entry_id
+                    FROM tags JOIN entry_tags ON entry_tags.tag_id = tags.id
+                    WHERE tags.user_id = ? AND tags.name IN ({", ".join("?" * len(tags))})
+                    GROUP BY entry_tags.entry_id
+                    HAVING COUNT(*) = ?
+                )
+            '''
+            params.extend([user_id, *tags, len(tags)])
+
+        if search_term and self.search_ready() and len(search_term) >= 3:
+            # Com trigramas, uma frase casa com qualquer trecho do texto (sem diferenciar maiúsculas)
+            query += " AND id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)"
+            params.append('"' + search_term.replace('"', '""') + '"')
+        elif search_term:
+            query += " AND (title LIKE ? OR content_text(content) LIKE ?)"
             term = f"%{search_term}%"
             params.extend([term, term])
 
         query += " ORDER BY created_at DESC"
+        return query, params
 
+    def get_entries(self, user_id: int, search_term: str = "", tags=None,
+                    start_date: str = None, end_date: str = None):
+        query, params = self._entries_query(user_id, search_term, tags, start_date, end_date)
         return self.connection.execute(query, params).fetchall()
 
+    def get_entries_by_ids(self, user_id: int, entry_ids):
+        query, params = self._entries_query(user_id, ids=entry_ids)
+        return self.connection.execute(query, params).fetchall()
+
+    def fuzzy_search(self, user_id: int, search_term: str, tags=None,
+                     start_date: str = None, end_date: str = None, limit: int = 200):
+        """
+        Busca tolerante a acentos e erros de digitação. Cada palavra da busca
+        precisa ter alguma palavra semelhante na entrada; as entradas vêm
+        ordenadas pela soma das semelhanças (as mais parecidas primeiro)
+        """
+        query_words = fuzzy.words(search_term)
+        if not query_words or not self.fuzzy_ready():
+            return self.get_entries(user_id, search_term, tags, start_date, end_date)
+
+        # O vocabulário é de todos os usuários: só contam as palavras presentes nas entradas deste
+        user_entries = {entry_id for (entry_id,) in self.connection.execute(
+            "SELECT id FROM entries WHERE user_id = ?", (user_id,)
+        )}
+        scores = None
+        for word in query_words:
+            word_scores = {}
+            used_terms = 0
+            for term, score in self._similar_terms(word):
+                # Sem unir a entries: o planejador consultaria o FTS uma vez por entrada
+                rows = self.connection.execute(
+                    "SELECT rowid FROM entries_fuzzy WHERE entries_fuzzy MATCH ?", (fuzzy.fts_phrase(term),)
+                )
+                matched = False
+                for (entry_id,) in rows:
+                    if entry_id in user_entries:
+                        matched = True
+                        if score > word_scores.get(entry_id, 0):
+                            word_scores[entry_id] = score
+                used_terms += matched
+                if used_terms >= fuzzy.MAX_TERMS_PER_WORD:
+                    break
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {entry_id: total + word_scores[entry_id]
+                          for entry_id, total in scores.items() if entry_id in word_scores}
+            if not scores:
+                return []
+
+        query, params = self._entries_query(user_id, "", tags, start_date, end_date, ids=scores)
+        rows = self.connection.execute(query, params).fetchall()
+        # Estável: entre semelhanças iguais, mantém a ordem por data da consulta
+        rows.sort(key=lambda row: scores[row[0]], reverse=True)
+        return rows[:limit]
 
-    def create_entry(self, user_id: int, title: str, content: str, date: str = None) -> bool:
+    def _similar_terms(self, word: str):
+        """(palavra do vocabulário, semelhança) das mais parecidas com word"""
+        if len(word) <= fuzzy.EXACT_MAX_LENGTH:
+            return [(word, 1.0)]
+        word_trigrams = fuzzy.trigrams(word)
+        # Com menos trigramas em comum que isto, a semelhança não alcança o mínimo
+        min_shared = max(1, int(fuzzy.SIMILARITY_THRESHOLD * len(word_trigrams)))
+        rows = self.connection.execute(
+            f"""
+            SELECT term FROM fuzzy_trigrams
+            WHERE trigram IN ({", ".join("?" * len(word_trigrams))})
+            GROUP BY term HAVING COUNT(*) >= ?
+            """,
+            (*word_trigrams, min_shared)
+        )
+        candidates = []
+        for (term,) in rows:
+            score = fuzzy.similarity(word_trigrams, fuzzy.trigrams(term))
+            if score >= fuzzy.SIMILARITY_THRESHOLD:
+                candidates.append((term, score))
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:fuzzy.MAX_CANDIDATES_PER_WORD]
+
+    def iter_entries(self, user_id: int, search_term: str = "", limit: int = None,
+                     offset: int = 0, batch_size: int = 200, tags=None,
+                     start_date: str = None, end_date: str = None):
+        """Percorre as entradas em lotes, sem carregar a listagem inteira na memória"""
+        query, params = self._entries_query(user_id, search_term, tags, start_date, end_date)
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
+        cursor = self.connection.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
+    def create_entry(self, user_id: int, title: str, content: str, date: str = None):
+        """Cria uma entrada. Retorna o id da nova entrada ou False em caso de erro"""
         try:
             # Valida o formato da data se fornecido
             if date:
@@ -100,36 +1143,37 @@ class DatabaseManager:
 
             with self.connection:
                 if date:
-                    self.connection.execute(
+                    cursor = self.connection.execute(
                         "INSERT INTO entries (user_id, title, content, created_at) VALUES (?, ?, ?, ?)",
-                        (user_id, title, content, date)
+                        (user_id, title, compress_content(content), date)
                     )
                 else:
-                    self.connection.execute(
+                    cursor = self.connection.execute(
                         "INSERT INTO entries (user_id, title, content) VALUES (?, ?, ?)",
-                        (user_id, title, content)
+                        (user_id, title, compress_content(content))
                     )
-            return True
+            return cursor.lastrowid
         except Exception as e:
             logger.error(f"Erro ao criar entrada: {e}")
             return False
         
     def get_entry(self, entry_id: int, user_id: int):
          return self.connection.execute(
-             "SELECT id, title, content, created_at FROM entries WHERE id = ? AND user_id = ?",
+             "SELECT id, title, content_text(content), created_at FROM entries WHERE id = ? AND user_id = ?",
              (entry_id, user_id)
         ).fetchone()   
         
     def update_entry(self, entry_id: int, user_id: int, date: str, title: str, content: str) -> bool:
         try:
             with self.connection:
+                self._record_revision(entry_id, user_id, date, title, content)
                 self.connection.execute(
                     """
                     UPDATE entries
                     SET title = ?, content = ?, created_at = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE id = ? AND user_id = ?
                     """,
-                    (title, content, date, entry_id, user_id)
+                    (title, compress_content(content), date, entry_id, user_id)
                 )
             return True
         except Exception as e:
@@ -140,6 +1184,7 @@ class DatabaseManager:
     def delete_entry(self, entry_id: int, user_id: int) -> bool:
         try:
             with self.connection:
+                # Revisões e rascunhos da entrada saem em cascata
                 self.connection.execute(
                     "DELETE FROM entries WHERE id = ? AND user_id = ?", (entry_id, user_id)
                 )
@@ -147,7 +1192,517 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Erro ao excluir entrada: {e}")
             return False
-        
+
+    # Compressão do conteúdo
+    def compress_entries_batch(self, after_id: int = 0, batch_size: int = 200):
+        """
+        Comprime um lote de entradas gravadas antes da compressão.
+        Retorna o último id processado (para o próximo lote) ou None ao terminar
+        """
+        rows = self.connection.execute(
+            """
+            SELECT id, content FROM entries
+            WHERE id > ? AND typeof(content) = 'text' AND length(CAST(content AS BLOB)) >= ?
+            ORDER BY id LIMIT ?
+            """,
+            (after_id, COMPRESS_THRESHOLD, batch_size)
+        ).fetchall()
+        if not rows:
+            return None
+
+        updates = []
+        for entry_id, content in rows:
+            packed = compress_content(content)
+            if packed is not content:
+                updates.append((packed, entry_id))
+        try:
+            with self.connection:
+                self.connection.executemany("UPDATE entries SET content = ? WHERE id = ?", updates)
+        except Exception as e:
+            logger.error(f"Erro ao comprimir entradas: {e}")
+            return None
+        return rows[-1][0]
+
+    def signatures_batch(self, after_id: int = 0, batch_size: int = 100):
+        """
+        Calcula as assinaturas de um lote de entradas novas, alteradas ou
+        gravadas antes da detecção de duplicadas. Retorna o último id
+        processado ou None ao terminar
+        """
+        rows = self.connection.execute(
+            """
+            SELECT id, user_id, title, content FROM entries
+            WHERE id > ? AND id NOT IN (SELECT entry_id FROM entry_signatures)
+            ORDER BY id LIMIT ?
+            """,
+            (after_id, batch_size)
+        ).fetchall()
+        if not rows:
+            return None
+        # Calculadas fora da transação, para não segurar o banco enquanto isso
+        signatures = [dedup.minhash(f"{title} {decompress_content(content)}") for _, _, title, content in rows]
+        try:
+            with self.connection:
+                for (entry_id, user_id, title, content), signature in zip(rows, signatures):
+                    # Entrada editada depois da leitura: fica para o próximo lote
+                    cursor = self.connection.execute(
+                        """
+                        INSERT OR REPLACE INTO entry_signatures (entry_id, signature)
+                        SELECT id, ? FROM entries WHERE id = ? AND title IS ? AND content IS ?
+                        """,
+                        (signature, entry_id, title, content)
+                    )
+                    if cursor.rowcount != 1:
+                        continue
+                    self.connection.executemany(
+                        "INSERT OR IGNORE INTO entry_lsh (user_id, band, bucket, entry_id) VALUES (?, ?, ?, ?)",
+                        [(user_id, band, bucket, entry_id)
+                         for band, bucket in enumerate(dedup.lsh_buckets(signature))]
+                    )
+        except Exception as e:
+            logger.error(f"Erro ao calcular assinaturas das entradas: {e}")
+            return None
+        return rows[-1][0]
+
+    def has_pending_signatures(self, user_id: int) -> bool:
+        """Se há entradas do usuário ainda sem assinatura (novas ou alteradas)"""
+        return self.connection.execute(
+            "SELECT 1 FROM entries WHERE user_id = ? AND id NOT IN (SELECT entry_id FROM entry_signatures) LIMIT 1",
+            (user_id,)
+        ).fetchone() is not None
+
+    def find_duplicates(self, user_id: int, threshold: float = dedup.DUPLICATE_THRESHOLD):
+        """Grupos de entradas quase idênticas (listas de ids), dos maiores para os menores"""
+        buckets = [
+            [int(entry_id) for entry_id in members.split(',')]
+            for (members,) in self.connection.execute(
+                """
+                SELECT group_concat(entry_id) FROM entry_lsh
+                WHERE user_id = ?
+                GROUP BY band, bucket HAVING COUNT(*) > 1
+                """,
+                (user_id,)
+            )
+        ]
+        if not buckets:
+            return []
+        candidates = {entry_id for members in buckets for entry_id in members}
+        signatures = dict(self.connection.execute(
+            "SELECT entry_id, signature FROM entry_signatures WHERE entry_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(candidates)),)
+        ))
+        return dedup.clusters(buckets, signatures, threshold)
+
+    def merge_entries(self, user_id: int, keep_id: int, other_ids) -> bool:
+        """
+        Mantém keep_id e exclui as demais entradas, levando para ela as tags,
+        os anexos e a marcação de favorita das excluídas
+        """
+        others = json.dumps([entry_id for entry_id in other_ids if entry_id != keep_id])
+        try:
+            with self.connection:
+                owned = self.connection.execute(
+                    """
+                    SELECT COUNT(*) FROM entries
+                    WHERE user_id = ? AND (id = ? OR id IN (SELECT value FROM json_each(?)))
+                    """,
+                    (user_id, keep_id, others)
+                ).fetchone()[0]
+                if owned != len(json.loads(others)) + 1:
+                    raise ValueError("entradas não encontradas")
+                self.connection.execute(
+                    """
+                    INSERT OR IGNORE INTO entry_tags (entry_id, tag_id)
+                    SELECT ?, tag_id FROM entry_tags WHERE entry_id IN (SELECT value FROM json_each(?))
+                    """,
+                    (keep_id, others)
+                )
+                self.connection.execute(
+                    "UPDATE attachments SET entry_id = ? WHERE entry_id IN (SELECT value FROM json_each(?))",
+                    (keep_id, others)
+                )
+                self.connection.execute(
+                    """
+                    UPDATE entries SET favorite = 1
+                    WHERE id = ? AND EXISTS (
+                        SELECT 1 FROM entries WHERE favorite = 1 AND id IN (SELECT value FROM json_each(?))
+                    )
+                    """,
+                    (keep_id, others)
+                )
+                self.connection.execute(
+                    "DELETE FROM entries WHERE user_id = ? AND id IN (SELECT value FROM json_each(?))",
+                    (user_id, others)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao mesclar entradas: {e}")
+            return False
+
+    def delete_entries(self, user_id: int, entry_ids) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE user_id = ? AND id IN (SELECT value FROM json_each(?))",
+                    (user_id, json.dumps(list(entry_ids)))
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao excluir entradas: {e}")
+            return False
+
+    def compression_stats(self):
+        """Espaço ocupado pelo conteúdo das entradas, comprimido e original (em bytes)"""
+        total, compressed, stored, original = self.connection.execute(
+            """
+            SELECT COUNT(*),
+                   COALESCE(SUM(typeof(content) = 'blob'), 0),
+                   COALESCE(SUM(length(CAST(content AS BLOB))), 0),
+                   COALESCE(SUM(length(CAST(content_text(content) AS BLOB))), 0)
+            FROM entries
+            """
+        ).fetchone()
+        return {
+            'entries': total,
+            'compressed': compressed,
+            'stored_bytes': stored,
+            'original_bytes': original,
+            'saved_bytes': original - stored,
+        }
+
+    def compression_report(self) -> str:
+        stats = self.compression_stats()
+        ratio = stats['saved_bytes'] / stats['original_bytes'] * 100 if stats['original_bytes'] else 0
+        return (f"{stats['compressed']} de {stats['entries']} entradas comprimidas; "
+                f"{stats['original_bytes'] / 1024:.1f} KB de texto ocupam {stats['stored_bytes'] / 1024:.1f} KB "
+                f"({stats['saved_bytes'] / 1024:.1f} KB, {ratio:.0f}% economizados)")
+
+    # Revisões
+    def _record_revision(self, entry_id: int, user_id: int, date: str, title: str, content: str):
+        """
+        Guarda a versão atual da entrada antes de ela ser sobrescrita.
+        Deve ser chamado dentro da transação da atualização
+        """
+        current = self.connection.execute(
+            "SELECT title, content_text(content), created_at FROM entries WHERE id = ? AND user_id = ?",
+            (entry_id, user_id)
+        ).fetchone()
+        if current is None:
+            return
+        old_title, old_content, old_date = current
+        if (old_title, old_content, old_date) == (title, content, date):
+            return
+
+        last = self.connection.execute(
+            "SELECT MAX(revision) FROM revisions WHERE entry_id = ?", (entry_id,)
+        ).fetchone()[0]
+        revision = (last or 0) + 1
+        kind, data = revisions.encode_revision(old_content, content, revisions.is_snapshot(revision))
+        self.connection.execute(
+            "INSERT INTO revisions (entry_id, revision, kind, title, entry_date, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (entry_id, revision, kind, old_title, old_date, data)
+        )
+
+    def get_revisions(self, entry_id: int, user_id: int):
+        """Lista as versões anteriores: (revisão, título, data da entrada, gravada em, tamanho)"""
+        return self.connection.execute(
+            """
+            SELECT r.revision, r.title, r.entry_date, r.created_at, length(r.data)
+            FROM revisions r JOIN entries e ON e.id = r.entry_id
+            WHERE r.entry_id = ? AND e.user_id = ?
+            ORDER BY r.revision DESC
+            """,
+            (entry_id, user_id)
+        ).fetchall()
+
+    def get_revision(self, entry_id: int, user_id: int, revision: int):
+        """Reconstrói uma versão anterior. Retorna (título, conteúdo, data da entrada) ou None"""
+        entry = self.get_entry(entry_id, user_id)
+        if entry is None:
+            return None
+
+        # Revisões da pedida até a primeira cópia completa (ou até a mais recente)
+        chain = []
+        cursor = self.connection.execute(
+            "SELECT revision, kind, title, entry_date, data FROM revisions WHERE entry_id = ? AND revision >= ? ORDER BY revision",
+            (entry_id, revision)
+        )
+        for row in cursor:
+            chain.append(row)
+            if row[1] == revisions.KIND_FULL:
+                break
+        cursor.close()
+        if not chain or chain[0][0] != revision:
+            return None
+
+        # Aplica as diferenças da mais nova para a mais antiga
+        content = entry[2]
+        for _, kind, _, _, data in reversed(chain):
+            content = revisions.decode_revision(kind, data, content)
+        _, _, title, entry_date, _ = chain[0]
+        return title, content, entry_date
+
+    def restore_revision(self, entry_id: int, user_id: int, revision: int) -> bool:
+        """Volta a entrada para uma versão anterior; a versão atual vira uma nova revisão"""
+        old = self.get_revision(entry_id, user_id, revision)
+        if old is None:
+            logger.warning(f"Revisão {revision} da entrada {entry_id} não encontrada")
+            return False
+        title, content, entry_date = old
+        return self.update_entry(entry_id, user_id, entry_date, title, content)
+
+    # Rascunhos
+    @staticmethod
+    def draft_key(user_id: int, entry_id: int = None) -> str:
+        return f"{user_id}:{entry_id if entry_id else 'new'}"
+
+    def save_draft(self, user_id: int, entry_id: int, title: str, content: str, entry_date: str = None) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    """
+                    INSERT INTO drafts (draft_key, user_id, entry_id, title, content, entry_date, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(draft_key) DO UPDATE SET
+                        title = excluded.title,
+                        content = excluded.content,
+                        entry_date = excluded.entry_date,
+                        updated_at = CURRENT_TIMESTAMP
+                    """,
+                    (self.draft_key(user_id, entry_id), user_id, entry_id or None, title, content, entry_date)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar rascunho: {e}")
+            return False
+
+    def get_draft(self, user_id: int, entry_id: int = None):
+        return self.connection.execute(
+            "SELECT entry_id, title, content, entry_date, updated_at FROM drafts WHERE draft_key = ?",
+            (self.draft_key(user_id, entry_id),)
+        ).fetchone()
+
+    def get_drafts(self, user_id: int):
+        return self.connection.execute(
+            "SELECT entry_id, title, content, entry_date, updated_at FROM drafts WHERE user_id = ? ORDER BY updated_at DESC",
+            (user_id,)
+        ).fetchall()
+
+    def delete_draft(self, user_id: int, entry_id: int = None) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM drafts WHERE draft_key = ?", (self.draft_key(user_id, entry_id),)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao excluir rascunho: {e}")
+            return False
+
+    def delete_drafts(self, user_id: int) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM drafts WHERE user_id = ?", (user_id,))
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao excluir rascunhos: {e}")
+            return False
+
+    def promote_draft(self, user_id: int, entry_id: int, title: str, content: str, date: str, tags=None):
+        """
+        Grava o rascunho como entrada (nova ou existente) e o remove, na mesma transação.
+        Se tags for informado, as tags da entrada também são substituídas.
+        Retorna o id da entrada ou False em caso de erro
+        """
+        key = self.draft_key(user_id, entry_id)
+        try:
+            with self.connection:
+                if entry_id:
+                    self._record_revision(entry_id, user_id, date, title, content)
+                    cursor = self.connection.execute(
+                        """
+                        UPDATE entries
+                        SET title = ?, content = ?, created_at = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND user_id = ?
+                        """,
+                        (title, compress_content(content), date, entry_id, user_id)
+                    )
+                    if cursor.rowcount == 0:
+                        raise sqlite3.IntegrityError(f"entrada {entry_id} não encontrada")
+                else:
+                    cursor = self.connection.execute(
+                        "INSERT INTO entries (user_id, title, content, created_at) VALUES (?, ?, ?, ?)",
+                        (user_id, title, compress_content(content), date)
+                    )
+                    entry_id = cursor.lastrowid
+                if tags is not None:
+                    self._set_entry_tags(entry_id, user_id, tags)
+                self.connection.execute("DELETE FROM drafts WHERE draft_key = ?", (key,))
+            return entry_id
+        except Exception as e:
+            logger.error(f"Erro ao gravar rascunho: {e}")
+            return False
+
+    # Tags
+    def _set_entry_tags(self, entry_id: int, user_id: int, tags):
+        """Substitui as tags da entrada; deve rodar dentro de uma transação"""
+        names = []
+        for tag in tags:
+            name = normalize_tag(tag)
+            if name and name not in names:
+                names.append(name)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO tags (user_id, name) VALUES (?, ?)",
+            [(user_id, name) for name in names]
+        )
+        placeholders = ", ".join("?" * len(names))
+        # Só os vínculos que mudaram são removidos ou criados: os triggers ajustam as contagens
+        self.connection.execute(
+            f"""
+            DELETE FROM entry_tags WHERE entry_id = ? AND tag_id NOT IN (
+                SELECT id FROM tags WHERE user_id = ? AND name IN ({placeholders})
+            )
+            """,
+            (entry_id, user_id, *names)
+        )
+        self.connection.execute(
+            f"""
+            INSERT OR IGNORE INTO entry_tags (entry_id, tag_id)
+            SELECT ?, id FROM tags WHERE user_id = ? AND name IN ({placeholders})
+            """,
+            (entry_id, user_id, *names)
+        )
+
+    def set_entry_tags(self, entry_id: int, user_id: int, tags) -> bool:
+        try:
+            with self.connection:
+                owner = self.connection.execute(
+                    "SELECT 1 FROM entries WHERE id = ? AND user_id = ?", (entry_id, user_id)
+                ).fetchone()
+                if not owner:
+                    return False
+                self._set_entry_tags(entry_id, user_id, tags)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar tags da entrada {entry_id}: {e}")
+            return False
+
+    def get_entry_tags(self, entry_id: int, user_id: int):
+        return [row[0] for row in self.connection.execute(
+            """
+            SELECT tags.name
+            FROM entry_tags JOIN tags ON tags.id = entry_tags.tag_id
+            WHERE entry_tags.entry_id = ? AND tags.user_id = ?
+            ORDER BY tags.name
+            """,
+            (entry_id, user_id)
+        )]
+
+    def get_tags(self, user_id: int):
+        """(nome, quantidade de entradas) das tags em uso, lidos das contagens mantidas pelos triggers"""
+        return self.connection.execute(
+            "SELECT name, entry_count FROM tags WHERE user_id = ? AND entry_count > 0 ORDER BY name",
+            (user_id,)
+        ).fetchall()
+
+    # Anexos
+    def add_attachment(self, entry_id: int, user_id: int, path: str, filename: str = None):
+        """
+        Anexa o arquivo à entrada. O conteúdo é gravado em blocos com blobopen,
+        e só se ainda não existir um igual (mesmo sha256).
+        Retorna o id do anexo ou False em caso de erro
+        """
+        filename = filename or os.path.basename(path)
+        try:
+            digest, size = attachments.file_digest(path)
+            if size > self.connection.getlimit(sqlite3.SQLITE_LIMIT_LENGTH):
+                raise ValueError(f"arquivo grande demais ({size} bytes)")
+            with self.connection:
+                owner = self.connection.execute(
+                    "SELECT 1 FROM entries WHERE id = ? AND user_id = ?", (entry_id, user_id)
+                ).fetchone()
+                if not owner:
+                    raise ValueError(f"entrada {entry_id} não encontrada")
+                row = self.connection.execute("SELECT id FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+                if row:
+                    blob_id = row[0]
+                else:
+                    blob_id = self.connection.execute(
+                        "INSERT INTO blobs (sha256, size, data) VALUES (?, ?, zeroblob(?))",
+                        (digest, size, size)
+                    ).lastrowid
+                    self._write_blob(blob_id, path, digest, size)
+                cursor = self.connection.execute(
+                    "INSERT INTO attachments (entry_id, blob_id, filename, mime_type) VALUES (?, ?, ?, ?)",
+                    (entry_id, blob_id, filename, attachments.guess_mime_type(filename))
+                )
+            return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"Erro ao anexar {path}: {e}")
+            return False
+
+    def _write_blob(self, blob_id: int, path: str, digest: str, size: int):
+        """Copia o arquivo para o BLOB já reservado (zeroblob), conferindo que ele não mudou"""
+        check = hashlib.sha256()
+        written = 0
+        with open(path, 'rb') as f, self.connection.blobopen('blobs', 'data', blob_id) as blob:
+            for chunk in iter(lambda: f.read(attachments.CHUNK_SIZE), b''):
+                if written + len(chunk) > size:
+                    raise ValueError("o arquivo mudou durante a cópia")
+                blob.write(chunk)
+                check.update(chunk)
+                written += len(chunk)
+        if written != size or check.hexdigest() != digest:
+            raise ValueError("o arquivo mudou durante a cópia")
+
+    def get_attachments(self, entry_id: int, user_id: int):
+        """(id, blob_id, nome, tipo, tamanho, sha256) dos anexos da entrada"""
+        return self.connection.execute(
+            """
+            SELECT attachments.id, blobs.id, attachments.filename, attachments.mime_type, blobs.size, blobs.sha256
+            FROM attachments
+            JOIN entries ON entries.id = attachments.entry_id
+            JOIN blobs ON blobs.id = attachments.blob_id
+            WHERE attachments.entry_id = ? AND entries.user_id = ?
+            ORDER BY attachments.id
+            """,
+            (entry_id, user_id)
+        ).fetchall()
+
+    def open_blob(self, blob_id: int):
+        """Abre o conteúdo de um anexo para leitura incremental (read/seek); use com 'with'"""
+        return self.connection.blobopen('blobs', 'data', blob_id, readonly=True)
+
+    def delete_attachment(self, attachment_id: int, user_id: int) -> bool:
+        try:
+            with self.connection:
+                cursor = self.connection.execute(
+                    """
+                    DELETE FROM attachments
+                    WHERE id = ? AND entry_id IN (SELECT id FROM entries WHERE user_id = ?)
+                    """,
+                    (attachment_id, user_id)
+                )
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Erro ao excluir anexo {attachment_id}: {e}")
+            return False
+
+    def get_thumbnail(self, blob_id: int):
+        row = self.connection.execute("SELECT data FROM thumbnails WHERE blob_id = ?", (blob_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_thumbnail(self, blob_id: int, data: bytes) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO thumbnails (blob_id, data) VALUES (?, ?)", (blob_id, data)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar miniatura: {e}")
+            return False
+
     def update_username(self, user_id: int, new_username: str) -> bool:
         try:
             with self.connection:
@@ -166,7 +1721,7 @@ class DatabaseManager:
     def delete_user(self, user_id: int) -> bool:
         try:
             with self.connection:
-                self.connection.execute("DELETE FROM entries WHERE user_id = ?", (user_id,))
+                # Entradas, revisões e rascunhos saem em cascata
                 self.connection.execute("DELETE FROM users WHERE id = ?", (user_id,))
             return True
         except Exception as e:
@@ -175,14 +1730,80 @@ class DatabaseManager:
         
     def get_entries_by_user_id(self, user_id: int):
         return self.connection.execute(
-            "SELECT id, created_at, title, content FROM entries WHERE user_id = ? ORDER BY created_at ASC",
+            "SELECT id, created_at, title, content_text(content) FROM entries WHERE user_id = ? ORDER BY created_at ASC",
             (user_id,)
         ).fetchall()
 
+    def get_daily_activity(self, user_id: int, start_date: str = None, end_date: str = None):
+        """Totais por dia: (dia, entradas, palavras, caracteres), do mais antigo ao mais recente"""
+        query = "SELECT day, entry_count, word_count, char_count FROM daily_activity WHERE user_id = ?"
+        params = [user_id]
+        if start_date:
+            query += " AND day >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND day <= ?"
+            params.append(end_date)
+        query += " ORDER BY day"
+        return self.connection.execute(query, params).fetchall()
+
+    @staticmethod
+    def _on_this_day_params(user_id: int, day: str = None):
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        # Limite como data completa: '2024' sozinho viraria número pela afinidade NUMERIC da coluna
+        return (user_id, day[5:10], f"{day[:4]}-01-01")
+
+    def get_entries_on_this_day(self, user_id: int, day: str = None, limit: int = -1, preview_chars: int = 160):
+        """
+        Entradas de anos anteriores no mesmo dia e mês de day (padrão: hoje),
+        das mais recentes às mais antigas, com só o início do conteúdo
+        """
+        return self.connection.execute(
+            """
+            SELECT id, title, substr(content_text(content), 1, ?), created_at
+            FROM entries
+            WHERE user_id = ? AND strftime('%m-%d', created_at) = ? AND created_at < ?
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (preview_chars, *self._on_this_day_params(user_id, day), limit)
+        ).fetchall()
+
+    def count_entries_on_this_day(self, user_id: int, day: str = None) -> int:
+        return self.connection.execute(
+            """
+            SELECT COUNT(*) FROM entries
+            WHERE user_id = ? AND strftime('%m-%d', created_at) = ? AND created_at < ?
+            """,
+            self._on_this_day_params(user_id, day)
+        ).fetchone()[0]
+
+    def get_stats_key(self, user_id: int):
+        """Versão das entradas do usuário; muda sempre que elas mudam"""
+        row = self.connection.execute(
+            "SELECT version FROM entry_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def iter_entry_texts(self, user_id: int, batch_size: int = 500):
+        """(created_at, conteúdo) de todas as entradas, da mais antiga à mais recente, em lotes"""
+        cursor = self.connection.execute(
+            "SELECT created_at, content_text(content) FROM entries WHERE user_id = ? ORDER BY created_at, id",
+            (user_id,)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
     def get_entries_by_date_range(self, user_id: int, start_date: str, end_date: str):
         return self.connection.execute(
             """
-            SELECT id, created_at, title, content
+            SELECT id, created_at, title, content_text(content)
             FROM entries
             WHERE user_id = ? AND date(created_at) BETWEEN date(?) AND date(?)
             ORDER BY created_at ASC
@@ -192,7 +1813,7 @@ class DatabaseManager:
 
     def get_favorite_entries(self, user_id: int):
         return self.connection.execute(
-            "SELECT id, created_at, title, content FROM entries WHERE user_id = ? AND favorite = 1 ORDER BY created_at ASC",
+            "SELECT id, created_at, title, content_text(content) FROM entries WHERE user_id = ? AND favorite = 1 ORDER BY created_at ASC",
             (user_id,)
         ).fetchall()
 
@@ -0,0 +1,103 @@
+"""
+Detecção de entradas quase idênticas (MinHash + LSH).
+
+Cada entrada tem uma assinatura MinHash dos seus trechos de três palavras
+(texto sem acentos, ver fuzzy.py): a fração de posições iguais entre duas
+assinaturas estima a semelhança de Jaccard entre os textos. A assinatura é
+dividida em faixas (bands); entradas com uma faixa idêntica caem no mesmo
+balde e viram candidatas, e só os pares candidatos são comparados, em vez
+de todos contra todos. Assinaturas e baldes são calculados na thread de
+escrita (ver DatabaseManager.signatures_batch).
+"""
+import heapq
+import random
+import struct
+import zlib
+
+import fuzzy
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+# Em textos longos, a assinatura usa só os trechos de menor hash (amostra consistente
+# entre entradas, que preserva a estimativa de semelhança) e o custo fica limitado
+MAX_SHINGLES = 5000
+# Semelhança estimada a partir da qual duas entradas são consideradas duplicadas
+DUPLICATE_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+# Semente fixa: as assinaturas gravadas precisam continuar comparáveis entre execuções
+_random = random.Random(0x6d696e68)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_FORMAT = f'<{NUM_HASHES}I'
+
+
+def shingles(text: str) -> set:
+    words = fuzzy.WORD_RE.findall(fuzzy.fold(text or ""))
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """Assinatura MinHash do texto (BLOB), ou None se ele não tiver palavras"""
+    hashes = {zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)}
+    if not hashes:
+        return None
+    if len(hashes) > MAX_SHINGLES:
+        hashes = heapq.nsmallest(MAX_SHINGLES, hashes)
+    values = [min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMUTATIONS]
+    return struct.pack(_FORMAT, *values)
+
+
+def lsh_buckets(signature) -> list:
+    """Balde de cada faixa da assinatura (a posição na lista é a faixa)"""
+    if not signature:
+        return []
+    size = ROWS_PER_BAND * 4
+    return [zlib.crc32(signature[i * size:(i + 1) * size]) for i in range(BANDS)]
+
+
+def similarity(signature_a, signature_b) -> float:
+    a = struct.unpack(_FORMAT, signature_a)
+    b = struct.unpack(_FORMAT, signature_b)
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def clusters(buckets, signatures, threshold=DUPLICATE_THRESHOLD) -> list:
+    """
+    Agrupa as entradas duplicadas. buckets: listas de ids que dividem um
+    balde; signatures: {id: assinatura}. Cada membro de um balde é comparado
+    apenas ao primeiro dele, e os pares confirmados são unidos (union-find).
+    Retorna os grupos (listas de ids ordenadas), dos maiores para os menores.
+    """
+    parent = {}
+
+    def find(entry_id):
+        root = entry_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while entry_id != root:
+            parent[entry_id], entry_id = root, parent[entry_id]
+        return root
+
+    checked = set()
+    for members in buckets:
+        first = members[0]
+        for other in members[1:]:
+            pair = (first, other)
+            if pair in checked or find(first) == find(other):
+                continue
+            checked.add(pair)
+            if similarity(signatures[first], signatures[other]) >= threshold:
+                parent[find(other)] = find(first)
+
+    groups = {}
+    for entry_id in list(parent):
+        groups.setdefault(find(entry_id), set()).add(entry_id)
+    result = [sorted(group | {root}) for root, group in groups.items()]
+    result = [group for group in result if len(group) > 1]
+    result.sort(key=lambda group: (-len(group), group[0]))
+    return result
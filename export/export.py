@@ -1,21 +1,16 @@
 import os
-from fpdf import FPDF
-from datetime import datetime
 from tkinter import filedialog, messagebox
 import webbrowser
+from export.formatters import build_pdf, format_date, render_txt
 
 class ExportManager:
-    def __init__(self, entries, username):
+    def __init__(self, entries, username, attachments=None):
         self.entries = entries
         self.username = username
+        self.attachments = attachments  # AttachmentReader, para incorporar anexos no PDF
 
     def format_date(self, date_str):
-        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
-            try:
-                return datetime.strptime(date_str, fmt).strftime('%d/%m/%Y')
-            except ValueError:
-                continue
-        return date_str
+        return format_date(date_str)
 
     def save_file(self, default_name, extension, filetypes):
         return filedialog.asksaveasfilename(
@@ -34,42 +29,7 @@ class ExportManager:
             messagebox.showwarning("Aviso", "Nenhuma entrada para exportar.")
             return False
 
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-
-        # Cabeçalho
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, f"Diário Digital - {self.username}", 0, 1, 'C')
-        pdf.ln(10)
-
-        # Conteúdo das entradas
-        pdf.set_font("Arial", size=12)
-        
-        for i, entry in enumerate(self.entries):
-            _, date, title, content = entry
-            formatted_date = self.format_date(date)
-            
-            # Verificar se precisa quebrar página
-            if pdf.get_y() > 250:
-                pdf.add_page()
-            
-            # Data
-            pdf.cell(0, 8, f"Data: {formatted_date}", 0, 1)
-            
-            # Título
-            pdf.cell(0, 8, f"Título: {title}", 0, 1)
-            
-            # Conteúdo
-            pdf.cell(0, 8, f"Conteúdo: {content}", 0, 1)
-            
-            # Linha separadora (apenas se não for a última entrada)
-            if i < len(self.entries) - 1:
-                pdf.ln(3)  # Pequeno espaço antes da linha
-                pdf.cell(0, 5, "---------------------------", 0, 1)
-                pdf.ln(5)  # Espaço após a linha
-            else:
-                pdf.ln(8)  # Espaço final se for a última entrada
+        pdf = build_pdf(self.entries, self.username, self.attachments)
 
         file_path = self.save_file(f"diario_{self.username}.pdf", ".pdf", [("PDF Files", "*.pdf")])
         if file_path:
@@ -87,11 +47,7 @@ class ExportManager:
             messagebox.showwarning("Aviso", "Nenhuma entrada para exportar.")
             return False
 
-        content = f"Diário Digital - {self.username}\n{'='*50}\n\n"
-        for entry in self.entries:
-            _, date, title, text = entry
-            formatted_date = self.format_date(date)
-            content += f"Data: {formatted_date}\nTítulo: {title}\nConteúdo: {text}\n\n{'-'*50}\n\n"
+        content = render_txt(self.entries, self.username)
 
         file_path = self.save_file(f"diario_{self.username}.txt", ".txt", [("Text Files", "*.txt")])
         if file_path:
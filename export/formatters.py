@@ -0,0 +1,100 @@
+from datetime import datetime
+
+# Geração do conteúdo exportado, independente de tkinter para poder ser
+# usada também pelo servidor da API.
+
+
+def format_date(date_str):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(date_str, fmt).strftime('%d/%m/%Y')
+        except ValueError:
+            continue
+    return date_str
+
+
+def txt_header(username):
+    return f"Diário Digital - {username}\n{'='*50}\n\n"
+
+
+def txt_entry(entry):
+    _, date, title, text = entry
+    formatted_date = format_date(date)
+    return f"Data: {formatted_date}\nTítulo: {title}\nConteúdo: {text}\n\n{'-'*50}\n\n"
+
+
+def iter_txt(entries, username):
+    """Gera o TXT em partes, uma por entrada"""
+    yield txt_header(username)
+    for entry in entries:
+        yield txt_entry(entry)
+
+
+def render_txt(entries, username):
+    return "".join(iter_txt(entries, username))
+
+
+def build_pdf(entries, username, attachments=None):
+    """
+    Monta o documento PDF das entradas (requer fpdf). Com um AttachmentReader
+    em attachments, as imagens anexadas são incorporadas e os demais anexos
+    listados pelo nome.
+    """
+    from fpdf import FPDF
+    from attachments import PDF_IMAGE_TYPES
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # Cabeçalho
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, f"Diário Digital - {username}", 0, 1, 'C')
+    pdf.ln(10)
+
+    # Conteúdo das entradas
+    pdf.set_font("Arial", size=12)
+
+    for i, entry in enumerate(entries):
+        _, date, title, content = entry
+        formatted_date = format_date(date)
+
+        # Verificar se precisa quebrar página
+        if pdf.get_y() > 250:
+            pdf.add_page()
+
+        # Data
+        pdf.cell(0, 8, f"Data: {formatted_date}", 0, 1)
+
+        # Título
+        pdf.cell(0, 8, f"Título: {title}", 0, 1)
+
+        # Conteúdo
+        pdf.cell(0, 8, f"Conteúdo: {content}", 0, 1)
+
+        # Anexos: cada um é copiado em blocos para um arquivo temporário lido pelo fpdf
+        for attachment in (attachments.list(entry[0]) if attachments else ()):
+            _, _, filename, mime_type, size, _ = attachment
+            if mime_type in PDF_IMAGE_TYPES:
+                with attachments.temp_file(attachment) as path:
+                    pdf.image(path, w=80)
+            else:
+                pdf.cell(0, 8, f"Anexo: {filename} ({size / 1024:.0f} KB)", 0, 1)
+
+        # Linha separadora (apenas se não for a última entrada)
+        if i < len(entries) - 1:
+            pdf.ln(3)  # Pequeno espaço antes da linha
+            pdf.cell(0, 5, "---------------------------", 0, 1)
+            pdf.ln(5)  # Espaço após a linha
+        else:
+            pdf.ln(8)  # Espaço final se for a última entrada
+
+    return pdf
+
+
+def render_pdf(entries, username, attachments=None):
+    """Retorna o PDF como bytes"""
+    data = build_pdf(entries, username, attachments).output(dest='S')
+    if isinstance(data, str):  # PyFPDF 1.x retorna str latin-1
+        data = data.encode('latin-1')
+    return bytes(data)
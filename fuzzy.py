@@ -0,0 +1,64 @@
+"""
+Busca aproximada: tolera acentos ("reuniao" acha "reunião") e erros de
+digitação.
+
+O texto é normalizado (minúsculas, sem acentos) ao indexar e ao buscar.
+Cada palavra distinta do vocabulário é indexada pelos seus trigramas; uma
+palavra da busca é comparada às palavras do vocabulário que compartilham
+trigramas com ela, e a semelhança é a razão entre os trigramas em comum e
+o total dos dois conjuntos (como o pg_trgm do PostgreSQL).
+"""
+import json
+import re
+import unicodedata
+
+WORD_RE = re.compile(r"[^\W_]+")
+# Semelhança mínima para uma palavra do vocabulário valer como resultado
+SIMILARITY_THRESHOLD = 0.3
+# Palavras do vocabulário (presentes nas entradas do usuário) consideradas para cada palavra da busca
+MAX_TERMS_PER_WORD = 10
+# Candidatas examinadas por palavra: o vocabulário é compartilhado e as de outros usuários são descartadas
+MAX_CANDIDATES_PER_WORD = 200
+# Palavras até este tamanho só são buscadas exatamente (trigramas demais em comum com tudo)
+EXACT_MAX_LENGTH = 2
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos: 'Reunião' -> 'reuniao'"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text: str) -> list:
+    """Palavras distintas do texto normalizado, na ordem em que aparecem"""
+    if not text:
+        return []
+    return list(dict.fromkeys(WORD_RE.findall(fold(text))))
+
+
+def fold_text(text) -> str:
+    """Texto indexado no FTS: as palavras distintas, separadas por espaço"""
+    return " ".join(words(text))
+
+
+def fold_terms(text) -> str:
+    """Palavras distintas como array JSON, para uso com json_each nos triggers"""
+    return json.dumps(words(text))
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def term_trigrams(term: str) -> str:
+    return json.dumps(sorted(trigrams(term)))
+
+
+def similarity(a: set, b: set) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
@@ -0,0 +1,115 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+DEFAULT_LOGGING = {
+    'level': 'INFO',
+    'file': 'diary_app.log',
+    'max_bytes': 5 * 1024 * 1024,
+    'backup_count': 3,
+    'format': 'text',  # text | json
+    'console': True,
+    'levels': {},  # {nome_do_modulo: nivel}
+}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como um objeto JSON por linha"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """QueueHandler que preserva o traceback separado da mensagem"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def setup_logging(config=None):
+    """
+    Configura o logging assíncrono da aplicação.
+
+    Os registros são apenas enfileirados na thread que os emite; um
+    QueueListener em segundo plano grava no arquivo rotativo e no console.
+    Retorna o listener ativo.
+    """
+    global _listener
+
+    options = dict(DEFAULT_LOGGING)
+    options.update(config or {})
+
+    if _listener is not None:
+        _listener.stop()
+
+    if options['format'] == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    handlers = []
+    if options['file']:
+        file_handler = RotatingFileHandler(
+            options['file'],
+            maxBytes=options['max_bytes'],
+            backupCount=options['backup_count'],
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if options['console']:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_PreparedQueueHandler(log_queue))
+    root_logger.setLevel(options['level'].upper())
+
+    for name, level in options['levels'].items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Esvazia a fila e encerra o listener de logging"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,42 +1,54 @@
+from startup import StartupReport
+
+# Inicia a medição antes dos demais imports para incluí-los no relatório
+STARTUP = StartupReport.begin()
+
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, ttk
+import argparse
 import logging
 import sys
 import os
+import threading
 from pathlib import Path
-from ui.main_ui import MainUI
-
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('diary_app.log'),
-        logging.StreamHandler()
-    ]
-)
+from log_config import setup_logging
+from settings import Settings
+
+
 logger = logging.getLogger(__name__)
 
 class DiaryApp:
     """Aplicação principal do Diário Digital"""
     
-    def __init__(self, root):
+    def __init__(self, root, profiler=None, startup=None, settings=None):
         self.root = root
+        self.settings = settings or Settings()
+        self.profiler = profiler
+        self.startup = startup or StartupReport()
         self.current_user = None
         self.main_ui = None
+        self.backups = None
+        self.maintenance = None
+        self.sync_folder = None
+        self.pending_commands = []  # Comandos recebidos antes do login
         
         # Configurações da janela principal
-        self._setup_window()
+        with self.startup.phase("Configuração da janela"):
+            self._setup_window()
         
         # Inicializa gerenciadores
-        self._initialize_managers()
+        with self.startup.phase("Inicialização dos gerenciadores"):
+            self._initialize_managers()
         
         # Configurações adicionais
         self._setup_event_handlers()
         
         # Mostra a tela de login
-        self._show_login()
+        with self.startup.phase("Tela de login"):
+            self._show_login()
+        
+        # Trabalho adiado para depois do primeiro frame
+        self.root.after_idle(self._after_first_frame)
         
         logger.info("Aplicação inicializada com sucesso")
 
@@ -74,23 +86,29 @@ class DiaryApp:
         """Inicializa todos os gerenciadores necessários"""
         try:
             from database import DatabaseManager
+            from background import BackgroundWriter
             from themes import ThemeManager
             from auth import AuthManager
             
-            self.db = DatabaseManager()
-            self.theme_manager = ThemeManager(self.root)
+            # A conexão com o banco só é aberta no primeiro uso
+            self.db = DatabaseManager(lazy=True)
+            self.writer = BackgroundWriter(self.db.db_name)
             
-            # Aplica tema salvo ou padrão
+            # Aplica tema salvo ou padrão (apenas os estilos desse tema são criados)
             saved_theme = self._get_saved_theme()
-            self.theme_manager.apply_theme(saved_theme)
+            self.theme_manager = ThemeManager(self.root, theme=saved_theme, settings=self.settings)
             
             self.auth = AuthManager(
                 db=self.db,
                 theme_manager=self.theme_manager,
                 on_login_success=self.show_main_ui,
-                root=self.root
+                root=self.root,
+                writer=self.writer
             )
             
+            if self.profiler:
+                self.profiler.instrument(self.auth, 'login')
+            
         except ImportError as e:
             logger.error(f"Erro ao importar módulos: {e}")
             self._show_error("Erro de Inicialização", 
@@ -104,12 +122,102 @@ class DiaryApp:
 
     def _get_saved_theme(self):
         """Recupera o tema salvo ou retorna o padrão"""
+        # Último tema usado, gravado nas configurações locais a cada troca/login
+        theme = self.settings.get('theme', 'light')
+        return theme if isinstance(theme, str) and theme else "light"
+
+    def _after_first_frame(self):
+        """
+        Executa após o primeiro frame, na thread do Tk: registra o tempo, abre
+        o banco e agenda o trabalho da thread de escrita. A abertura é rápida:
+        a migração de bancos antigos roda antes da janela (migrate_database) e
+        os índices e totais derivados das entradas são preenchidos em lotes
+        """
+        self.startup.mark_first_frame()
         try:
-            # Aqui você pode implementar a lógica para recuperar o tema salvo
-            # Por exemplo, de um arquivo de configuração ou banco de dados
-            return "light"  # Tema padrão
-        except Exception:
-            return "light"
+            with self.startup.phase("Abertura do banco de dados"):
+                self.db.open()
+        except Exception as e:
+            logger.error(f"Erro ao abrir o banco de dados: {e}")
+        self.startup.finish()
+        self._start_compression()
+        self._start_search_index()
+        self._start_activity()
+        self._start_fuzzy_index()
+        self._start_sync_log()
+        self._start_signatures()
+        self._resume_account_deletions()
+        self._start_backups()
+        self._start_maintenance()
+        self._start_sync()
+
+    def _start_maintenance(self):
+        """Manutenção do banco nos períodos de ociosidade (seção "maintenance" das configurações)"""
+        if not self.settings.get('maintenance.enabled', True):
+            return
+        from maintenance import MaintenanceScheduler
+        self.maintenance = MaintenanceScheduler(self.root, self.writer, self.settings).start()
+
+    def _start_sync(self):
+        """Sincroniza com a pasta compartilhada da seção "sync" das configurações (ver sync.py)"""
+        if not self.settings.get('sync.enabled', False):
+            return
+        self.sync_folder = self.settings.get('sync.folder')
+        if not self.sync_folder:
+            logger.warning("Sincronização ativada sem sync.folder configurado")
+            return
+        self._submit_sync()
+
+    def _submit_sync(self):
+        from sync import SyncManager, local_device_id
+        self.writer.submit(('sync',), lambda db, device, folder: SyncManager(db, device).sync_folder(folder),
+                           local_device_id(self.settings, self.db.db_name), self.sync_folder)
+
+    def _start_backups(self):
+        """Agenda as cópias de segurança (seção "backup" de diario_settings.json)"""
+        if not self.settings.get('backup.enabled', True):
+            return
+        from backup import BackupManager
+        self.backups = BackupManager.from_settings(self.settings, self.db.db_name)
+        self.backups.start_schedule()
+
+    def _start_compression(self):
+        """Comprime em lotes, na thread de escrita, entradas gravadas antes da compressão"""
+        def compress_batch(db, after_id):
+            last_id = db.compress_entries_batch(after_id)
+            # O relatório descomprime todas as entradas: só vale quando algum lote foi comprimido
+            if last_id is None and after_id > 0:
+                logger.info(f"Compressão das entradas: {db.compression_report()}")
+            return last_id
+
+        self.writer.submit_batches(('compress',), compress_batch, 0)
+
+    def _start_search_index(self):
+        """Indexa em lotes, para a busca, as entradas gravadas antes do índice"""
+        self.writer.submit_batches(('search',), lambda db, after_id: db.search_index_batch(), 0)
+
+    def _start_activity(self):
+        """Soma em lotes, aos totais diários, as entradas gravadas antes deles"""
+        self.writer.submit_batches(('activity',), lambda db, after_id: db.activity_batch(), 0)
+
+    def _start_fuzzy_index(self):
+        """Indexa em lotes, para a busca aproximada, as entradas gravadas antes do índice"""
+        self.writer.submit_batches(('fuzzy',), lambda db, after_id: db.fuzzy_index_batch(), 0)
+
+    def _start_sync_log(self):
+        """Registra em lotes, para a sincronização, as entradas gravadas antes do registro"""
+        self.writer.submit_batches(('sync_log',), lambda db, after_id: db.sync_log_batch(), 0)
+
+    def _start_signatures(self):
+        """Calcula em lotes as assinaturas de duplicadas das entradas gravadas antes delas"""
+        self.writer.submit_batches(('signatures',), lambda db, after_id: db.signatures_batch(after_id), 0)
+
+    def _resume_account_deletions(self):
+        """Retoma exclusões de contas interrompidas pelo fechamento da aplicação"""
+        from background import AccountDeletion
+        for user_id in self.db.get_disabled_users():
+            logger.info(f"Retomando exclusão da conta {user_id}")
+            AccountDeletion(self.writer, user_id).start()
 
     def _setup_event_handlers(self):
         """Configura handlers para eventos da aplicação"""
@@ -133,6 +241,10 @@ class DiaryApp:
             self.current_user = user
             logger.info(f"Login bem-sucedido para usuário: {user.get('username', 'Unknown')}")
             
+            # Trocas de tema passam a ser gravadas no perfil do usuário
+            self.theme_manager.bind_user(user['id'], self.writer)
+            self.theme_manager.remember_theme(self.theme_manager.current_theme)
+            
             # Remove todos os widgets da tela de login
             self._clear_window()
             
@@ -143,9 +255,16 @@ class DiaryApp:
                 db=self.db,
                 user=user,
                 theme_manager=self.theme_manager,
-                logout_callback=self._logout
+                logout_callback=self._logout,
+                profiler=self.profiler,
+                writer=self.writer
             )
             
+            # Executa comandos de outras instâncias recebidos antes do login
+            pending, self.pending_commands = self.pending_commands, []
+            for command, args in pending:
+                self.handle_command(command, **args)
+            
         except ImportError as e:
             logger.error(f"Erro ao importar MainUI: {e}")
             self._show_error("Erro", "Não foi possível carregar a interface principal.")
@@ -153,14 +272,46 @@ class DiaryApp:
             logger.error(f"Erro ao mostrar interface principal: {e}")
             self._show_error("Erro", f"Erro inesperado: {str(e)}")
 
+    def handle_command(self, command, **args):
+        """Executa um comando encaminhado por outra execução da aplicação"""
+        logger.info(f"Comando recebido de outra instância: {command}")
+        
+        # Traz a janela existente para frente
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+        
+        if command == 'show':
+            return
+        
+        if not self.main_ui:
+            # Ainda na tela de login: executa após a autenticação
+            self.pending_commands.append((command, args))
+            return
+        
+        if command == 'new_entry':
+            self.main_ui.show_new_entry()
+        elif command == 'export_favorites':
+            if args.get('format') == 'txt':
+                self.main_ui.export_favorites_txt()
+            else:
+                self.main_ui.export_favorites_pdf()
+        else:
+            logger.warning(f"Comando desconhecido: {command}")
+
     def _logout(self):
         """Realiza logout e volta para tela de login"""
         try:
             logger.info(f"Logout do usuário: {self.current_user.get('username', 'Unknown')}")
             
+            # Grava rascunhos pendentes antes de destruir o editor
+            if self.main_ui:
+                self.main_ui.save_pending_changes()
+            
             # Limpa referências
             self.current_user = None
             self.main_ui = None
+            self.theme_manager.bind_user(None)
             
             # Limpa a tela
             self._clear_window()
@@ -185,6 +336,23 @@ class DiaryApp:
                 if hasattr(self.main_ui, 'save_pending_changes'):
                     self.main_ui.save_pending_changes()
             
+            if self.profiler:
+                self.profiler.write_report()
+            
+            # Conclui as escritas em segundo plano antes de fechar o banco
+            if self.maintenance:
+                self.maintenance.stop()
+            # Leva as alterações desta sessão para a pasta de sincronização
+            if self.sync_folder:
+                self._submit_sync()
+            self.writer.close()
+            if self.maintenance:
+                # VACUUM único de bancos antigos: prende o banco, por isso só com a janela já fechada
+                self.root.withdraw()
+                self.maintenance.finish(self.db)
+            if self.backups:
+                self.backups.stop_schedule()
+            
             # Fecha conexões do banco de dados
             if hasattr(self.db, 'close'):
                 self.db.close()
@@ -205,11 +373,97 @@ class DiaryApp:
         """Mostra mensagem de erro padronizada"""
         messagebox.showerror(title, message)
 
+def migrate_database(root, db_name="diario.db"):
+    """
+    Atualiza um banco de uma versão anterior antes de mostrar a janela
+    principal. A migração (ver DatabaseManager.migrate) roda numa thread com
+    conexão própria enquanto uma janela de aviso continua respondendo.
+    """
+    from database import DatabaseManager, needs_migration
+    if not needs_migration(db_name):
+        return
+
+    root.withdraw()
+    window = tk.Toplevel(root)
+    window.title("Diário Digital")
+    window.resizable(False, False)
+    ttk.Label(window, text="Atualizando o banco de dados do diário...\nIsso acontece uma única vez.",
+              justify='center').pack(padx=30, pady=(20, 10))
+    progress = ttk.Progressbar(window, mode='indeterminate', length=240)
+    progress.pack(padx=30, pady=(0, 20))
+    progress.start(15)
+
+    errors = []
+
+    def run():
+        try:
+            DatabaseManager(db_name).close()
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run, name='migration', daemon=True)
+    worker.start()
+    done = tk.BooleanVar(root, False)
+
+    def poll():
+        if worker.is_alive():
+            root.after(100, poll)
+        else:
+            done.set(True)
+
+    root.after(100, poll)
+    root.wait_variable(done)
+    window.destroy()
+    root.deiconify()
+    if errors:
+        raise errors[0]
+
+
+def parse_args(argv=None):
+    """Interpreta os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Diário Digital")
+    parser.add_argument('--nova-entrada', action='store_true',
+                        help="abre o editor de nova entrada")
+    parser.add_argument('--exportar-favoritos', choices=('pdf', 'txt'), metavar='FORMATO',
+                        help="exporta as entradas favoritas (pdf ou txt)")
+    parser.add_argument('--multiplas-instancias', action='store_true',
+                        help="não encaminha para a instância já aberta")
+    return parser.parse_args(argv)
+
+
+def command_from_args(args):
+    """Converte os argumentos em um comando (nome, parâmetros)"""
+    if args.nova_entrada:
+        return 'new_entry', {}
+    if args.exportar_favoritos:
+        return 'export_favorites', {'format': args.exportar_favoritos}
+    return 'show', {}
+
+
 def main():
     """Função principal da aplicação"""
+    args = parse_args()
+    command, command_args = command_from_args(args)
+    
+    # Logging assíncrono com rotação (seção "logging" de diario_settings.json)
+    settings = Settings()
+    setup_logging(settings.get('logging'))
+    
+    # Instância única: se já houver uma aberta, encaminha o pedido e sai
+    instance = None
+    if not args.multiplas_instancias:
+        from single_instance import SingleInstance
+        instance = SingleInstance()
+        if not instance.acquire():
+            if instance.send(command, **command_args):
+                logger.info("Pedido encaminhado para a instância em execução")
+                sys.exit(0)
+            logger.error("Outra instância está em execução, mas não respondeu")
+            sys.exit(1)
+    
     try:
         # Verifica se todos os arquivos necessários existem
-        required_files = ['auth.py', 'database.py', 'themes.py']
+        required_files = ['auth.py', 'database.py', 'themes.py', 'theme_packs/light.json']
         missing_files = [f for f in required_files if not Path(f).exists()]
         
         if missing_files:
@@ -221,7 +475,20 @@ def main():
         
         # Cria e executa a aplicação
         root = tk.Tk()
-        app = DiaryApp(root)
+        
+        # Migração única de bancos antigos, antes da janela principal aparecer
+        with STARTUP.phase("Atualização do banco de dados"):
+            migrate_database(root)
+        
+        # Perfilador opcional de responsividade (DIARIO_PROFILE=1|cprofile|sample)
+        from profiler import UIProfiler
+        profiler = UIProfiler.from_environment(root)
+        
+        app = DiaryApp(root, profiler=profiler, startup=STARTUP, settings=settings)
+        if command != 'show':
+            app.handle_command(command, **command_args)
+        if instance:
+            instance.poll(root, app.handle_command)
         root.mainloop()
         
     except KeyboardInterrupt:
@@ -234,6 +501,9 @@ def main():
             f"Ocorreu um erro inesperado:\n{str(e)}\n\nVerifique o arquivo de log para mais detalhes."
         )
         sys.exit(1)
+    finally:
+        if instance:
+            instance.release()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
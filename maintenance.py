@@ -0,0 +1,185 @@
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Páginas liberadas por passo do incremental_vacuum
+VACUUM_PAGES_PER_STEP = 64
+# O VACUUM que ativa o modo incremental não pode ser dividido em passos e prende
+# o banco inteiro: só roda no fechamento da aplicação, e até este tamanho (acima
+# dele, pela linha de comando: python -m backup compactar)
+MAX_FULL_VACUUM_BYTES = 64 * 1024 * 1024
+# Limite de linhas examinadas por índice no ANALYZE feito pelo PRAGMA optimize
+ANALYSIS_LIMIT = 400
+# Tempo inicial de cada passo do quick_check; dobra quando a tabela não cabe nele
+CHECK_BUDGET = 0.05
+MAX_CHECK_BUDGET = 2.0
+# Tempo máximo de cada rodada de passos na thread de escrita
+STEP_BUDGET = 0.1
+
+
+def enable_incremental_vacuum(db) -> bool:
+    """
+    Bancos criados antes do auto_vacuum incremental precisam de um VACUUM
+    completo para mudar de modo; é feito uma única vez, nunca com a
+    aplicação em uso. Retorna se o banco está no modo incremental
+    """
+    mode = db.connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode == 2:
+        return True
+    page_count = db.connection.execute("PRAGMA page_count").fetchone()[0]
+    page_size = db.connection.execute("PRAGMA page_size").fetchone()[0]
+    if page_count * page_size > MAX_FULL_VACUUM_BYTES:
+        logger.info(f"auto_vacuum incremental não ativado: banco com {page_count * page_size // (1024 * 1024)} MB; "
+                    "use python -m backup compactar com a aplicação fechada")
+        return False
+    logger.info("Ativando auto_vacuum incremental (VACUUM único)")
+    db.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    db.connection.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(db):
+    """Devolve ao sistema as páginas livres, poucas por passo"""
+    freed = 0
+    while True:
+        free_pages = db.connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_pages:
+            break
+        # execute() avança o PRAGMA um único passo (uma página); executescript o leva até o fim
+        db.connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+        remaining = db.connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining >= free_pages:
+            # Banco fora do modo incremental: o PRAGMA não libera nada
+            break
+        freed += free_pages - remaining
+        yield
+    if freed:
+        logger.info(f"incremental_vacuum liberou {freed} páginas")
+
+
+def optimize(db):
+    """Atualiza as estatísticas do planejador de consultas (ANALYZE limitado)"""
+    db.connection.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    db.connection.execute("PRAGMA optimize")
+    yield
+
+
+def quick_check(db):
+    """
+    Verifica a integridade tabela por tabela. Cada passo é interrompido ao
+    estourar o tempo e repetido depois com um limite maior.
+    """
+    tables = [row[0] for row in db.connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%'"
+    )]
+    for table in tables:
+        budget = CHECK_BUDGET
+        while True:
+            deadline = time.monotonic() + budget
+            if budget < MAX_CHECK_BUDGET:
+                db.connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+            try:
+                rows = db.connection.execute(f'PRAGMA quick_check("{table}")').fetchall()
+            except sqlite3.OperationalError as e:
+                if 'interrupted' not in str(e):
+                    raise
+                budget = min(budget * 2, MAX_CHECK_BUDGET)
+                yield
+                continue
+            finally:
+                db.connection.set_progress_handler(None, 0)
+            if rows != [('ok',)]:
+                logger.error(f"quick_check encontrou problemas em {table}: {rows[:5]}")
+            break
+        yield
+
+
+def maintenance_steps(db):
+    """Tarefas de manutenção com a aplicação em uso, em passos curtos"""
+    for task in (incremental_vacuum, optimize, quick_check):
+        yield from task(db)
+
+
+class MaintenanceScheduler:
+    """
+    Executa a manutenção do banco quando o usuário está ocioso.
+
+    A ociosidade é medida pelos eventos de teclado e mouse do Tk. Enquanto
+    ela durar, a manutenção avança em rodadas curtas na thread de escrita;
+    se o usuário voltar a interagir, ela para no passo em que está e é
+    retomada na próxima ociosidade. O VACUUM completo fica para o
+    fechamento (finish).
+    """
+
+    CHECK_MS = 2000
+
+    def __init__(self, root, writer, settings, idle_seconds=60, interval_hours=24):
+        self.root = root
+        self.writer = writer
+        self.settings = settings
+        self.idle_seconds = settings.get('maintenance.idle_seconds', idle_seconds)
+        self.interval = settings.get('maintenance.interval_hours', interval_hours) * 3600
+        self.last_activity = time.monotonic()
+        self.finished = False
+        self._steps = None
+        self._job = None
+
+    def start(self):
+        for sequence in ('<Any-KeyPress>', '<Any-ButtonPress>', '<Motion>'):
+            self.root.bind_all(sequence, self._on_activity, add='+')
+        self._job = self.root.after(self.CHECK_MS, self._tick)
+        return self
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def finish(self, db):
+        """No fechamento, já sem escritas pendentes: ativa o auto_vacuum incremental, se preciso"""
+        try:
+            enable_incremental_vacuum(db)
+        except Exception as e:
+            logger.error(f"Erro ao ativar o auto_vacuum incremental: {e}")
+
+    def _on_activity(self, event=None):
+        self.last_activity = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self.last_activity >= self.idle_seconds
+
+    def is_due(self):
+        last_run = self.settings.get('maintenance.last_run', 0)
+        return time.time() - last_run >= self.interval
+
+    def _tick(self):
+        self._job = self.root.after(self.CHECK_MS, self._tick)
+        if self.finished:
+            # Registrado na thread do Tk, dona das configurações
+            self.finished = False
+            self.settings.set('maintenance.last_run', time.time())
+            logger.info("Manutenção do banco concluída")
+            return
+        if self.is_due() and self.is_idle() and not self.writer.pending(('maintenance',)):
+            self.writer.submit(('maintenance',), self._run_steps)
+
+    def _run_steps(self, db):
+        """Roda na thread de escrita: avança a manutenção por até STEP_BUDGET segundos"""
+        if self._steps is None:
+            self._steps = maintenance_steps(db)
+        deadline = time.monotonic() + STEP_BUDGET
+        while time.monotonic() < deadline and self.is_idle():
+            try:
+                next(self._steps)
+            except StopIteration:
+                self._steps = None
+                self.finished = True
+                return
+            except Exception as e:
+                logger.error(f"Erro na manutenção do banco: {e}")
+                # Conta como executada: uma nova tentativa fica para o próximo intervalo
+                self._steps = None
+                self.finished = True
+                return
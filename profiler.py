@@ -0,0 +1,294 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tkinter as tk
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerStats:
+    """Estatísticas acumuladas de um handler de evento"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stalls = 0
+
+    def add(self, elapsed, threshold):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if elapsed >= threshold:
+            self.stalls += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class StackSampler:
+    """Amostrador de pilha da thread principal enquanto um handler executa"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ui-profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < 30:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno}({code.co_name})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+class UIProfiler:
+    """
+    Perfilador opcional de responsividade da interface.
+
+    Envolve todos os callbacks registrados no Tk (comandos de botões, menus,
+    binds de eventos e callbacks de ``after``), mede o tempo em que cada um
+    bloqueia a thread principal e usa um heartbeat via ``after`` para detectar
+    lacunas longas no loop de eventos. Os piores handlers podem ser
+    perfilados com cProfile ou por amostragem de pilha.
+    """
+
+    MODES = (None, 'cprofile', 'sample')
+    GAP_NAME = '<lacuna do loop de eventos>'
+
+    def __init__(self, root, report_path='ui_profile.log', stall_threshold_ms=100,
+                 heartbeat_ms=50, profile_mode=None, max_captures=3):
+        if profile_mode not in self.MODES:
+            raise ValueError(f"Modo de perfil inválido: {profile_mode}")
+
+        self.root = root
+        self.report_path = report_path
+        self.stall_threshold = stall_threshold_ms / 1000
+        self.heartbeat_interval = heartbeat_ms / 1000
+        self.profile_mode = profile_mode
+        self.max_captures = max_captures
+
+        self.stats = {}
+        self.gaps = []  # [(timestamp, segundos)]
+        self.captures = {}  # {handler: [texto do perfil]}
+        self._offenders = set()
+        self._depth = 0
+        self._main_thread = threading.get_ident()
+        self._original_register = None
+        self._last_beat = None
+        self._heartbeat_id = None
+
+    @classmethod
+    def from_environment(cls, root):
+        """
+        Cria o perfilador se DIARIO_PROFILE estiver definido.
+        Valores aceitos: 1, cprofile ou sample.
+        """
+        value = os.environ.get('DIARIO_PROFILE', '').strip().lower()
+        if not value or value in ('0', 'false', 'no'):
+            return None
+
+        mode = value if value in ('cprofile', 'sample') else None
+        threshold = int(os.environ.get('DIARIO_PROFILE_THRESHOLD_MS', '100'))
+        profiler = cls(root, stall_threshold_ms=threshold, profile_mode=mode)
+        profiler.install()
+        return profiler
+
+    # Instrumentação
+    def install(self):
+        """Passa a envolver os callbacks registrados no Tk e inicia o heartbeat"""
+        if self._original_register is not None:
+            return
+
+        original = tk.Misc._register
+        profiler = self
+
+        def _register(widget, func, subst=None, needcleanup=1):
+            return original(widget, profiler.wrap(func), subst, needcleanup)
+
+        self._original_register = original
+        tk.Misc._register = _register
+        self._schedule_heartbeat()
+        logger.info("Perfilador de interface ativado")
+
+    def uninstall(self):
+        """Restaura o registro original de callbacks e para o heartbeat"""
+        if self._original_register is None:
+            return
+        tk.Misc._register = self._original_register
+        self._original_register = None
+        if self._heartbeat_id:
+            try:
+                self.root.after_cancel(self._heartbeat_id)
+            except tk.TclError:
+                pass
+            self._heartbeat_id = None
+
+    def instrument(self, obj, method_name):
+        """Envolve um método específico (ex.: AuthManager.login) para medi-lo isoladamente"""
+        method = getattr(obj, method_name)
+        name = f"{type(obj).__name__}.{method_name}"
+        setattr(obj, method_name, self.wrap(method, name))
+
+    def wrap(self, func, name=None):
+        """Retorna o callback envolvido com medição de tempo"""
+        if getattr(func, '_ui_profiled', False):
+            return func
+
+        name = name or self._callback_name(func)
+        if name == 'after:_heartbeat':
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() != self._main_thread:
+                return func(*args, **kwargs)
+            return self._run_measured(name, func, args, kwargs)
+
+        wrapper._ui_profiled = True
+        return wrapper
+
+    def _callback_name(self, func):
+        owner = getattr(func, '__self__', None)
+        if owner is not None:
+            return f"{type(owner).__name__}.{func.__name__}"
+        qualname = getattr(func, '__qualname__', None) or repr(func)
+        if qualname.endswith('after.<locals>.callit'):
+            # O Tk copia o nome do callback original para o wrapper de after()
+            return f"after:{func.__name__}"
+        return qualname
+
+    def _run_measured(self, name, func, args, kwargs):
+        capture = (
+            self.profile_mode
+            and self._depth == 0
+            and name in self._offenders
+            and len(self.captures.get(name, [])) < self.max_captures
+        )
+        profile = sampler = None
+        if capture and self.profile_mode == 'cprofile':
+            profile = cProfile.Profile()
+        elif capture:
+            sampler = StackSampler(self._main_thread)
+            sampler.start()
+
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            if profile:
+                return profile.runcall(func, *args, **kwargs)
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            self._record(name, elapsed)
+            if profile:
+                self._store_cprofile(name, elapsed, profile)
+            elif sampler:
+                self._store_samples(name, elapsed, sampler.stop())
+
+    def _record(self, name, elapsed):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats(name)
+        stats.add(elapsed, self.stall_threshold)
+
+        if elapsed >= self.stall_threshold:
+            self._offenders.add(name)
+            logger.debug(f"Handler lento: {name} bloqueou a interface por {elapsed * 1000:.1f} ms")
+
+    def _store_cprofile(self, name, elapsed, profile):
+        buffer = io.StringIO()
+        pstats.Stats(profile, stream=buffer).sort_stats('cumulative').print_stats(15)
+        self.captures.setdefault(name, []).append(
+            f"cProfile ({elapsed * 1000:.1f} ms)\n{buffer.getvalue()}"
+        )
+
+    def _store_samples(self, name, elapsed, samples):
+        lines = [f"Amostragem ({elapsed * 1000:.1f} ms, {sum(samples.values())} amostras)"]
+        for stack, count in samples.most_common(10):
+            lines.append(f"{count:5d}  {stack}")
+        self.captures.setdefault(name, []).append("\n".join(lines))
+
+    # Heartbeat
+    def _schedule_heartbeat(self):
+        self._last_beat = time.perf_counter()
+        self._heartbeat_id = self.root.after(int(self.heartbeat_interval * 1000), self._heartbeat)
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        gap = now - self._last_beat - self.heartbeat_interval
+        if gap >= self.stall_threshold:
+            self.gaps.append((datetime.now(), gap))
+            del self.gaps[:-200]
+            self._record(self.GAP_NAME, gap)
+        self._schedule_heartbeat()
+
+    # Relatórios
+    def worst_offenders(self, limit=10):
+        """Retorna os handlers ordenados pelo maior tempo de bloqueio"""
+        return sorted(self.stats.values(), key=lambda s: s.max, reverse=True)[:limit]
+
+    def report(self):
+        """Gera o relatório textual de latência dos handlers"""
+        lines = [
+            f"Relatório de responsividade - {datetime.now():%d/%m/%Y %H:%M:%S}",
+            f"Limite de travamento: {self.stall_threshold * 1000:.0f} ms",
+            "",
+            f"{'Handler':<45} {'Chamadas':>8} {'Média ms':>9} {'Máx ms':>9} {'Lentas':>7}",
+        ]
+        for stats in self.worst_offenders(limit=len(self.stats)):
+            lines.append(
+                f"{stats.name[:45]:<45} {stats.count:>8} {stats.mean * 1000:>9.1f} "
+                f"{stats.max * 1000:>9.1f} {stats.stalls:>7}"
+            )
+
+        if self.gaps:
+            lines += ["", "Últimas lacunas do loop de eventos:"]
+            for timestamp, gap in self.gaps[-10:]:
+                lines.append(f"  {timestamp:%H:%M:%S}  {gap * 1000:.1f} ms")
+
+        for name, captures in self.captures.items():
+            lines += ["", f"=== Perfil de {name} ==="]
+            lines.extend(captures)
+
+        return "\n".join(lines)
+
+    def write_report(self, path=None):
+        """Grava o relatório em arquivo"""
+        path = path or self.report_path
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.report())
+            logger.info(f"Relatório de responsividade salvo em {path}")
+            return True
+        except OSError as e:
+            logger.error(f"Erro ao salvar relatório de responsividade: {e}")
+            return False
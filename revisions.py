@@ -0,0 +1,68 @@
+import difflib
+import json
+import zlib
+
+# Histórico de versões das entradas.
+#
+# Cada revisão guarda uma versão anterior da entrada. Em vez do texto
+# completo, a maioria guarda apenas a diferença (por linhas) entre ela e a
+# versão seguinte, que era a atual no momento da gravação. A cada
+# SNAPSHOT_INTERVAL revisões o texto é guardado por inteiro, o que limita a
+# quantidade de diferenças aplicadas para reconstruir qualquer versão.
+
+SNAPSHOT_INTERVAL = 10
+
+KIND_FULL = 'full'
+KIND_DELTA = 'delta'
+
+
+def make_delta(base: str, target: str) -> list:
+    """
+    Operações que transformam base em target:
+    [n_inicio, n_linhas] copia linhas de base; [textos] insere linhas novas
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2 - i1])
+        elif tag in ('replace', 'insert'):
+            ops.append(target_lines[j1:j2])
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op and isinstance(op[0], int):
+            start, count = op
+            parts.extend(base_lines[start:start + count])
+        else:
+            parts.extend(op)
+    return "".join(parts)
+
+
+def encode_revision(old_content: str, new_content: str, full: bool) -> tuple:
+    """Retorna (tipo, dados comprimidos) da revisão que guarda old_content"""
+    if full:
+        kind, payload = KIND_FULL, old_content
+    else:
+        kind, payload = KIND_DELTA, make_delta(new_content, old_content)
+    data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'), 9)
+    return kind, data
+
+
+def decode_revision(kind: str, data: bytes, newer_content: str = None) -> str:
+    """Reconstrói o conteúdo da revisão; deltas precisam do conteúdo da versão seguinte"""
+    payload = json.loads(zlib.decompress(data).decode('utf-8'))
+    if kind == KIND_FULL:
+        return payload
+    return apply_delta(newer_content, payload)
+
+
+def is_snapshot(revision: int) -> bool:
+    return revision % SNAPSHOT_INTERVAL == 0
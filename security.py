@@ -0,0 +1,87 @@
+import hashlib
+import re
+import secrets
+
+# Funções de senha e validação sem dependência de interface, usadas tanto
+# pelo AuthManager (Tk) quanto pelo servidor da API.
+
+MIN_PASSWORD_LENGTH = 8
+HASH_ITERATIONS = 100000
+
+
+def generate_salt() -> str:
+    """Gera um salt aleatório para hash da senha"""
+    return secrets.token_hex(32)
+
+
+def hash_password(password: str, salt: str = None) -> tuple:
+    """
+    Gera hash seguro da senha com salt
+    Retorna (hash, salt)
+    """
+    if salt is None:
+        salt = generate_salt()
+
+    # Combina senha com salt e faz múltiplas iterações
+    combined = f"{password}{salt}"
+    hashed = combined.encode()
+
+    # Aplica hash múltiplas vezes para maior segurança
+    for _ in range(HASH_ITERATIONS):  # PBKDF2-like approach
+        hashed = hashlib.sha256(hashed).digest()
+
+    return hashed.hex(), salt
+
+
+def verify_password(password: str, stored_hash: str, salt: str) -> bool:
+    """Verifica se a senha fornecida corresponde ao hash armazenado"""
+    computed_hash, _ = hash_password(password, salt)
+    return secrets.compare_digest(computed_hash, stored_hash)
+
+
+def validate_password_strength(password: str, min_length: int = MIN_PASSWORD_LENGTH) -> tuple:
+    """
+    Valida a força da senha
+    Retorna (is_valid, error_message)
+    """
+    if len(password) < min_length:
+        return False, f"A senha deve ter pelo menos {min_length} caracteres"
+
+    # Verifica se tem pelo menos uma letra maiúscula
+    if not re.search(r'[A-Z]', password):
+        return False, "A senha deve conter pelo menos uma letra maiúscula"
+
+    # Verifica se tem pelo menos uma letra minúscula
+    if not re.search(r'[a-z]', password):
+        return False, "A senha deve conter pelo menos uma letra minúscula"
+
+    # Verifica se tem pelo menos um número
+    if not re.search(r'\d', password):
+        return False, "A senha deve conter pelo menos um número"
+
+    # Verifica se tem pelo menos um caractere especial
+    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+        return False, "A senha deve conter pelo menos um caractere especial (!@#$%^&*(),.?\":{}|<>)"
+
+    return True, ""
+
+
+def validate_username(username: str) -> tuple:
+    """
+    Valida o nome de usuário
+    Retorna (is_valid, error_message)
+    """
+    if not username or len(username.strip()) == 0:
+        return False, "Nome de usuário não pode estar vazio"
+
+    if len(username) < 3:
+        return False, "Nome de usuário deve ter pelo menos 3 caracteres"
+
+    if len(username) > 50:
+        return False, "Nome de usuário deve ter no máximo 50 caracteres"
+
+    # Apenas letras, números e alguns caracteres especiais
+    if not re.match(r'^[a-zA-Z0-9._-]+$', username):
+        return False, "Nome de usuário pode conter apenas letras, números, pontos, hífens e underscores"
+
+    return True, ""
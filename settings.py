@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS_PATH = "diario_settings.json"
+
+
+class Settings:
+    """Configurações locais da aplicação armazenadas em um arquivo JSON"""
+
+    def __init__(self, path=DEFAULT_SETTINGS_PATH):
+        self.path = Path(os.environ.get('DIARIO_SETTINGS', path))
+        self.data = {}
+        self.load()
+
+    def load(self):
+        """Carrega o arquivo de configurações, se existir"""
+        if not self.path.exists():
+            self.data = {}
+            return self.data
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Não foi possível ler {self.path}: {e}")
+            self.data = {}
+        return self.data
+
+    def get(self, key, default=None):
+        """Retorna um valor; chaves aninhadas usam ponto (ex.: 'logging.level')"""
+        value = self.data
+        for part in key.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def set(self, key, value, save=True):
+        """Define um valor e, por padrão, grava o arquivo imediatamente"""
+        parts = key.split('.')
+        target = self.data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+        if save:
+            return self.save()
+        return True
+
+    def save(self):
+        """Grava as configurações de forma atômica"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logger.error(f"Erro ao salvar configurações: {e}")
+            return False
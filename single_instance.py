@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SingleInstance:
+    """
+    Garante uma única instância da aplicação por banco de dados.
+
+    A primeira instância obtém um lock exclusivo e escuta em um socket Unix;
+    as seguintes encaminham o pedido (ex.: abrir nova entrada) para ela e
+    encerram sem carregar a interface nem abrir o banco.
+    """
+
+    POLL_MS = 150
+    CONNECT_RETRIES = 10
+
+    def __init__(self, db_path="diario.db", runtime_dir=None):
+        db_path = os.path.abspath(db_path)
+        digest = hashlib.sha1(db_path.encode('utf-8')).hexdigest()[:12]
+        uid = os.getuid() if hasattr(os, 'getuid') else 0
+        base = os.path.join(runtime_dir or tempfile.gettempdir(), f"diario-{uid}-{digest}")
+
+        self.socket_path = base + ".sock"
+        self.lock_path = base + ".lock"
+        self.commands = queue.Queue()
+        self.is_primary = False
+        self._lock_file = None
+        self._server = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def supported(self):
+        return fcntl is not None and hasattr(socket, 'AF_UNIX')
+
+    def acquire(self):
+        """
+        Tenta se tornar a instância principal.
+        Retorna False se outra instância já estiver em execução.
+        """
+        if not self.supported:
+            logger.info("Modo de instância única indisponível nesta plataforma")
+            self.is_primary = True
+            return True
+
+        self._lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+        # Com o lock em mãos, qualquer socket existente é resto de uma execução anterior
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self._server.listen(8)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="single-instance", daemon=True)
+        self._thread.start()
+
+        self.is_primary = True
+        logger.info(f"Instância principal escutando em {self.socket_path}")
+        return True
+
+    def send(self, command, **args):
+        """Envia um comando para a instância principal. Retorna True se confirmado"""
+        message = json.dumps({'command': command, 'args': args}).encode('utf-8') + b"\n"
+
+        for attempt in range(self.CONNECT_RETRIES):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                    client.settimeout(2)
+                    client.connect(self.socket_path)
+                    client.sendall(message)
+                    reply = client.makefile('rb').readline()
+                return json.loads(reply or b'{}').get('ok', False)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # A instância principal pode estar terminando de abrir o socket
+                time.sleep(0.1 * (attempt + 1))
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao comunicar com a instância principal: {e}")
+                return False
+        return False
+
+    def _serve(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.settimeout(2)
+                    line = conn.makefile('rb').readline()
+                    request = json.loads(line)
+                    self.commands.put((request['command'], request.get('args') or {}))
+                    conn.sendall(b'{"ok": true}\n')
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Comando inválido recebido de outra instância: {e}")
+                    try:
+                        conn.sendall(b'{"ok": false}\n')
+                    except OSError:
+                        pass
+
+    def poll(self, root, handler):
+        """Entrega os comandos recebidos ao handler na thread do Tk"""
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                handler(command, **args)
+            except Exception as e:
+                logger.error(f"Erro ao executar comando '{command}': {e}")
+        if self._running:
+            root.after(self.POLL_MS, self.poll, root, handler)
+
+    def release(self):
+        """Fecha o socket e libera o lock"""
+        self._running = False
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                self._server.close()
+            except OSError:
+                pass
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
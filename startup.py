@@ -0,0 +1,141 @@
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedLoader:
+    """Proxy de loader que mede o tempo de execução de cada módulo importado"""
+
+    def __init__(self, loader, report):
+        self._loader = loader
+        self._report = report
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._report._enter_import()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._report._exit_import(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimingFinder(MetaPathFinder):
+    """Finder que delega a busca aos demais e envolve o loader encontrado"""
+
+    def __init__(self, report):
+        self.report = report
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self.report)
+                return spec
+        return None
+
+
+class StartupReport:
+    """
+    Relatório de tempo de inicialização.
+
+    Registra fases nomeadas (criação da janela, gerenciadores, tela de login)
+    e, opcionalmente, o tempo de importação de cada módulo, até o primeiro
+    frame desenhado.
+    """
+
+    def __init__(self, track_imports=False):
+        self.start = time.perf_counter()
+        self.phases = []  # [(nome, segundos)]
+        self.imports = {}  # {módulo: (total, próprio)}
+        self.first_frame = None
+        self.track_imports = track_imports
+        self._finder = None
+        self._child_time = [0.0]
+        if track_imports:
+            self.install_import_hook()
+
+    @classmethod
+    def begin(cls):
+        """Inicia o relatório; DIARIO_STARTUP_REPORT=1 ativa o detalhamento de imports"""
+        enabled = os.environ.get('DIARIO_STARTUP_REPORT', '').strip().lower() not in ('', '0', 'false', 'no')
+        return cls(track_imports=enabled)
+
+    def install_import_hook(self):
+        if self._finder is None:
+            self._finder = _ImportTimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def remove_import_hook(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def _enter_import(self):
+        self._child_time.append(0.0)
+
+    def _exit_import(self, name, elapsed):
+        children = self._child_time.pop()
+        self._child_time[-1] += elapsed
+        self.imports[name] = (elapsed, elapsed - children)
+
+    @contextmanager
+    def phase(self, name):
+        """Mede uma fase da inicialização"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark_first_frame(self):
+        """Registra o momento em que o primeiro frame foi desenhado"""
+        if self.first_frame is not None:
+            return
+        self.first_frame = time.perf_counter() - self.start
+        self.remove_import_hook()
+        logger.info(f"Primeiro frame em {self.first_frame * 1000:.0f} ms")
+
+    def finish(self):
+        """Encerra a medição e grava o relatório detalhado, se ativado"""
+        if self.track_imports:
+            self.write()
+
+    def report(self, limit=25):
+        """Gera o relatório textual"""
+        lines = ["Relatório de inicialização"]
+        if self.first_frame is not None:
+            lines.append(f"Tempo até o primeiro frame: {self.first_frame * 1000:.1f} ms")
+        lines += ["", "Fases:"]
+        for name, elapsed in self.phases:
+            lines.append(f"  {name:<35} {elapsed * 1000:>9.1f} ms")
+
+        if self.imports:
+            lines += ["", f"Imports mais lentos (top {limit}):",
+                      f"  {'Módulo':<35} {'Total ms':>9} {'Próprio ms':>11}"]
+            ranked = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+            for name, (total, own) in ranked[:limit]:
+                lines.append(f"  {name[:35]:<35} {total * 1000:>9.1f} {own * 1000:>11.1f}")
+        return "\n".join(lines)
+
+    def write(self, path='startup_report.txt'):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.report())
+            return True
+        except OSError as e:
+            logger.error(f"Erro ao salvar relatório de inicialização: {e}")
+            return False
@@ -0,0 +1,184 @@
+"""
+Estatísticas de escrita de um usuário: sequências de dias escritos,
+palavras por entrada, distribuição por dia da semana, médias móveis e
+crescimento do vocabulário.
+
+Tudo o que depende só de dias e totais (sequências, dias da semana,
+médias móveis, meses) vem dos totais diários mantidos por triggers
+(daily_activity), calculado sobre arrays do NumPy. O texto das entradas
+é lido uma única vez, em lotes, apenas para a mediana de palavras por
+entrada e o vocabulário. As palavras são contadas pela mesma função
+(database.word_count) usada nos totais diários, de modo que a tela de
+atividade e a de estatísticas mostram os mesmos números. O resultado fica
+em cache até que as entradas do usuário mudem.
+"""
+import string
+import threading
+from datetime import date
+
+import numpy as np
+
+from database import word_count
+
+# Pontuação trocada por espaço antes de separar as palavras do vocabulário
+# (str.translate + str.split, em C, custa menos da metade de re.findall)
+_SEPARATORS = str.maketrans(dict.fromkeys(string.punctuation + '—–…“”‘’«»', ' '))
+# Janelas das médias móveis de palavras por dia
+ROLLING_WINDOWS = (7, 30)
+# Dias mostrados nas séries diárias (médias móveis)
+SERIES_DAYS = 365
+
+# {(banco, usuário): (chave, estatísticas)}
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _runs(days):
+    """Tamanhos e últimos dias das sequências de dias consecutivos (dias únicos e ordenados)"""
+    breaks = np.flatnonzero(np.diff(days) != 1)
+    ends = np.append(breaks, len(days) - 1)
+    starts = np.insert(breaks + 1, 0, 0)
+    return ends - starts + 1, days[ends]
+
+
+def _rolling_mean(values, window):
+    """Média dos últimos `window` valores em cada posição (janelas incompletas no início)"""
+    sums = np.cumsum(values, dtype=np.float64)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def _text_pass(texts):
+    """
+    Palavras de cada entrada e tamanho do vocabulário depois de cada uma.
+    Um set.update por entrada (em C) sai mais barato que ordenar todas as
+    palavras com np.unique.
+    """
+    counts, sizes = [], []
+    seen = set()
+    update = seen.update
+    for text in texts:
+        counts.append(word_count(text))
+        update(text.lower().translate(_SEPARATORS).split())
+        sizes.append(len(seen))
+    return np.array(counts, dtype=np.int64), np.array(sizes, dtype=np.int64)
+
+
+def compute_stats(activity, rows, today=None):
+    """
+    Calcula as estatísticas a partir dos totais diários (dia, entradas,
+    palavras, ...) em ordem de dia e de (created_at, conteúdo) das entradas
+    em ordem cronológica. Retorna um dicionário com valores simples (int,
+    float, listas), pronto para ser exibido.
+    """
+    activity = [row for row in activity if row[1] > 0]
+    today = np.datetime64(today or date.today(), 'D')
+    if not activity:
+        return {
+            'entries': 0, 'total_words': 0, 'mean_words': 0.0, 'median_words': 0.0, 'max_words': 0,
+            'active_days': 0, 'current_streak': 0, 'longest_streak': 0, 'longest_streak_end': None,
+            'weekday_entries': [0] * 7, 'weekday_words': [0] * 7,
+            'series_start': None, 'daily_words': [],
+            'rolling': {window: [] for window in ROLLING_WINDOWS},
+            'vocabulary': 0, 'vocabulary_growth': [], 'monthly': [],
+        }
+
+    days = np.array([row[0] for row in activity], dtype='datetime64[D]')
+    day_entries = np.array([row[1] for row in activity], dtype=np.int64)
+    day_words = np.array([row[2] for row in activity], dtype=np.int64)
+
+    # Sequências: dias com pelo menos uma entrada (os totais já vêm um por dia)
+    day_numbers = days.astype(np.int64)
+    lengths, run_ends = _runs(day_numbers)
+    longest = int(lengths.argmax())
+    # A sequência atual ainda vale se o último dia escrito foi hoje ou ontem
+    last_gap = (today - days[-1]).astype(np.int64)
+    current_streak = int(lengths[-1]) if last_gap <= 1 else 0
+
+    # Dia da semana com segunda = 0 (1970-01-01 foi uma quinta-feira)
+    weekdays = (day_numbers + 3) % 7
+    weekday_entries = np.bincount(weekdays, weights=day_entries, minlength=7)
+    weekday_words = np.bincount(weekdays, weights=day_words, minlength=7)
+
+    # Palavras por dia do calendário, incluindo os dias sem escrita
+    first = day_numbers[0]
+    daily = np.bincount(day_numbers - first, weights=day_words)
+    rolling = {window: _rolling_mean(daily, window) for window in ROLLING_WINDOWS}
+    series_from = max(0, len(daily) - SERIES_DAYS)
+
+    # Palavras por mês
+    month_keys, month_index = np.unique(days.astype('datetime64[M]'), return_inverse=True)
+    month_words = np.bincount(month_index, weights=day_words)
+
+    # Passagem pelo texto: palavras de cada entrada e vocabulário acumulado
+    created, texts = [], []
+    for created_at, content in rows:
+        created.append(str(created_at)[:10])
+        texts.append(content or "")
+    entry_days = np.array(created, dtype='datetime64[D]')
+    words, growth = _text_pass(texts)
+    entry_months = entry_days.astype('datetime64[M]')
+
+    entries = int(day_entries.sum())
+    total_words = int(day_words.sum())
+    return {
+        'entries': entries,
+        'total_words': total_words,
+        'mean_words': total_words / entries,
+        'median_words': float(np.median(words)) if len(words) else 0.0,
+        'max_words': int(words.max()) if len(words) else 0,
+        'active_days': len(days),
+        'current_streak': current_streak,
+        'longest_streak': int(lengths[longest]),
+        'longest_streak_end': str(run_ends[longest].astype('datetime64[D]')),
+        'weekday_entries': weekday_entries.astype(np.int64).tolist(),
+        'weekday_words': weekday_words.astype(np.int64).tolist(),
+        'series_start': str((first + series_from).astype('datetime64[D]')),
+        'daily_words': daily[series_from:].astype(np.int64).tolist(),
+        'rolling': {window: values[series_from:].round(1).tolist() for window, values in rolling.items()},
+        'vocabulary': int(growth[-1]) if len(growth) else 0,
+        # (data da entrada, vocabulário acumulado) no último dia de cada mês com escrita
+        'vocabulary_growth': [
+            (str(entry_days[i]), int(growth[i]))
+            for i in np.append(np.flatnonzero(entry_months[1:] != entry_months[:-1]), len(entry_days) - 1)
+        ] if len(growth) else [],
+        'monthly': [(str(month), int(total)) for month, total in zip(month_keys, month_words)],
+    }
+
+
+def _cache_key(db, user_id, today):
+    # A sequência atual depende do dia de hoje, além das entradas
+    return db.get_stats_key(user_id), str(today or date.today())
+
+
+def get_cached_stats(db, user_id, today=None):
+    """Estatísticas em cache, se as entradas não mudaram desde o cálculo; senão None"""
+    key = _cache_key(db, user_id, today)
+    with _cache_lock:
+        cached = _cache.get((db.db_name, user_id))
+    if cached and cached[0] == key:
+        return cached[1]
+    return None
+
+
+def get_stats(db, user_id, today=None):
+    """Estatísticas do usuário, recalculadas apenas quando as entradas mudaram"""
+    key = _cache_key(db, user_id, today)
+    with _cache_lock:
+        cached = _cache.get((db.db_name, user_id))
+    if cached and cached[0] == key:
+        return cached[1]
+    stats = compute_stats(db.get_daily_activity(user_id), db.iter_entry_texts(user_id), today)
+    with _cache_lock:
+        _cache[(db.db_name, user_id)] = (key, stats)
+    return stats
+
+
+def clear_cache(user_id=None):
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            for cache_key in [k for k in _cache if k[1] == user_id]:
+                del _cache[cache_key]
@@ -0,0 +1,424 @@
+"""
+Sincronização do diário entre dispositivos por arquivos de alterações.
+
+Cada banco registra, por triggers, a versão da última alteração de cada
+usuário e entrada (tabela sync_log, ver DatabaseManager._create_sync_log).
+Um conjunto de alterações leva o estado atual das linhas alteradas desde o
+ponto que o outro dispositivo já confirmou ter recebido, comprimido com
+zlib; o custo depende só do que mudou, não do tamanho do banco.
+
+Ao aplicar, cada linha recebida só substitui a local se a sua versão for
+mais nova: compara-se o relógio lógico (Lamport) e, no empate, o id do
+dispositivo. Todos os dispositivos chegam ao mesmo resultado, e aplicar o
+mesmo arquivo duas vezes não muda nada. Exclusões também são versões e
+seguem a mesma regra.
+
+O identificador do dispositivo fica nas configurações locais (sync.device),
+não no banco, junto com o inode do arquivo do banco a que pertence: uma
+cópia do diario.db é outro arquivo e recebe um identificador novo na
+primeira sincronização, em vez de se passar pelo dispositivo de origem,
+mesmo que as configurações tenham sido copiadas com ela.
+
+O transporte é qualquer pasta compartilhada (cada dispositivo mantém nela
+o próprio arquivo, <dispositivo>.dsync) ou arquivos avulsos:
+
+    python -m sync pasta /caminho/da/pasta
+    python -m sync exportar alteracoes.dsync --para <dispositivo>
+    python -m sync importar alteracoes.dsync
+    python -m sync dispositivo
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DSYNC\x01'
+FORMAT_VERSION = 1
+CHANGESET_SUFFIX = '.dsync'
+# Colunas sincronizadas de users, na ordem em que vão no arquivo
+USER_COLUMNS = ('username', 'password_hash', 'salt', 'theme', 'disabled')
+
+
+class SyncError(Exception):
+    pass
+
+
+def row_key(*values) -> str:
+    """Identificador global derivado do conteúdo (linhas anteriores à sincronização)"""
+    data = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+
+def encode_changeset(changeset: dict) -> bytes:
+    data = json.dumps(changeset, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return MAGIC + zlib.compress(data, 6)
+
+
+def decode_changeset(data: bytes) -> dict:
+    if not data.startswith(MAGIC):
+        raise SyncError("Arquivo de sincronização inválido")
+    try:
+        changeset = json.loads(zlib.decompress(data[len(MAGIC):]).decode('utf-8'))
+    except (zlib.error, ValueError) as e:
+        raise SyncError(f"Arquivo de sincronização corrompido: {e}")
+    if changeset.get('format') != FORMAT_VERSION:
+        raise SyncError(f"Versão do arquivo de sincronização não suportada: {changeset.get('format')}")
+    return changeset
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Grava por um arquivo temporário: quem lê a pasta nunca vê um arquivo pela metade"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def local_device_id(settings, db_name) -> str:
+    """
+    Identificador deste dispositivo para o banco db_name, criado na primeira
+    vez. Só muda se o arquivo do banco for outro (cópia ou restauração)
+    """
+    database = os.stat(db_name).st_ino
+    device = settings.get('sync.device')
+    if not device or settings.get('sync.database') != database:
+        device = uuid.uuid4().hex
+        settings.set('sync.database', database, save=False)
+        settings.set('sync.device', device)
+    return device
+
+
+class SyncManager:
+    """Exporta e aplica conjuntos de alterações de um banco do diário"""
+
+    def __init__(self, db, device_id: str = None):
+        self.db = db
+        # Entradas de um banco anterior à sincronização ainda não registradas (ver
+        # DatabaseManager.sync_log_batch): sem o registro completo, não seriam enviadas
+        while db.sync_log_batch() is not None:
+            pass
+        if device_id and device_id != self.device_id:
+            self._adopt_device(device_id)
+
+    @property
+    def connection(self):
+        return self.db.connection
+
+    def _meta(self, key):
+        return self.connection.execute("SELECT value FROM sync_meta WHERE key = ?", (key,)).fetchone()[0]
+
+    @property
+    def device_id(self) -> str:
+        return self._meta('device')
+
+    def _adopt_device(self, device_id):
+        """
+        Passa o banco para o identificador desta máquina (banco copiado de
+        outro dispositivo, ou anterior a sync.device). As alterações já
+        registradas mantêm o autor; os outros dispositivos ainda não
+        conhecem este identificador, então o próximo arquivo vai completo
+        """
+        logger.info(f"Sincronização: banco de {self.device_id} assumido como dispositivo {device_id}")
+        with self.connection:
+            self.connection.execute("UPDATE sync_meta SET value = ? WHERE key = 'device'", (device_id,))
+            self.connection.execute("UPDATE sync_peers SET sent_seq = 0")
+
+    def _peer(self, device):
+        row = self.connection.execute(
+            "SELECT sent_seq, received_seq FROM sync_peers WHERE device = ?", (device,)
+        ).fetchone()
+        return row or (0, 0)
+
+    # Exportação
+    def changes_since(self, since_seq: int = 0) -> dict:
+        """Conjunto de alterações com as linhas alteradas depois de since_seq"""
+        # Lida antes das linhas: uma alteração gravada no meio da leitura é reenviada na próxima vez
+        until = self._meta('seq')
+        users = self.connection.execute(
+            f"""
+            SELECT l.uuid, l.clock, l.device, l.deleted, {', '.join('u.' + c for c in USER_COLUMNS)}
+            FROM sync_log l
+            LEFT JOIN users u ON u.id = l.row_id AND l.deleted = 0
+            WHERE l.table_name = 'users' AND l.seq > ? AND l.alias = 0
+            ORDER BY l.seq
+            """,
+            (since_seq,)
+        ).fetchall()
+        entries = self.connection.execute(
+            """
+            SELECT l.uuid, l.clock, l.device, l.deleted,
+                   owner.uuid, e.title, content_text(e.content), e.created_at, e.updated_at, e.favorite
+            FROM sync_log l
+            LEFT JOIN entries e ON e.id = l.row_id AND l.deleted = 0
+            LEFT JOIN sync_log owner ON owner.table_name = 'users' AND owner.row_id = e.user_id AND owner.alias = 0
+            WHERE l.table_name = 'entries' AND l.seq > ? AND l.alias = 0
+            ORDER BY l.seq
+            """,
+            (since_seq,)
+        ).fetchall()
+        acks = dict(self.connection.execute("SELECT device, received_seq FROM sync_peers"))
+
+        def pack(rows):
+            # [uuid, relógio, dispositivo, excluída, dados]; dados é null para exclusões
+            return [[row_uuid, clock, device, deleted, None if deleted else list(data)]
+                    for row_uuid, clock, device, deleted, *data in rows]
+
+        return {
+            'format': FORMAT_VERSION,
+            'device': self.device_id,
+            'since': since_seq,
+            'until': until,
+            'acks': acks,
+            'users': pack(users),
+            'entries': pack(entries),
+        }
+
+    def export_file(self, path, peer: str = None) -> int:
+        """
+        Grava as alterações que peer ainda não confirmou ter recebido (todas,
+        sem peer). Retorna a quantidade de linhas exportadas
+        """
+        since = self._peer(peer)[0] if peer else 0
+        changeset = self.changes_since(since)
+        _write_atomic(Path(path), encode_changeset(changeset))
+        count = len(changeset['users']) + len(changeset['entries'])
+        logger.info(f"Sincronização: {count} alteração(ões) exportada(s) para {path}")
+        return count
+
+    # Aplicação
+    def import_file(self, path) -> int:
+        with open(path, 'rb') as f:
+            return self.apply(decode_changeset(f.read()))
+
+    def apply(self, changeset: dict) -> int:
+        """
+        Aplica um conjunto de alterações numa única transação. Retorna
+        quantas linhas mudaram (0 se tudo já estava aplicado)
+        """
+        source = changeset['device']
+        me = self.device_id
+        if source == me:
+            return 0
+        applied = 0
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO sync_peers (device) VALUES (?)", (source,))
+            # Até onde o outro dispositivo já tem as alterações daqui
+            self.connection.execute(
+                "UPDATE sync_peers SET sent_seq = max(sent_seq, ?) WHERE device = ?",
+                (changeset['acks'].get(me, 0), source)
+            )
+            received = self._peer(source)[1]
+            if changeset['until'] <= received:
+                return 0
+
+            max_clock = 0
+            for table in ('users', 'entries'):
+                for row_uuid, clock, device, deleted, data in changeset[table]:
+                    max_clock = max(max_clock, clock)
+                    if self._apply_change(table, row_uuid, clock, device, deleted, data):
+                        applied += 1
+
+            # Relógio de Lamport: alterações locais seguintes ficam depois de tudo o que foi visto
+            self.connection.execute(
+                "UPDATE sync_meta SET value = max(value, ?) WHERE key = 'clock'", (max_clock,)
+            )
+            # Só avança se não houver lacuna entre o que já foi recebido e este arquivo
+            if changeset['since'] <= received:
+                self.connection.execute(
+                    "UPDATE sync_peers SET received_seq = ? WHERE device = ?", (changeset['until'], source)
+                )
+        logger.info(f"Sincronização: {applied} alteração(ões) aplicada(s) de {source}")
+        return applied
+
+    def _apply_change(self, table, row_uuid, clock, device, deleted, data) -> bool:
+        current = self.connection.execute(
+            "SELECT row_id, clock, device, deleted FROM sync_log WHERE uuid = ?", (row_uuid,)
+        ).fetchone()
+        if current is not None and (clock, device) <= (current[1], current[2]):
+            return False
+
+        if current is None and table == 'users' and not deleted:
+            # A mesma conta criada em dois dispositivos: o uuid recebido vira apelido da conta local
+            local = self.connection.execute(
+                "SELECT l.row_id, l.clock, l.device, l.deleted FROM users u "
+                "JOIN sync_log l ON l.table_name = 'users' AND l.row_id = u.id AND l.alias = 0 "
+                "WHERE u.username = ?",
+                (data[0],)
+            ).fetchone()
+            if local is not None:
+                self.connection.execute(
+                    "INSERT INTO sync_log (uuid, table_name, row_id, clock, device, seq, alias) "
+                    "VALUES (?, 'users', ?, ?, ?, ?, 1)",
+                    (row_uuid, *local[:3], self._meta('seq'))
+                )
+                if (clock, device) <= (local[1], local[2]):
+                    return False
+                current = local
+
+        row_id = current[0] if current is not None else 0
+        alive = current is not None and not current[3]
+        if deleted:
+            if alive:
+                self.connection.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        else:
+            values = self._row_values(table, data, row_id if alive else None)
+            if values is None:
+                return False
+            columns = ', '.join(values)
+            if alive:
+                if table == 'entries':
+                    # A versão local substituída continua no histórico de versões da entrada
+                    self.db._record_revision(row_id, values['user_id'], data[3], data[1], data[2])
+                assignments = ', '.join(f"{column} = ?" for column in values)
+                self.connection.execute(f"UPDATE {table} SET {assignments} WHERE id = ?",
+                                        [*values.values(), row_id])
+            else:
+                placeholders = ', '.join('?' for _ in values)
+                new_id = self.connection.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                                                 list(values.values())).lastrowid
+                # O trigger registrou a linha nova com um uuid próprio: passa a valer o recebido
+                self.connection.execute("DELETE FROM sync_log WHERE table_name = ? AND row_id = ?",
+                                        (table, new_id))
+                if current is None:
+                    self.connection.execute(
+                        "INSERT INTO sync_log (uuid, table_name, row_id, clock, device, seq) "
+                        "VALUES (?, ?, ?, 0, '', 0)",
+                        (row_uuid, table, new_id)
+                    )
+                else:
+                    # Linha excluída aqui e alterada depois no outro dispositivo: volta a existir
+                    self.connection.execute(
+                        "UPDATE sync_log SET row_id = ? WHERE uuid = ? OR (table_name = ? AND row_id = ? AND row_id != 0)",
+                        (new_id, row_uuid, table, row_id)
+                    )
+                row_id = new_id
+
+        if current is None and row_id == 0:
+            # Exclusão de uma linha que nunca chegou aqui: guarda a versão para repassá-la
+            self.connection.execute(
+                "INSERT INTO sync_log (uuid, table_name, row_id, clock, device, seq, deleted) "
+                "VALUES (?, ?, 0, 0, '', 0, 1)",
+                (row_uuid, table)
+            )
+        # A versão recebida vale para o uuid e seus apelidos, com uma seq nova para ser repassada
+        self.connection.execute("UPDATE sync_meta SET value = value + 1 WHERE key = 'seq'")
+        self.connection.execute(
+            """
+            UPDATE sync_log
+            SET clock = ?, device = ?, deleted = ?, seq = (SELECT value FROM sync_meta WHERE key = 'seq')
+            WHERE uuid = ? OR (table_name = ? AND row_id = ? AND row_id != 0)
+            """,
+            (clock, device, 1 if deleted else 0, row_uuid, table, row_id)
+        )
+        return True
+
+    def _row_values(self, table, data, row_id=None):
+        """Colunas a gravar a partir dos dados recebidos, ou None se não puderem ser aplicados"""
+        if table == 'users':
+            values = dict(zip(USER_COLUMNS, data))
+            taken = self.connection.execute(
+                "SELECT 1 FROM users WHERE username = ? AND id IS NOT ?", (values['username'], row_id)
+            ).fetchone()
+            if taken:
+                logger.warning(f"Sincronização: nome de usuário já usado por outra conta ({values['username']})")
+                return None
+            return values
+
+        # Importado aqui: database importa este módulo
+        from database import compress_content
+        owner_uuid, title, content, created_at, updated_at, favorite = data
+        owner = self.connection.execute(
+            "SELECT row_id FROM sync_log WHERE uuid = ? AND table_name = 'users' AND deleted = 0",
+            (owner_uuid,)
+        ).fetchone()
+        if owner is None:
+            logger.warning(f"Sincronização: entrada de um usuário desconhecido ignorada ({owner_uuid})")
+            return None
+        return {
+            'user_id': owner[0],
+            'title': title,
+            'content': compress_content(content),
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'favorite': favorite,
+        }
+
+    # Pasta compartilhada
+    def sync_folder(self, folder) -> int:
+        """
+        Aplica os arquivos dos outros dispositivos na pasta e regrava o deste
+        com o que algum deles ainda não confirmou. Retorna as linhas aplicadas
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        me = self.device_id
+        applied = 0
+        for path in sorted(folder.glob(f'*{CHANGESET_SUFFIX}')):
+            if path.stem == me:
+                continue
+            try:
+                applied += self.import_file(path)
+            except (OSError, SyncError) as e:
+                logger.warning(f"Sincronização: arquivo ignorado ({path.name}): {e}")
+
+        # Um único arquivo serve a todos: começa no menor ponto confirmado
+        since = self.connection.execute("SELECT MIN(sent_seq) FROM sync_peers").fetchone()[0] or 0
+        changeset = self.changes_since(since)
+        _write_atomic(folder / f'{me}{CHANGESET_SUFFIX}', encode_changeset(changeset))
+        logger.info(f"Sincronização com {folder}: {applied} recebida(s), "
+                    f"{len(changeset['users']) + len(changeset['entries'])} enviada(s)")
+        return applied
+
+
+def main(argv=None):
+    from database import DatabaseManager
+    from settings import Settings
+
+    parser = argparse.ArgumentParser(description="Sincronização do Diário Digital entre dispositivos")
+    parser.add_argument('--db', default='diario.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    folder_parser = subparsers.add_parser('pasta', help='sincroniza por uma pasta compartilhada')
+    folder_parser.add_argument('pasta', nargs='?', help='padrão: sync.folder das configurações')
+    export_parser = subparsers.add_parser('exportar', help='grava um arquivo de alterações')
+    export_parser.add_argument('arquivo')
+    export_parser.add_argument('--para', help='dispositivo de destino (só o que ele ainda não tem)')
+    import_parser = subparsers.add_parser('importar', help='aplica um arquivo de alterações')
+    import_parser.add_argument('arquivo')
+    subparsers.add_parser('dispositivo', help='mostra o identificador deste dispositivo')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    settings = Settings()
+    db = DatabaseManager(args.db)
+    manager = SyncManager(db, local_device_id(settings, args.db))
+    try:
+        if args.command == 'pasta':
+            folder = args.pasta or settings.get('sync.folder')
+            if not folder:
+                raise SyncError("Informe a pasta ou configure sync.folder")
+            print(f"{manager.sync_folder(folder)} alteração(ões) recebida(s)")
+        elif args.command == 'exportar':
+            print(f"{manager.export_file(args.arquivo, args.para)} alteração(ões) exportada(s)")
+        elif args.command == 'importar':
+            print(f"{manager.import_file(args.arquivo)} alteração(ões) aplicada(s)")
+        elif args.command == 'dispositivo':
+            print(manager.device_id)
+    except (SyncError, OSError) as e:
+        raise SystemExit(f"Erro: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Tags das entradas: normalização dos nomes e autocompletar.
+
+Os nomes ficam em uma árvore de prefixos (trie) em memória, montada a
+partir das contagens mantidas pelo banco (tags.entry_count); completar um
+prefixo percorre apenas o ramo dele, não a lista inteira de tags.
+"""
+
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tag(name: str) -> str:
+    """'  #Viagem   Longa ' -> 'viagem longa'"""
+    return " ".join(name.strip().lstrip('#').split()).lower()[:MAX_TAG_LENGTH]
+
+
+def parse_tags(text: str) -> list:
+    """Tags separadas por vírgula, normalizadas, sem repetições e na ordem digitada"""
+    tags = []
+    for part in text.split(','):
+        tag = normalize_tag(part)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def format_tags(tags) -> str:
+    return ", ".join(tags)
+
+
+class _Node:
+    __slots__ = ('children', 'count')
+
+    def __init__(self):
+        self.children = {}
+        self.count = None  # Número de entradas, se um nome termina neste nó
+
+
+class TagTrie:
+    """Árvore de prefixos dos nomes de tags, com a contagem de entradas de cada um"""
+
+    def __init__(self, counts=()):
+        self.root = _Node()
+        self.size = 0
+        for name, count in counts:
+            self.add(name, count)
+
+    def add(self, name: str, count: int = 0):
+        node = self.root
+        for char in name:
+            node = node.children.setdefault(char, _Node())
+        if node.count is None:
+            self.size += 1
+        node.count = count
+
+    def remove(self, name: str):
+        path = [self.root]
+        for char in name:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].count is None:
+            return
+        path[-1].count = None
+        self.size -= 1
+        # Remove os nós que ficaram sem uso, de baixo para cima
+        for depth in range(len(name), 0, -1):
+            node = path[depth]
+            if node.children or node.count is not None:
+                break
+            del path[depth - 1].children[name[depth - 1]]
+
+    def __contains__(self, name):
+        node = self._find(name)
+        return node is not None and node.count is not None
+
+    def __len__(self):
+        return self.size
+
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def complete(self, prefix: str, limit: int = 8) -> list:
+        """Nomes que começam com prefix, dos mais usados aos menos usados"""
+        prefix = normalize_tag(prefix)
+        start = self._find(prefix)
+        if start is None:
+            return []
+        found = []
+        stack = [(prefix, start)]
+        while stack:
+            name, node = stack.pop()
+            if node.count is not None:
+                found.append((-node.count, name))
+            stack.extend((name + char, child) for char, child in node.children.items())
+        found.sort()
+        return [name for _, name in found[:limit]]
+
+
+class TagCompleter:
+    """Trie das tags de um usuário, remontada só quando o banco mudou"""
+
+    def __init__(self, db, user_id):
+        self.db = db
+        self.user_id = user_id
+        self.trie = TagTrie()
+        self.data_version = None
+
+    def complete(self, prefix: str, limit: int = 8) -> list:
+        version = self.db.data_version()
+        if version != self.data_version:
+            self.trie = TagTrie(self.db.get_tags(self.user_id))
+            self.data_version = version
+        return self.trie.complete(prefix, limit)
@@ -1,146 +1,271 @@
 from tkinter import ttk
 import tkinter as tk
+import hashlib
+import json
+import logging
+import os
+import weakref
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+logger = logging.getLogger(__name__)
+
+THEME_PACKS_DIR = Path(__file__).resolve().parent / 'theme_packs'
+COMPILED_CACHE_FILE = '.compiled_cache.json'
+
+# Cores que todo pacote de tema precisa definir
+REQUIRED_COLORS = (
+    'bg', 'fg', 'button_bg', 'button_fg', 'button_active', 'button_pressed',
+    'entry_bg', 'entry_fg', 'text_bg', 'text_fg', 'select_bg', 'select_fg',
+    'listbox_bg', 'listbox_fg', 'listbox_select_bg', 'listbox_select_fg',
+    'treeview_bg', 'treeview_fg', 'treeview_select_bg', 'treeview_select_fg',
+    'treeview_heading_bg', 'treeview_heading_fg', 'treeview_odd_bg', 'treeview_even_bg',
+)
+
+
+class ThemePackError(ValueError):
+    """Pacote de tema inválido"""
+
+
+def validate_theme(name, colors):
+    """Valida as cores de um tema e retorna uma cópia normalizada"""
+    if not isinstance(colors, dict):
+        raise ThemePackError(f"Tema '{name}': 'colors' deve ser um objeto")
+    missing = [key for key in REQUIRED_COLORS if key not in colors]
+    if missing:
+        raise ThemePackError(f"Tema '{name}': cores ausentes: {', '.join(missing)}")
+    for key, value in colors.items():
+        if not isinstance(value, str) or not value:
+            raise ThemePackError(f"Tema '{name}': cor inválida em '{key}'")
+    return dict(colors)
+
+
+def compile_theme(config):
+    """
+    Converte as cores de um tema em uma tabela de estilos ttk.
+
+    Cada item é [operação, sufixo do estilo, opções]; a tabela pode ser
+    materializada com qualquer prefixo (nome do tema ou 'current').
+    """
+    return [
+        # Frame
+        ['configure', 'TFrame', {'background': config['bg']}],
+        # Label
+        ['configure', 'TLabel', {'background': config['bg'], 'foreground': config['fg']}],
+        # Button
+        ['configure', 'TButton', {'background': config['button_bg'],
+                                  'foreground': config['button_fg'],
+                                  'borderwidth': 1,
+                                  'focuscolor': 'none'}],
+        # Entry
+        ['configure', 'TEntry', {'fieldbackground': config['entry_bg'],
+                                 'foreground': config['entry_fg'],
+                                 'borderwidth': 1}],
+        # Scrollbar
+        ['configure', 'Vertical.TScrollbar', {'background': config['button_bg'],
+                                              'troughcolor': config['bg'],
+                                              'borderwidth': 1}],
+        # Notebook (abas)
+        ['configure', 'TNotebook', {'background': config['bg']}],
+        ['configure', 'TNotebook.Tab', {'background': config['button_bg'],
+                                        'foreground': config['fg']}],
+        # Treeview (Tabelas)
+        ['configure', 'Treeview', {'background': config['treeview_bg'],
+                                   'foreground': config['treeview_fg'],
+                                   'fieldbackground': config['treeview_bg'],
+                                   'rowheight': 28,
+                                   'borderwidth': 1}],
+        ['configure', 'Treeview.Heading', {'background': config['treeview_heading_bg'],
+                                           'foreground': config['treeview_heading_fg'],
+                                           'borderwidth': 1}],
+        # Mapeamento para hover/focus
+        ['map', 'TButton', {'background': [['active', config['button_active']],
+                                           ['pressed', config['button_pressed']]]}],
+        ['map', 'TNotebook.Tab', {'background': [['selected', config['select_bg']],
+                                                 ['active', config['button_active']]]}],
+        ['map', 'Treeview', {'background': [['selected', config['treeview_select_bg']]],
+                             'foreground': [['selected', config['treeview_select_fg']]]}],
+        ['map', 'Treeview.Heading', {'background': [['active', config['button_active']]]}],
+    ]
+
+
+class ThemePackLoader:
+    """
+    Carrega pacotes de tema (JSON ou TOML) de um diretório.
+
+    Cada arquivo é validado e compilado uma única vez; o resultado fica em
+    um cache em disco indexado pelo hash do arquivo, então inicializações
+    seguintes apenas leem e comparam os hashes.
+    """
+
+    PATTERNS = ('*.json', '*.toml')
+
+    def __init__(self, directory=THEME_PACKS_DIR):
+        self.directory = Path(directory)
+        self.cache_path = self.directory / COMPILED_CACHE_FILE
+        self._cache = None
+
+    def _load_cache(self):
+        if self._cache is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self, cache):
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de temas: {e}")
+
+    def _parse(self, path, raw):
+        if path.suffix == '.toml':
+            if tomllib is None:
+                raise ThemePackError(f"{path.name}: suporte a TOML requer Python 3.11+")
+            data = tomllib.loads(raw.decode('utf-8'))
+        else:
+            data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ThemePackError(f"{path.name}: formato inválido")
+        name = data.get('name') or path.stem
+        return name, validate_theme(name, data.get('colors'))
+
+    def load(self):
+        """Retorna {nome: {'colors': ..., 'styles': ...}} para todos os pacotes válidos"""
+        cache = self._load_cache()
+        used = {}
+        themes = {}
+
+        paths = sorted(p for pattern in self.PATTERNS for p in self.directory.glob(pattern)
+                       if p.name != COMPILED_CACHE_FILE)
+        for path in paths:
+            try:
+                raw = path.read_bytes()
+            except OSError as e:
+                logger.warning(f"Não foi possível ler o tema {path.name}: {e}")
+                continue
+
+            digest = hashlib.sha256(raw).hexdigest()
+            compiled = cache.get(digest)
+            if compiled is None:
+                try:
+                    name, colors = self._parse(path, raw)
+                except (ThemePackError, ValueError) as e:
+                    logger.warning(f"Pacote de tema ignorado: {e}")
+                    continue
+                compiled = {'name': name, 'colors': colors, 'styles': compile_theme(colors)}
+                logger.info(f"Tema '{name}' compilado a partir de {path.name}")
+
+            used[digest] = compiled
+            themes[compiled['name']] = compiled
+
+        # Regrava o cache apenas se algo mudou (entradas novas ou obsoletas)
+        if used.keys() != cache.keys():
+            self._save_cache(used)
+        self._cache = used
+        return themes
+
+    def save(self, name, colors):
+        """Grava um novo pacote de tema em JSON"""
+        path = self.directory / f"{name}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'name': name, 'colors': colors}, f, ensure_ascii=False, indent=4)
+        return path
+
 
 class ThemeManager:
-    def __init__(self, root):
+    # Prefixo dos estilos ttk que sempre refletem o tema ativo
+    ACTIVE_STYLE = 'current'
+
+    def __init__(self, root, theme='light', packs_dir=THEME_PACKS_DIR, settings=None):
         self.root = root
+        self.settings = settings
+        self.user_id = None
+        self.writer = None
         self.style = ttk.Style()
-        self.current_theme = 'light'
+        self.current_theme = theme
         self.theme_configs = {}
-        self.widgets_to_update = []  # Lista para rastrear widgets que precisam ser atualizados
+        self.compiled_styles = {}  # {tema: tabela de estilos compilada}
+        self.styled_themes = set()  # Temas cujos estilos ttk já foram criados
+        self.widgets_to_update = {}  # {nome do widget: (weakref, tipo)} para widgets que precisam ser atualizados
+        self.loader = ThemePackLoader(packs_dir)
         self.setup_themes()
+        self.apply_theme(theme)
     
     def setup_themes(self):
         self.style.theme_use('clam')  # Base do tema, compatível com personalização
 
-        # Configurações dos temas
-        self.theme_configs = {
-            'light': {
-                'bg': '#f0f0f0',
-                'fg': '#000000',
-                'button_bg': '#e1e1e1',
-                'button_fg': '#000000',
-                'button_active': '#d5d5d5',
-                'button_pressed': '#cccccc',
-                'entry_bg': '#ffffff',
-                'entry_fg': '#000000',
-                'text_bg': '#ffffff',
-                'text_fg': '#000000',
-                'select_bg': '#0078d4',
-                'select_fg': '#ffffff',
-                # Listbox
-                'listbox_bg': '#ffffff',
-                'listbox_fg': '#000000',
-                'listbox_select_bg': '#0078d4',
-                'listbox_select_fg': '#ffffff',
-                # Treeview (Tabelas)
-                'treeview_bg': '#ffffff',
-                'treeview_fg': '#000000',
-                'treeview_select_bg': '#0078d4',
-                'treeview_select_fg': '#ffffff',
-                'treeview_heading_bg': '#e1e1e1',
-                'treeview_heading_fg': '#000000',
-                'treeview_odd_bg': '#f8f8f8',
-                'treeview_even_bg': '#ffffff'
-            },
-            'dark': {
-                'bg': '#2d2d2d',
-                'fg': '#ffffff',
-                'button_bg': '#3d3d3d',
-                'button_fg': '#ffffff',
-                'button_active': '#4d4d4d',
-                'button_pressed': '#5a5a5a',
-                'entry_bg': '#404040',
-                'entry_fg': '#ffffff',
-                'text_bg': '#404040',
-                'text_fg': '#ffffff',
-                'select_bg': '#0078d4',
-                'select_fg': '#ffffff',
-                # Listbox
-                'listbox_bg': '#404040',
-                'listbox_fg': '#ffffff',
-                'listbox_select_bg': '#0078d4',
-                'listbox_select_fg': '#ffffff',
-                # Treeview (Tabelas)
-                'treeview_bg': '#404040',
-                'treeview_fg': '#ffffff',
-                'treeview_select_bg': '#0078d4',
-                'treeview_select_fg': '#ffffff',
-                'treeview_heading_bg': '#3d3d3d',
-                'treeview_heading_fg': '#ffffff',
-                'treeview_odd_bg': '#454545',
-                'treeview_even_bg': '#404040'
-            }
-        }
-
-        # Configurar estilos para ambos os temas
-        for theme_name, config in self.theme_configs.items():
-            # Frame
-            self.style.configure(f'{theme_name}.TFrame', 
-                               background=config['bg'])
-            
-            # Label
-            self.style.configure(f'{theme_name}.TLabel', 
-                               background=config['bg'], 
-                               foreground=config['fg'])
-            
-            # Button
-            self.style.configure(f'{theme_name}.TButton', 
-                               background=config['button_bg'], 
-                               foreground=config['button_fg'],
-                               borderwidth=1,
-                               focuscolor='none')
-            
-            # Entry
-            self.style.configure(f'{theme_name}.TEntry',
-                               fieldbackground=config['entry_bg'],
-                               foreground=config['entry_fg'],
-                               borderwidth=1)
-            
-            # Scrollbar
-            self.style.configure(f'{theme_name}.Vertical.TScrollbar',
-                               background=config['button_bg'],
-                               troughcolor=config['bg'],
-                               borderwidth=1)
-            
-            # Notebook (abas)
-            self.style.configure(f'{theme_name}.TNotebook',
-                               background=config['bg'])
-            self.style.configure(f'{theme_name}.TNotebook.Tab',
-                               background=config['button_bg'],
-                               foreground=config['fg'])
-            
-            # Treeview (Tabelas)
-            self.style.configure(f'{theme_name}.Treeview',
-                               background=config['treeview_bg'],
-                               foreground=config['treeview_fg'],
-                               fieldbackground=config['treeview_bg'],
-                               borderwidth=1)
-            
-            self.style.configure(f'{theme_name}.Treeview.Heading',
-                               background=config['treeview_heading_bg'],
-                               foreground=config['treeview_heading_fg'],
-                               borderwidth=1)
-
-            # Mapeamento para hover/focus
-            self.style.map(f'{theme_name}.TButton',
-                background=[('active', config['button_active']), 
-                          ('pressed', config['button_pressed'])])
-            
-            self.style.map(f'{theme_name}.TNotebook.Tab',
-                background=[('selected', config['select_bg']),
-                          ('active', config['button_active'])])
-            
-            self.style.map(f'{theme_name}.Treeview',
-                background=[('selected', config['treeview_select_bg'])],
-                foreground=[('selected', config['treeview_select_fg'])])
-            
-            self.style.map(f'{theme_name}.Treeview.Heading',
-                background=[('active', config['button_active'])])
+        # Configurações dos temas, lidas dos pacotes em theme_packs/
+        self.theme_configs = {}
+        self.compiled_styles = {}
+        for name, compiled in self.loader.load().items():
+            self.theme_configs[name] = compiled['colors']
+            self.compiled_styles[name] = compiled['styles']
+        if 'light' not in self.theme_configs:
+            raise ThemePackError(f"Tema padrão 'light' não encontrado em {self.loader.directory}")
+
+        # Os estilos de cada tema são criados sob demanda em ensure_theme_styles
+        self.styled_themes.clear()
+
+    def ensure_theme_styles(self, theme_name):
+        """Cria os estilos ttk de um tema na primeira vez em que ele é usado"""
+        if theme_name in self.styled_themes:
+            return
+        self.materialize_styles(theme_name, self.compiled_styles[theme_name])
+        self.styled_themes.add(theme_name)
+
+    def materialize_styles(self, prefix, styles):
+        """Aplica uma tabela de estilos compilada sob o prefixo informado"""
+        for operation, suffix, options in styles:
+            name = f'{prefix}.{suffix}'
+            if operation == 'configure':
+                self.style.configure(name, **options)
+            else:
+                self.style.map(name, **{option: [tuple(state) for state in states]
+                                        for option, states in options.items()})
 
     def register_widget(self, widget, widget_type='default'):
-        """Registra um widget para ser atualizado quando o tema mudar"""
-        self.widgets_to_update.append((widget, widget_type))
+        """
+        Registra um widget para ser atualizado quando o tema mudar.
+
+        O registro guarda apenas uma referência fraca e é removido no
+        <Destroy> do widget. Widgets ttk passam a usar os estilos
+        'current.*', que são reconfigurados uma única vez por troca de tema.
+        """
+        key = str(widget)
+        if key in self.widgets_to_update:
+            return
+        self.widgets_to_update[key] = (weakref.ref(widget), widget_type)
+
+        # O handler não referencia o widget para não mantê-lo vivo
+        def _unregister(event, key=key):
+            if str(event.widget) == key:
+                self.widgets_to_update.pop(key, None)
+
+        try:
+            widget.bind('<Destroy>', _unregister, add='+')
+            if self._is_ttk(widget):
+                widget.configure(style=self.style_name(widget.winfo_class()))
+            else:
+                self._apply_to_widget(widget, self.current_theme)
+        except tk.TclError:
+            self.widgets_to_update.pop(key, None)
+
+    def style_name(self, widget_class):
+        """Nome do estilo ttk que acompanha o tema ativo (ex.: 'current.TButton')"""
+        return f'{self.ACTIVE_STYLE}.{widget_class}'
+
+    def _is_ttk(self, widget):
+        return isinstance(widget, ttk.Widget)
 
     def apply_theme(self, theme):
         """Aplica o tema ao root e atualiza todos os widgets registrados"""
@@ -148,75 +273,99 @@ class ThemeManager:
             print(f"Tema '{theme}' não encontrado. Usando tema padrão 'light'.")
             theme = 'light'
             
+        self.ensure_theme_styles(theme)
         self.current_theme = theme
         config = self.theme_configs[theme]
         
         # Atualizar background do root
         self.root.configure(background=config['bg'])
         
-        # Atualizar widgets registrados
-        for widget, widget_type in self.widgets_to_update:
+        # Widgets ttk registrados usam os estilos 'current.*': uma reconfiguração
+        # em lote atualiza todos eles, independentemente de quantos existam
+        self.materialize_styles(self.ACTIVE_STYLE, self.compiled_styles[theme])
+        
+        # Widgets tk clássicos não usam estilos e são atualizados um a um
+        for key, (ref, widget_type) in list(self.widgets_to_update.items()):
+            widget = ref()
+            if widget is None:
+                self.widgets_to_update.pop(key, None)
+                continue
             try:
-                if isinstance(widget, tk.Text):
-                    widget.configure(
-                        bg=config['text_bg'],
-                        fg=config['text_fg'],
-                        insertbackground=config['fg'],
-                        selectbackground=config['select_bg'],
-                        selectforeground=config['select_fg']
-                    )
-                elif isinstance(widget, tk.Entry):
-                    widget.configure(
-                        bg=config['entry_bg'],
-                        fg=config['entry_fg'],
-                        insertbackground=config['fg']
-                    )
-                elif isinstance(widget, tk.Listbox):
-                    widget.configure(
-                        bg=config['listbox_bg'],
-                        fg=config['listbox_fg'],
-                        selectbackground=config['listbox_select_bg'],
-                        selectforeground=config['listbox_select_fg'],
-                        highlightbackground=config['bg'],
-                        highlightcolor=config['select_bg']
-                    )
-                elif isinstance(widget, ttk.Treeview):
-                    # Aplicar estilo específico do tema
-                    widget.configure(style=f'{theme}.Treeview')
-                    # Configurar tags para linhas alternadas
-                    widget.tag_configure('oddrow', background=config['treeview_odd_bg'])
-                    widget.tag_configure('evenrow', background=config['treeview_even_bg'])
-                elif isinstance(widget, (tk.Label, tk.Button, tk.Frame)):
-                    if hasattr(widget, 'configure'):
-                        if isinstance(widget, tk.Button):
-                            widget.configure(
-                                bg=config['button_bg'],
-                                fg=config['button_fg'],
-                                activebackground=config['button_active'],
-                                activeforeground=config['button_fg']
-                            )
-                        else:
-                            widget.configure(
-                                bg=config['bg'],
-                                fg=config['fg']
-                            )
-                # Para widgets TTK genéricos
-                elif hasattr(widget, 'configure') and hasattr(widget, 'winfo_class'):
-                    widget_class = widget.winfo_class()
-                    if widget_class in ['TButton', 'TLabel', 'TFrame', 'TEntry']:
-                        widget.configure(style=f'{theme}.{widget_class}')
+                self._apply_to_widget(widget, theme)
             except tk.TclError:
-                # Widget foi destruído, remover da lista
-                self.widgets_to_update.remove((widget, widget_type))
+                # Widget foi destruído, remover do registro
+                self.widgets_to_update.pop(key, None)
+
+    def _apply_to_widget(self, widget, theme):
+        """Aplica as cores do tema a um widget tk clássico ou Treeview"""
+        config = self.theme_configs[theme]
+        if isinstance(widget, tk.Text):
+            widget.configure(
+                bg=config['text_bg'],
+                fg=config['text_fg'],
+                insertbackground=config['fg'],
+                selectbackground=config['select_bg'],
+                selectforeground=config['select_fg']
+            )
+        elif isinstance(widget, tk.Entry):
+            widget.configure(
+                bg=config['entry_bg'],
+                fg=config['entry_fg'],
+                insertbackground=config['fg']
+            )
+        elif isinstance(widget, tk.Listbox):
+            widget.configure(
+                bg=config['listbox_bg'],
+                fg=config['listbox_fg'],
+                selectbackground=config['listbox_select_bg'],
+                selectforeground=config['listbox_select_fg'],
+                highlightbackground=config['bg'],
+                highlightcolor=config['select_bg']
+            )
+        elif isinstance(widget, ttk.Treeview):
+            # O estilo acompanha o tema; as tags de linhas alternadas são por widget
+            widget.tag_configure('oddrow', background=config['treeview_odd_bg'])
+            widget.tag_configure('evenrow', background=config['treeview_even_bg'])
+        elif isinstance(widget, tk.Button):
+            widget.configure(
+                bg=config['button_bg'],
+                fg=config['button_fg'],
+                activebackground=config['button_active'],
+                activeforeground=config['button_fg']
+            )
+        elif isinstance(widget, tk.Label):
+            widget.configure(
+                bg=config['bg'],
+                fg=config['fg']
+            )
+        elif isinstance(widget, tk.Frame):
+            widget.configure(bg=config['bg'])
 
     def set_theme(self, theme):
-        """Alias para apply_theme, mantendo compatibilidade com código existente"""
+        """Aplica o tema, a menos que ele já seja o ativo (evita reaplicar estilos)"""
+        if theme == self.current_theme and theme in self.styled_themes:
+            return
         self.apply_theme(theme)
 
+    def bind_user(self, user_id, writer=None):
+        """Associa o usuário logado para que trocas de tema sejam salvas no perfil"""
+        self.user_id = user_id
+        self.writer = writer
+
+    def remember_theme(self, theme):
+        """Grava o tema nas configurações locais, lidas antes do primeiro frame"""
+        if self.settings and self.settings.get('theme') != theme:
+            self.settings.set('theme', theme)
+
     def toggle(self):
-        """Alterna entre tema claro e escuro"""
+        """Alterna entre tema claro e escuro e salva a preferência"""
         new_theme = 'dark' if self.current_theme == 'light' else 'light'
         self.apply_theme(new_theme)
+        self.remember_theme(new_theme)
+        if self.user_id is not None and self.writer is not None:
+            from database import DatabaseManager
+            self.writer.submit(('theme', self.user_id), DatabaseManager.update_user_theme,
+                               self.user_id, new_theme)
         return new_theme
 
     def get_current_theme(self):
@@ -280,11 +429,22 @@ class ThemeManager:
         self.register_widget(button)
         return button
 
-    def add_custom_theme(self, theme_name, config):
-        """Adiciona um tema personalizado"""
+    def add_custom_theme(self, theme_name, config, save=False):
+        """
+        Adiciona um tema personalizado.
+        Apenas o novo tema é compilado; seus estilos são criados no primeiro uso.
+        Com save=True o tema é gravado como pacote em theme_packs/.
+        """
+        if theme_name == self.ACTIVE_STYLE:
+            raise ThemePackError(f"Nome de tema reservado: {theme_name}")
+        config = validate_theme(theme_name, config)
         self.theme_configs[theme_name] = config
-        # Reconfigurar estilos para incluir o novo tema
-        self.setup_themes()
+        self.compiled_styles[theme_name] = compile_theme(config)
+        self.styled_themes.discard(theme_name)
+        if save:
+            self.loader.save(theme_name, config)
+        if theme_name == self.current_theme:
+            self.apply_theme(theme_name)
 
 # Exemplo de uso completo:
 """
@@ -0,0 +1,150 @@
+import base64
+import logging
+import math
+import os
+import tempfile
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+import attachments
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+POLL_MS = 200
+# Sem Pillow, o Tk gera a miniatura (só PNG e GIF) decodificando a imagem inteira
+TK_THUMBNAIL_TYPES = ('image/png', 'image/gif')
+TK_THUMBNAIL_MAX_SIZE = 20 * 1024 * 1024
+
+
+class AttachmentsPanel:
+    """
+    Anexos de uma entrada na janela de visualização: miniaturas das imagens,
+    nome dos demais arquivos, botão para anexar e clique para salvar uma cópia.
+
+    thumbnails é um cache {blob_id: PhotoImage} compartilhado entre as janelas;
+    as miniaturas também ficam gravadas no banco, geradas uma única vez.
+    """
+
+    def __init__(self, parent, db, user, theme_manager, entry_id, thumbnails, writer=None):
+        self.db = db
+        self.user = user
+        self.theme = theme_manager
+        self.entry_id = entry_id
+        self.thumbnails = thumbnails
+        self.writer = writer
+
+        self.frame = ttk.Frame(parent, style=self.theme.style_name('TFrame'))
+        header = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
+        header.pack(fill='x')
+        ttk.Label(header, text='Anexos', font=('Segoe UI', 10, 'bold'),
+                  style=self.theme.style_name('TLabel')).pack(side='left')
+        self.attach_button = ttk.Button(header, text='Anexar arquivo...', style=self.theme.style_name('TButton'),
+                                        command=self.attach_file)
+        self.attach_button.pack(side='right')
+        self.items = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
+        self.items.pack(fill='x', pady=(5, 0))
+        self.load()
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def load(self):
+        for child in self.items.winfo_children():
+            child.destroy()
+        rows = self.db.get_attachments(self.entry_id, self.user['id'])
+        if not rows:
+            ttk.Label(self.items, text='Nenhum anexo.', style=self.theme.style_name('TLabel')).pack(anchor='w')
+        for attachment in rows:
+            _, _, filename, _, size, _ = attachment
+            image = self.thumbnail(attachment)
+            label = ttk.Label(self.items, text=f"{filename}\n{size / 1024:.0f} KB", compound='top',
+                              cursor='hand2', style=self.theme.style_name('TLabel'))
+            if image is not None:
+                label.configure(image=image)
+            label.pack(side='left', padx=5)
+            label.bind('<Button-1>', lambda event, a=attachment: self.save_copy(a))
+        return len(rows)
+
+    # Miniaturas
+    def thumbnail(self, attachment):
+        _, blob_id, _, mime_type, size, _ = attachment
+        if not attachments.is_image(mime_type):
+            return None
+        if blob_id in self.thumbnails:
+            return self.thumbnails[blob_id]
+        data = self.db.get_thumbnail(blob_id)
+        if data is None:
+            data = self._make_thumbnail(blob_id, mime_type, size)
+            if data is not None:
+                self.db.save_thumbnail(blob_id, data)
+        image = None
+        if data is not None:
+            try:
+                image = tk.PhotoImage(master=self.frame, data=base64.b64encode(data))
+            except tk.TclError as e:
+                logger.warning(f"Miniatura inválida do anexo {blob_id}: {e}")
+        self.thumbnails[blob_id] = image
+        return image
+
+    def _make_thumbnail(self, blob_id, mime_type, size):
+        with self.db.open_blob(blob_id) as blob:
+            data = attachments.make_thumbnail(blob)
+        if data is not None or mime_type not in TK_THUMBNAIL_TYPES or size > TK_THUMBNAIL_MAX_SIZE:
+            return data
+        source_fd, source = tempfile.mkstemp()
+        target_fd, target = tempfile.mkstemp(suffix='.png')
+        os.close(target_fd)
+        try:
+            with os.fdopen(source_fd, 'wb') as out, self.db.open_blob(blob_id) as blob:
+                attachments.copy_blob(blob, out)
+            image = tk.PhotoImage(master=self.frame, file=source)
+            factor = max(1, math.ceil(max(image.width(), image.height()) / attachments.THUMBNAIL_SIZE))
+            image.subsample(factor).write(target, format='png')
+            with open(target, 'rb') as f:
+                return f.read()
+        except tk.TclError as e:
+            logger.warning(f"Não foi possível gerar a miniatura do anexo {blob_id}: {e}")
+            return None
+        finally:
+            os.remove(source)
+            os.remove(target)
+
+    # Ações
+    def attach_file(self):
+        path = filedialog.askopenfilename(parent=self.frame, title='Anexar arquivo')
+        if not path:
+            return
+        count = len(self.db.get_attachments(self.entry_id, self.user['id']))
+        if self.writer is None:
+            self._attached(count, self.db.add_attachment(self.entry_id, self.user['id'], path))
+            return
+        # A cópia de arquivos grandes roda na thread de escrita
+        key = ('attachment', self.entry_id, path)
+        self.writer.submit(key, DatabaseManager.add_attachment, self.entry_id, self.user['id'], path)
+        self.attach_button.configure(state='disabled', text='Anexando...')
+        self.frame.after(POLL_MS, self._wait_attach, key, count)
+
+    def _wait_attach(self, key, count):
+        if not self.frame.winfo_exists():
+            return
+        if self.writer.pending(key):
+            self.frame.after(POLL_MS, self._wait_attach, key, count)
+            return
+        self.attach_button.configure(state='normal', text='Anexar arquivo...')
+        self._attached(count, None)
+
+    def _attached(self, previous_count, result):
+        if result is False or self.load() <= previous_count:
+            messagebox.showerror("Erro", "Não foi possível anexar o arquivo.", parent=self.frame)
+
+    def save_copy(self, attachment):
+        _, blob_id, filename, _, _, _ = attachment
+        dest = filedialog.asksaveasfilename(parent=self.frame, initialfile=filename)
+        if not dest:
+            return
+        try:
+            attachments.save_to_file(self.db, blob_id, dest)
+            messagebox.showinfo("Sucesso", f"Anexo salvo em:\n{dest}", parent=self.frame)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao salvar anexo:\n{str(e)}", parent=self.frame)
@@ -0,0 +1,59 @@
+from tkinter import ttk, scrolledtext
+
+
+class DebugPanel:
+    """Painel oculto de depuração com o relatório do perfilador de interface"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, profiler, theme_manager):
+        self.parent = parent
+        self.profiler = profiler
+        self.theme = theme_manager
+        self.frame = None
+        self.text = None
+        self._refresh_id = None
+
+    @property
+    def visible(self):
+        return self.frame is not None
+
+    def toggle(self, event=None):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        current_theme = self.theme.current_theme
+        self.frame = ttk.Frame(self.parent, style=f'{current_theme}.TFrame')
+        self.frame.pack(fill='x', side='bottom', padx=10, pady=(0, 10))
+
+        header = ttk.Frame(self.frame, style=f'{current_theme}.TFrame')
+        header.pack(fill='x')
+        ttk.Label(header, text='Depuração - responsividade da interface',
+                  style=f'{current_theme}.TLabel').pack(side='left')
+        ttk.Button(header, text='Salvar relatório', style=f'{current_theme}.TButton',
+                   command=self.profiler.write_report).pack(side='right', padx=5)
+
+        self.text = scrolledtext.ScrolledText(self.frame, height=10, wrap='none',
+                                              font=('Consolas', 9))
+        self.text.pack(fill='x', pady=(5, 0))
+        self.refresh()
+
+    def hide(self):
+        if self._refresh_id:
+            self.frame.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        self.frame.destroy()
+        self.frame = None
+        self.text = None
+
+    def refresh(self):
+        if not self.visible:
+            return
+        self.text.configure(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.insert('1.0', self.profiler.report())
+        self.text.configure(state='disabled')
+        self._refresh_id = self.frame.after(self.REFRESH_MS, self.refresh)
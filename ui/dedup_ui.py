@@ -0,0 +1,158 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+
+from database import DatabaseManager
+
+PREVIEW_LENGTH = 80
+POLL_MS = 200
+
+
+class DuplicatesDialog:
+    """
+    Revisão das entradas quase idênticas (ver dedup.py). Cada grupo aparece
+    com as suas entradas; o usuário mescla o grupo (mantém a entrada
+    selecionada, ou a mais antiga) ou exclui as entradas selecionadas.
+    """
+
+    def __init__(self, parent, db, user, theme_manager, on_change=None, writer=None):
+        self.db = db
+        self.user = user
+        self.theme = theme_manager
+        self.on_change = on_change
+        self.writer = writer
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Entradas duplicadas")
+        self.window.geometry("750x450")
+
+        main_frame = ttk.Frame(self.window, style=self.theme.style_name('TFrame'))
+        main_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        self.summary = ttk.Label(main_frame, style=self.theme.style_name('TLabel'))
+        self.summary.pack(anchor='w', pady=(0, 5))
+
+        tree_container = ttk.Frame(main_frame)
+        tree_container.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(tree_container, columns=('date', 'title', 'preview'),
+                                 show='tree headings', style=self.theme.style_name('Treeview'))
+        self.tree.heading('#0', text='Grupo')
+        self.tree.heading('date', text='Data')
+        self.tree.heading('title', text='Título')
+        self.tree.heading('preview', text='Prévia')
+        self.tree.column('#0', width=110, stretch=False)
+        self.tree.column('date', width=90, stretch=False)
+        self.tree.column('title', width=150, stretch=False)
+        self.tree.column('preview', width=350, stretch=True)
+        scrollbar = ttk.Scrollbar(tree_container, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        self.theme.register_widget(self.tree)
+
+        btn_frame = ttk.Frame(main_frame, style=self.theme.style_name('TFrame'))
+        btn_frame.pack(pady=(10, 0))
+        ttk.Button(btn_frame, text="Mesclar grupo", style=self.theme.style_name('TButton'),
+                   command=self.merge).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Excluir selecionadas", style=self.theme.style_name('TButton'),
+                   command=self.delete).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Fechar", style=self.theme.style_name('TButton'),
+                   command=self.window.destroy).pack(side='left', padx=5)
+
+        self.refresh()
+
+    def refresh(self):
+        """Carrega os grupos depois de calcular as assinaturas que faltam (entradas novas ou alteradas)"""
+        if not self.db.has_pending_signatures(self.user['id']):
+            self.load()
+            return
+        if self.writer is None:
+            after_id = 0
+            while after_id is not None:
+                after_id = self.db.signatures_batch(after_id)
+            self.load()
+            return
+        self.summary.configure(text="Analisando as entradas...")
+        self.writer.submit_batches(('signatures',), DatabaseManager.signatures_batch, 0)
+        self.window.after(POLL_MS, self._wait_signatures)
+
+    def _wait_signatures(self):
+        if not self.window.winfo_exists():
+            return
+        if self.writer.pending(('signatures',)):
+            self.window.after(POLL_MS, self._wait_signatures)
+            return
+        self.load()
+
+    def load(self):
+        self.tree.delete(*self.tree.get_children())
+        groups = self.db.find_duplicates(self.user['id'])
+        entries = {}
+        if groups:
+            ids = [entry_id for group in groups for entry_id in group]
+            entries = {row[0]: row for row in self.db.get_entries_by_ids(self.user['id'], ids)}
+
+        for number, group in enumerate(groups, start=1):
+            # Entradas de cada grupo da mais antiga para a mais recente
+            members = sorted((entries[entry_id] for entry_id in group if entry_id in entries),
+                             key=lambda row: (row[3], row[0]))
+            if len(members) < 2:
+                continue
+            parent = self.tree.insert('', 'end', iid=f"group-{number}", open=True,
+                                      text=f"Grupo {number} ({len(members)})")
+            for entry_id, title, content, created_at, _, favorite in members:
+                preview = " ".join(content.split())
+                if len(preview) > PREVIEW_LENGTH:
+                    preview = preview[:PREVIEW_LENGTH] + '...'
+                formatted_date = datetime.strptime(created_at[:10], '%Y-%m-%d').strftime('%d/%m/%Y')
+                self.tree.insert(parent, 'end', iid=str(entry_id), text='★' if favorite else '',
+                                 values=(formatted_date, title, preview))
+
+        count = len(self.tree.get_children())
+        self.summary.configure(text=f"{count} grupo(s) de entradas quase idênticas." if count
+                               else "Nenhuma entrada duplicada encontrada.")
+
+    def selected_entries(self):
+        return [int(item) for item in self.tree.selection() if not item.startswith('group-')]
+
+    def selected_group(self):
+        groups = {item if item.startswith('group-') else self.tree.parent(item) for item in self.tree.selection()}
+        if len(groups) != 1:
+            messagebox.showwarning("Aviso", "Selecione um grupo (ou uma entrada dele)", parent=self.window)
+            return None
+        return groups.pop()
+
+    def merge(self):
+        group = self.selected_group()
+        if group is None:
+            return
+        members = [int(item) for item in self.tree.get_children(group)]
+        selected = [entry_id for entry_id in self.selected_entries() if entry_id in members]
+        keep_id = selected[0] if len(selected) == 1 else members[0]
+        title = self.tree.set(str(keep_id), 'title')
+        if not messagebox.askyesno("Confirmar",
+                                   f"Manter \"{title}\" e excluir as outras {len(members) - 1} entrada(s) do grupo?\n"
+                                   "Tags e anexos das excluídas passam para a entrada mantida.",
+                                   parent=self.window):
+            return
+        if self.db.merge_entries(self.user['id'], keep_id, members):
+            self.changed()
+        else:
+            messagebox.showerror("Erro", "Falha ao mesclar as entradas", parent=self.window)
+
+    def delete(self):
+        selected = self.selected_entries()
+        if not selected:
+            messagebox.showwarning("Aviso", "Selecione as entradas a excluir", parent=self.window)
+            return
+        if not messagebox.askyesno("Confirmar", f"Excluir {len(selected)} entrada(s)?", parent=self.window):
+            return
+        if self.db.delete_entries(self.user['id'], selected):
+            self.changed()
+        else:
+            messagebox.showerror("Erro", "Falha ao excluir as entradas", parent=self.window)
+
+    def changed(self):
+        self.load()
+        if self.on_change:
+            self.on_change()
@@ -1,67 +1,303 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from tkcalendar import DateEntry
+from collections import OrderedDict
 from datetime import datetime
 
+from database import DatabaseManager
+from tags import TagCompleter
+from ui.tag_entry import TagEntry
+from ui.text_loader import load_text
+from undo import UndoHistory
+
+# Tempo sem digitação até o rascunho ser gravado
+AUTOSAVE_DELAY_MS = 1000
+# Tempo sem digitação até a alteração entrar no histórico de desfazer
+UNDO_CAPTURE_MS = 300
+# Quantidade de entradas com histórico de desfazer mantido em memória
+MAX_HISTORIES = 20
+
 class EntryUI:
-    def __init__(self, parent, db, user, theme_manager):
+    def __init__(self, parent, db, user, theme_manager, on_done=None, writer=None):
         self.parent = parent
+        self.on_done = on_done
         self.db = db
         self.user = user
         self.theme = theme_manager
+        self.writer = writer
         self.current_theme = self.theme.current_theme
         self.editing_entry_id = None
         self.frame = None
+        self._autosave_job = None
+        self._saved_values = None  # Valores da entrada gravada (ou vazios, para nova)
+        self._draft_values = None  # Últimos valores enviados como rascunho
+        self._loader = None  # Carregamento em partes do conteúdo, se em andamento
+        self._histories = OrderedDict()  # {chave do rascunho: UndoHistory}, sobrevive à troca de tela
+        self.history = None
+        self._history_text = None  # Conteúdo na última captura do histórico
+        self._capture_job = None
+        self.tag_completer = TagCompleter(db, user['id'])
+        self._saved_tags = []  # Tags gravadas da entrada aberta
 
     def show(self, entry_id=None):
-        self.clear()
+        """Mostra o editor; os widgets são criados só na primeira vez e reaproveitados"""
+        if self.frame is None:
+            self.build()
+        self.frame.pack(fill='both', expand=True, padx=20, pady=20)
+
         self.editing_entry_id = entry_id
+        self.reset_fields()
+        self._saved_tags = []
+        saved_values = None
+        if self.editing_entry_id:
+            saved_values = self.load_entry_data()
+        self._saved_values = saved_values or self.current_values()
+        self._draft_values = None
+        self.restore_draft()
+        self._attach_history()
 
-        self.frame = ttk.Frame(self.parent, style=f'{self.current_theme}.TFrame')
-        self.frame.pack(fill='both', expand=True, padx=20, pady=20)
+    def hide(self):
+        if self.frame is not None:
+            self.flush_draft()
+            self._detach_history()
+            self.frame.pack_forget()
+
+    def finish_loading(self):
+        """Completa de imediato o carregamento em partes, antes de ler o conteúdo"""
+        if self._loader is not None:
+            self._loader.finish()
+
+    def current_values(self):
+        self.finish_loading()
+        return (self.title_entry.get(),
+                self.content_text.get('1.0', 'end-1c'),
+                self.calendar.get_date().strftime('%Y-%m-%d'))
+
+    def has_changes(self):
+        if self.frame is None:
+            return False
+        return self.current_values() != self._saved_values or self.tag_entry.get_tags() != self._saved_tags
+
+    def restore_draft(self):
+        """Carrega o rascunho pendente desta entrada, se houver"""
+        key = self.draft_key()
+        if self.writer is not None and self.writer.pending(key):
+            self.writer.flush(timeout=2)
+        draft = self.db.get_draft(self.user['id'], self.editing_entry_id)
+        if not draft:
+            return
+        _, title, content, entry_date, _ = draft
+        self.title_entry.delete(0, 'end')
+        self.title_entry.insert(0, title)
+        if entry_date:
+            try:
+                self.calendar.set_date(datetime.strptime(entry_date, "%Y-%m-%d"))
+            except ValueError:
+                pass
+        self.set_content(content)
+        self._draft_values = (title, content, self.calendar.get_date().strftime('%Y-%m-%d'))
+
+    def set_content(self, content):
+        """Substitui o conteúdo do editor; textos longos entram em partes, sem travar a interface"""
+        self._cancel_loader()
+        self.content_text.delete('1.0', 'end')
+        self._history_text = content
+        self._loader = load_text(self.content_text, content, on_done=self._content_loaded)
+
+    def _content_loaded(self):
+        self._loader = None
+
+    def _cancel_loader(self):
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+
+    def draft_key(self):
+        return ('draft', DatabaseManager.draft_key(self.user['id'], self.editing_entry_id))
+
+    def on_content_modified(self, event=None):
+        self.content_text.edit_modified(False)
+        self.schedule_autosave()
+        self.schedule_capture()
+
+    def schedule_autosave(self, event=None):
+        """Reinicia a espera: várias alterações seguidas geram uma única gravação"""
+        if self._autosave_job is not None:
+            self.frame.after_cancel(self._autosave_job)
+        self._autosave_job = self.frame.after(AUTOSAVE_DELAY_MS, self.autosave)
+
+    def _cancel_autosave(self):
+        if self._autosave_job is not None:
+            self.frame.after_cancel(self._autosave_job)
+            self._autosave_job = None
+
+    def autosave(self):
+        """Envia o rascunho para a thread de escrita, sem bloquear a interface"""
+        self._autosave_job = None
+        if self.writer is None:
+            return
+        if self._loader is not None:
+            # Não força o fim do carregamento em partes: tenta de novo depois
+            self.schedule_autosave()
+            return
+        values = self.current_values()
+        if values == self._draft_values:
+            return
+        if values == self._saved_values and self._draft_values is None:
+            return
+        self.writer.submit(self.draft_key(), DatabaseManager.save_draft,
+                           self.user['id'], self.editing_entry_id, *values)
+        self._draft_values = values
+
+    def flush_draft(self):
+        """Grava imediatamente alterações ainda aguardando o autosave"""
+        if self._autosave_job is not None:
+            self._cancel_autosave()
+            self.autosave()
 
-        ttk.Label(self.frame, text="Data:", style=f'{self.current_theme}.TLabel').pack(anchor='w')
+    def discard_draft(self):
+        self._cancel_autosave()
+        if self.writer is not None:
+            self.writer.discard(self.draft_key())
+        self.db.delete_draft(self.user['id'], self.editing_entry_id)
+        self._draft_values = None
+
+    # Desfazer / refazer
+    def _attach_history(self):
+        """Retoma o histórico desta entrada se o texto ainda é o mesmo em que ele parou"""
+        key = self.draft_key()
+        history = self._histories.pop(key, None)
+        if history is None or not history.matches(self._history_text):
+            history = UndoHistory()
+        self._histories[key] = history
+        while len(self._histories) > MAX_HISTORIES:
+            self._histories.popitem(last=False)
+        self.history = history
+
+    def _detach_history(self):
+        if self.history is None:
+            return
+        if self._capture_job is not None:
+            self.frame.after_cancel(self._capture_job)
+            self._capture_job = None
+            self.finish_loading()
+            self.capture_history()
+        self.history.mark(self._history_text)
+        self.history = None
+        self._history_text = None
+
+    def schedule_capture(self):
+        if self._capture_job is not None:
+            self.frame.after_cancel(self._capture_job)
+        self._capture_job = self.frame.after(UNDO_CAPTURE_MS, self.capture_history)
+
+    def capture_history(self):
+        """Registra no histórico a diferença desde a última captura"""
+        self._capture_job = None
+        if self.history is None or self._history_text is None:
+            return
+        if self._loader is not None:
+            self.schedule_capture()
+            return
+        text = self.content_text.get('1.0', 'end-1c')
+        self.history.record(self._history_text, text)
+        self._history_text = text
+
+    def undo(self, event=None):
+        self._step_history(self.history.undo if self.history else None)
+        return 'break'
+
+    def redo(self, event=None):
+        self._step_history(self.history.redo if self.history else None)
+        return 'break'
+
+    def _step_history(self, step):
+        if step is None:
+            return
+        # Alterações ainda não capturadas entram no histórico antes de desfazer
+        if self._capture_job is not None:
+            self.frame.after_cancel(self._capture_job)
+            self._capture_job = None
+        self.finish_loading()
+        self.capture_history()
+
+        delta = step()
+        if delta is None:
+            return
+        start = f"1.0 + {delta.pos} chars"
+        self.content_text.delete(start, f"1.0 + {delta.pos + len(delta.removed)} chars")
+        self.content_text.insert(start, delta.inserted)
+        self.content_text.mark_set('insert', f"1.0 + {delta.pos + len(delta.inserted)} chars")
+        self.content_text.see('insert')
+        self._history_text = delta.apply(self._history_text)
+
+    def reset_fields(self):
+        self._cancel_loader()
+        self.title_entry.delete(0, 'end')
+        self.content_text.delete('1.0', 'end')
+        self._history_text = ''
+        self.calendar.set_date(datetime.now())
+        self.tag_entry.set_tags([])
+
+    def build(self):
+        self.frame = ttk.Frame(self.parent, style=self.theme.style_name('TFrame'))
+
+        # Importado sob demanda para não atrasar a abertura da aplicação
+        from tkcalendar import DateEntry
+
+        ttk.Label(self.frame, text="Data:", style=self.theme.style_name('TLabel')).pack(anchor='w')
         self.calendar = DateEntry(self.frame, date_pattern='dd/mm/yyyy', font=('Segoe UI', 10))
         self.calendar.pack(fill='x', pady=5)
 
-        ttk.Label(self.frame, text="Título:", style=f'{self.current_theme}.TLabel').pack(anchor='w', pady=(10, 0))
+        ttk.Label(self.frame, text="Título:", style=self.theme.style_name('TLabel')).pack(anchor='w', pady=(10, 0))
         self.title_entry = ttk.Entry(self.frame, font=('Segoe UI', 11))
         self.title_entry.pack(fill='x', pady=5)
+        self.title_entry.bind('<KeyRelease>', self.schedule_autosave)
+        self.calendar.bind('<<DateEntrySelected>>', self.schedule_autosave)
+
+        ttk.Label(self.frame, text="Tags (separadas por vírgula):", style=self.theme.style_name('TLabel')).pack(anchor='w', pady=(10, 0))
+        self.tag_entry = TagEntry(self.frame, self.tag_completer, font=('Segoe UI', 10))
+        self.tag_entry.pack(fill='x', pady=5)
 
-        ttk.Label(self.frame, text="Conteúdo:", style=f'{self.current_theme}.TLabel').pack(anchor='w', pady=(10, 0))
+        ttk.Label(self.frame, text="Conteúdo:", style=self.theme.style_name('TLabel')).pack(anchor='w', pady=(10, 0))
         self.content_text = scrolledtext.ScrolledText(self.frame, wrap='word',
                                                       height=15,
-                                                      font=('Segoe UI', 11),
-                                                      bg='#ffffff' if self.current_theme == 'light' else '#1e1e1e',
-                                                      fg='black' if self.current_theme == 'light' else 'white',
-                                                      insertbackground='black' if self.current_theme == 'light' else 'white')
+                                                      font=('Segoe UI', 11))
         self.content_text.pack(fill='both', expand=True, pady=5)
+        # As cores do editor são aplicadas e atualizadas pelo ThemeManager
+        self.theme.register_widget(self.content_text)
+        self.content_text.bind('<<Modified>>', self.on_content_modified)
+        self.content_text.bind('<Control-z>', self.undo)
+        self.content_text.bind('<Control-y>', self.redo)
+        self.content_text.bind('<Control-Z>', self.redo)
 
-        btn_frame = ttk.Frame(self.frame, style=f'{self.current_theme}.TFrame')
+        btn_frame = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
         btn_frame.pack(pady=10)
 
-        ttk.Button(btn_frame, text="Salvar", style=f'{self.current_theme}.TButton', command=self.save).pack(side='left', padx=5)
-        ttk.Button(btn_frame, text="Cancelar", style=f'{self.current_theme}.TButton', command=self.cancel).pack(side='left', padx=5)
-
-        if self.editing_entry_id:
-            self.load_entry_data()
+        ttk.Button(btn_frame, text="Salvar", style=self.theme.style_name('TButton'), command=self.save).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Cancelar", style=self.theme.style_name('TButton'), command=self.cancel).pack(side='left', padx=5)
 
     def load_entry_data(self):
+        """Preenche o editor com a entrada gravada e retorna seus valores"""
         entry = self.db.get_entry(self.editing_entry_id, self.user['id'])
         if entry:
             entry_id, title, content, created_at = entry
             self.title_entry.insert(0, title)
-            self.content_text.insert('1.0', content)
             try:
                 date_obj = datetime.strptime(created_at[:10], "%Y-%m-%d")
                 self.calendar.set_date(date_obj)
             except ValueError:
                 self.calendar.set_date(datetime.now())
+            self.set_content(content)
+            self._saved_tags = self.db.get_entry_tags(entry_id, self.user['id'])
+            self.tag_entry.set_tags(self._saved_tags)
+            return (title, content, self.calendar.get_date().strftime('%Y-%m-%d'))
         else:
             messagebox.showerror("Erro", "Entrada não encontrada.")
+            return None
 
     def save(self):
         try:
+            self.finish_loading()
             date_obj = self.calendar.get_date()
             title = self.title_entry.get().strip()
             content = self.content_text.get('1.0', 'end').strip()
@@ -71,16 +307,19 @@ class EntryUI:
                 messagebox.showerror("Erro", "Por favor, preencha todos os campos.")
                 return
 
-            if self.editing_entry_id:
-                success = self.db.update_entry(self.editing_entry_id, self.user['id'], sql_date, title, content)
-                action = "atualizada"
-            else:
-                success = self.db.create_entry(self.user['id'], title, content, sql_date)
-                action = "criada"
+            action = "atualizada" if self.editing_entry_id else "criada"
+
+            # O rascunho pendente é descartado da fila e a entrada é gravada
+            # junto com a remoção do rascunho, em uma única transação
+            self._cancel_autosave()
+            if self.writer is not None:
+                self.writer.discard(self.draft_key())
+            success = self.db.promote_draft(self.user['id'], self.editing_entry_id, title, content, sql_date,
+                                            tags=self.tag_entry.get_tags())
 
             if success:
                 messagebox.showinfo("Sucesso", f"Entrada {action} com sucesso!")
-                self.cancel()
+                self.close()
             else:
                 messagebox.showerror("Erro", f"Falha ao {action} entrada.")
 
@@ -88,17 +327,25 @@ class EntryUI:
             messagebox.showerror("Erro", f"Erro ao salvar entrada:\n{str(e)}")
 
     def cancel(self):
-        self.clear()
-        from ui.list_ui import ListUI
-        list_ui = ListUI(self.parent, self.db, self.user, self.theme)
-        list_ui.show()
+        if self.has_changes():
+            if not messagebox.askyesno("Confirmar", "Descartar as alterações não salvas?"):
+                return
+        self.discard_draft()
+        self.close()
+
+    def close(self):
+        self._detach_history()
+        self._saved_values = self._draft_values = None
+        self._cancel_autosave()
+        self._cancel_loader()
+        self.frame.pack_forget()
+        self.on_done()
 
     def clear(self):
         if self.frame:
             self.frame.destroy()
+            self.frame = None
     
     def update_theme(self, new_theme):
-        """Atualiza o tema da interface e reaplica o estilo"""
+        """Atualiza o tema da interface (os estilos 'current.*' já acompanham a troca)"""
         self.current_theme = new_theme
-        if self.frame:
-            self.show(self.editing_entry_id)
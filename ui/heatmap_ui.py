@@ -0,0 +1,183 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import defaultdict
+from datetime import date, timedelta
+
+# Geometria do calendário (em pixels)
+CELL = 13
+GAP = 3
+LEFT_MARGIN = 34
+TOP_MARGIN = 22
+
+MONTHS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+WEEKDAYS = {1: 'Seg', 3: 'Qua', 5: 'Sex'}  # Linhas rotuladas; a semana começa no domingo
+
+# Cores usadas quando o pacote de tema não define heatmap_0..heatmap_4
+DEFAULT_LEVELS = ['#ebedf0', '#9be9a8', '#40c463', '#30a14e', '#216e39']
+
+# Intervalo entre verificações enquanto os totais diários são calculados
+POLL_MS = 500
+
+
+class HeatmapUI:
+    """
+    Calendário de atividade: um quadrado por dia, mais escuro quanto mais
+    palavras escritas. Lê apenas os totais diários (daily_activity), de modo
+    que anos de entradas são desenhados a partir de algumas centenas de linhas.
+    Enquanto os totais de um banco antigo são calculados (ver
+    DatabaseManager.activity_batch), mostra "Calculando" e verifica de novo.
+    """
+
+    def __init__(self, parent, db, user, theme_manager):
+        self.parent = parent
+        self.db = db
+        self.user = user
+        self.theme = theme_manager
+        self.current_theme = theme_manager.current_theme
+        self.frame = None
+        self.canvas = None
+        self.year = date.today().year
+        self.by_year = {}
+        self.cells = {}  # {id do item no canvas: (dia, entradas, palavras)}
+        self.data_version = None
+        self._poll_job = None
+
+    def show(self):
+        if self.frame is None:
+            self.build()
+        self.frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.refresh()
+
+    def hide(self):
+        if self.frame is not None:
+            self.frame.pack_forget()
+
+    def build(self):
+        self.frame = ttk.Frame(self.parent, style=self.theme.style_name('TFrame'))
+
+        header = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
+        header.pack(fill='x', pady=(0, 10))
+        ttk.Button(header, text='◀', width=3, style=self.theme.style_name('TButton'),
+                   command=lambda: self.change_year(-1)).pack(side='left')
+        self.year_label = ttk.Label(header, font=('Segoe UI', 12, 'bold'), style=self.theme.style_name('TLabel'))
+        self.year_label.pack(side='left', padx=10)
+        ttk.Button(header, text='▶', width=3, style=self.theme.style_name('TButton'),
+                   command=lambda: self.change_year(1)).pack(side='left')
+        self.summary_label = ttk.Label(header, style=self.theme.style_name('TLabel'))
+        self.summary_label.pack(side='right')
+
+        width = LEFT_MARGIN + 54 * (CELL + GAP)
+        height = TOP_MARGIN + 7 * (CELL + GAP)
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, highlightthickness=0)
+        self.canvas.pack(anchor='w')
+        self.canvas.bind('<Motion>', self.on_motion)
+
+        self.detail_label = ttk.Label(self.frame, style=self.theme.style_name('TLabel'))
+        self.detail_label.pack(anchor='w', pady=(10, 0))
+
+    def refresh(self, force=False):
+        """Recarrega os totais apenas se o banco mudou desde a última leitura"""
+        if not self.db.activity_ready():
+            self.canvas.delete('all')
+            self.year_label.configure(text=str(self.year))
+            self.summary_label.configure(text='Calculando a atividade...')
+            if self._poll_job is None:
+                self._poll_job = self.frame.after(POLL_MS, self._poll)
+            return
+        version = self.db.data_version()
+        if force or version != self.data_version:
+            self.by_year = defaultdict(dict)
+            for day, entries, words, chars in self.db.get_daily_activity(self.user['id']):
+                self.by_year[int(day[:4])][day] = (entries, words)
+            self.data_version = version
+        self.draw()
+
+    def _poll(self):
+        self._poll_job = None
+        if self.frame is not None and self.frame.winfo_ismapped():
+            self.refresh()
+
+    def change_year(self, delta):
+        self.year += delta
+        if self.db.activity_ready():
+            self.draw()
+
+    def level_colors(self):
+        config = self.theme.get_theme_config()
+        return [config.get(f'heatmap_{i}', DEFAULT_LEVELS[i]) for i in range(5)]
+
+    def levels(self, days):
+        """Limiares de palavras (quartis dos dias com atividade) para os níveis 1 a 4"""
+        words = sorted(w for _, w in days.values() if w > 0)
+        if not words:
+            return []
+        return [words[len(words) * q // 4] for q in (1, 2, 3)]
+
+    def draw(self):
+        config = self.theme.get_theme_config()
+        colors = self.level_colors()
+        days = self.by_year.get(self.year, {})
+        thresholds = self.levels(days)
+
+        self.canvas.delete('all')
+        self.cells.clear()
+        self.canvas.configure(bg=config['bg'])
+        self.year_label.configure(text=str(self.year))
+
+        total_entries = sum(e for e, _ in days.values())
+        total_words = sum(w for _, w in days.values())
+        self.summary_label.configure(
+            text=f"{total_entries} entradas, {total_words} palavras em {len(days)} dias"
+        )
+
+        for row, name in WEEKDAYS.items():
+            self.canvas.create_text(LEFT_MARGIN - 6, TOP_MARGIN + row * (CELL + GAP) + CELL // 2,
+                                    text=name, anchor='e', fill=config['fg'], font=('Segoe UI', 8))
+
+        first = date(self.year, 1, 1)
+        offset = (first.weekday() + 1) % 7  # domingo = 0
+        current = first
+        while current.year == self.year:
+            index = (current - first).days + offset
+            column, row = divmod(index, 7)
+            x = LEFT_MARGIN + column * (CELL + GAP)
+            y = TOP_MARGIN + row * (CELL + GAP)
+
+            if current.day == 1:
+                self.canvas.create_text(x, TOP_MARGIN - 8, text=MONTHS[current.month - 1],
+                                        anchor='w', fill=config['fg'], font=('Segoe UI', 8))
+
+            key = current.isoformat()
+            entries, words = days.get(key, (0, 0))
+            level = 0
+            if entries:
+                level = 1 + sum(1 for limit in thresholds if words > limit)
+            item = self.canvas.create_rectangle(x, y, x + CELL, y + CELL, fill=colors[level], outline='')
+            self.cells[item] = (current, entries, words)
+            current += timedelta(days=1)
+
+    def on_motion(self, event):
+        items = self.canvas.find_withtag('current')
+        cell = self.cells.get(items[0]) if items else None
+        if cell is None:
+            self.detail_label.configure(text='')
+            return
+        day, entries, words = cell
+        if entries:
+            text = f"{day.strftime('%d/%m/%Y')}: {entries} entrada(s), {words} palavras"
+        else:
+            text = f"{day.strftime('%d/%m/%Y')}: nenhuma entrada"
+        self.detail_label.configure(text=text)
+
+    def clear(self):
+        if self.frame:
+            if self._poll_job is not None:
+                self.frame.after_cancel(self._poll_job)
+                self._poll_job = None
+            self.frame.destroy()
+            self.frame = None
+
+    def update_theme(self, new_theme):
+        self.current_theme = new_theme
+        if self.frame is not None and self.db.activity_ready():
+            self.draw()
@@ -2,9 +2,17 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
 
+from ui.text_loader import load_text
+from ui.on_this_day_ui import OnThisDayPanel
+from ui.tag_entry import TagEntry
+from ui.attachments_ui import AttachmentsPanel
+from tags import TagCompleter
+
 class ListUI:
-    def __init__(self, parent, db, user, theme_manager):
+    def __init__(self, parent, db, user, theme_manager, on_edit=None, writer=None):
         self.favorite_button = None
+        self.on_edit = on_edit
+        self.writer = writer
         self.parent = parent
         self.db = db
         self.user = user
@@ -13,49 +21,78 @@ class ListUI:
         self.tree = None
         self.search_entry = None
         self.frame = None
+        self.data_version = None  # Versão do banco na última carga da listagem
+        self.on_this_day = None
+        self.tag_completer = TagCompleter(db, user['id'])
+        self.thumbnails = {}  # Miniaturas dos anexos já carregadas: {blob_id: PhotoImage}
 
     def show(self):
-        self.clear()
-        self.frame = ttk.Frame(self.parent, style=f'{self.current_theme}.TFrame')
+        """Mostra a listagem; os widgets são criados só na primeira vez"""
+        if self.frame is None:
+            self.build()
         self.frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.refresh()
+        # O painel "Neste dia" é consultado depois que a listagem já apareceu
+        self.on_this_day.schedule_load()
+
+    def hide(self):
+        if self.frame is not None:
+            self.frame.pack_forget()
+
+    def refresh(self, force=False):
+        """Recarrega as entradas apenas se o banco mudou desde a última carga"""
+        if force or self.data_version != self.db.data_version():
+            self.load_data(self.search_entry.get())
+
+    def build(self):
+        self.frame = ttk.Frame(self.parent, style=self.theme.style_name('TFrame'))
 
         # Expansão dinâmica
         self.frame.rowconfigure(1, weight=1)
         self.frame.columnconfigure(0, weight=1)
 
         # Frame de pesquisa
-        search_frame = ttk.Frame(self.frame, style=f'{self.current_theme}.TFrame')
+        search_frame = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
         search_frame.grid(row=0, column=0, sticky='ew', pady=(0, 10))
         search_frame.columnconfigure(1, weight=1)
         search_frame.columnconfigure(3, weight=0)
 
-        ttk.Label(search_frame, text='🔍 Pesquisar:', style=f'{self.current_theme}.TLabel').grid(row=0, column=0, padx=(0, 5), sticky='w')
+        ttk.Label(search_frame, text='🔍 Pesquisar:', style=self.theme.style_name('TLabel')).grid(row=0, column=0, padx=(0, 5), sticky='w')
 
         self.search_entry = ttk.Entry(search_frame, font=('Segoe UI', 10))
         self.search_entry.grid(row=0, column=1, sticky='ew', padx=5)
         self.search_entry.bind('<KeyRelease>', self.filter)
 
-        ttk.Button(search_frame, text='Limpar', style=f'{self.current_theme}.TButton', command=self.clear_search).grid(row=0, column=2, padx=5)
+        ttk.Button(search_frame, text='Limpar', style=self.theme.style_name('TButton'), command=self.clear_search).grid(row=0, column=2, padx=5)
 
         # ✅ Botão Favoritar reposicionado corretamente
         self.favorite_button = ttk.Button(search_frame,
                                         text="★ Favoritar / Desfavoritar",
-                                        style=f'{self.current_theme}.TButton',
+                                        style=self.theme.style_name('TButton'),
                                         command=self.toggle_favorite)
         self.favorite_button.grid(row=0, column=3, padx=5)
 
-        # Estilo da Treeview
-        style = ttk.Style()
-        style.theme_use('clam')
-        tree_style = f"{self.current_theme}.Treeview"
-        style.configure(tree_style,
-                        background='#ffffff' if self.current_theme == 'light' else '#2b2b2b',
-                        foreground='black' if self.current_theme == 'light' else 'white',
-                        rowheight=28,
-                        fieldbackground='#f5f5f5' if self.current_theme == 'light' else '#1e1e1e')
-        style.map(tree_style,
-                background=[('selected', '#cce5ff' if self.current_theme == 'light' else '#444')],
-                foreground=[('selected', 'black' if self.current_theme == 'light' else 'white')])
+        # Filtros por tags e período, combinados com a pesquisa na mesma consulta
+        filter_frame = ttk.Frame(search_frame, style=self.theme.style_name('TFrame'))
+        filter_frame.grid(row=1, column=0, columnspan=4, sticky='ew', pady=(5, 0))
+        ttk.Label(filter_frame, text='Tags:', style=self.theme.style_name('TLabel')).pack(side='left', padx=(0, 5))
+        self.tag_filter = TagEntry(filter_frame, self.tag_completer, on_change=self.filter, font=('Segoe UI', 10))
+        self.tag_filter.pack(side='left', fill='x', expand=True, padx=5)
+        ttk.Label(filter_frame, text='De:', style=self.theme.style_name('TLabel')).pack(side='left', padx=(10, 5))
+        self.start_entry = ttk.Entry(filter_frame, width=11, font=('Segoe UI', 10))
+        self.start_entry.pack(side='left')
+        ttk.Label(filter_frame, text='Até:', style=self.theme.style_name('TLabel')).pack(side='left', padx=(10, 5))
+        self.end_entry = ttk.Entry(filter_frame, width=11, font=('Segoe UI', 10))
+        self.end_entry.pack(side='left')
+        for entry in (self.start_entry, self.end_entry):
+            entry.bind('<KeyRelease>', self.filter)
+        # Tolera acentos e erros de digitação; resultados ordenados por semelhança
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text='Busca aproximada', variable=self.fuzzy_var,
+                        style=self.theme.style_name('TCheckbutton'), command=self.filter).pack(side='left', padx=(10, 0))
+
+        # Estilo da Treeview (definido no pacote do tema e criado uma única vez pelo ThemeManager)
+        tree_style = self.theme.style_name('Treeview')
 
         # Treeview + Scrollbar em um frame
         tree_container = ttk.Frame(self.frame)
@@ -68,6 +105,7 @@ class ListUI:
                                 show='headings',
                                 style=tree_style)
         self.tree.grid(row=0, column=0, sticky='nsew')
+        self.theme.register_widget(self.tree)
 
         scrollbar = ttk.Scrollbar(tree_container, orient='vertical', command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
@@ -86,15 +124,18 @@ class ListUI:
         self.tree.column('favorito', width=50, anchor='center', stretch=False)
 
         # Botões no rodapé
-        btn_frame = ttk.Frame(self.frame, style=f'{self.current_theme}.TFrame')
+        btn_frame = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
         btn_frame.grid(row=2, column=0, pady=10, sticky='ew')
-        btn_frame.columnconfigure((0, 1, 2), weight=1)
+        btn_frame.columnconfigure((0, 1, 2, 3), weight=1)
 
-        ttk.Button(btn_frame, text='Visualizar', style=f'{self.current_theme}.TButton', command=self.view).grid(row=0, column=0, padx=5, sticky='ew')
-        ttk.Button(btn_frame, text='Editar', style=f'{self.current_theme}.TButton', command=self.edit).grid(row=0, column=1, padx=5, sticky='ew')
-        ttk.Button(btn_frame, text='Excluir', style=f'{self.current_theme}.TButton', command=self.delete).grid(row=0, column=2, padx=5, sticky='ew')
+        ttk.Button(btn_frame, text='Visualizar', style=self.theme.style_name('TButton'), command=self.view).grid(row=0, column=0, padx=5, sticky='ew')
+        ttk.Button(btn_frame, text='Editar', style=self.theme.style_name('TButton'), command=self.edit).grid(row=0, column=1, padx=5, sticky='ew')
+        ttk.Button(btn_frame, text='Excluir', style=self.theme.style_name('TButton'), command=self.delete).grid(row=0, column=2, padx=5, sticky='ew')
+        ttk.Button(btn_frame, text='Versões', style=self.theme.style_name('TButton'), command=self.show_revisions).grid(row=0, column=3, padx=5, sticky='ew')
 
-        self.load_data()
+        self.on_this_day = OnThisDayPanel(self.frame, self.db, self.user, self.theme, on_open=self.on_edit)
+        self.on_this_day.frame.grid(row=3, column=0, sticky='ew')
+        self.on_this_day.frame.grid_remove()
 
 
 
@@ -102,23 +143,42 @@ class ListUI:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        entries = self.db.get_entries(self.user['id'], search_term)
+        if search_term and self.fuzzy_var.get():
+            entries = self.db.fuzzy_search(self.user['id'], search_term, **self.filters())
+        else:
+            entries = self.db.get_entries(self.user['id'], search_term, **self.filters())
         for i, entry in enumerate(entries):
             entry_id, title, content, created_at, updated_at, favorite = entry
             preview = content[:100] + '...' if len(content) > 100 else content
             formatted_date = datetime.strptime(created_at[:10], '%Y-%m-%d').strftime('%d/%m/%Y')
             star = '★' if favorite else ''
-            tag = 'odd' if i % 2 == 0 else 'even'
+            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
             self.tree.insert('', 'end', values=(entry_id, formatted_date, title, preview, star), tags=(tag,))
 
-        self.tree.tag_configure('odd', background='#ffffff')
-        self.tree.tag_configure('even', background='#f7f7f7')
+        # As cores das linhas alternadas acompanham o tema (ThemeManager atualiza as tags)
+        config = self.theme.get_theme_config()
+        self.tree.tag_configure('oddrow', background=config['treeview_odd_bg'])
+        self.tree.tag_configure('evenrow', background=config['treeview_even_bg'])
+        self.data_version = self.db.data_version()
+
+    def filters(self):
+        """Tags e período informados; datas incompletas ou inválidas são ignoradas"""
+        dates = []
+        for entry in (self.start_entry, self.end_entry):
+            try:
+                dates.append(datetime.strptime(entry.get().strip(), '%d/%m/%Y').strftime('%Y-%m-%d'))
+            except ValueError:
+                dates.append(None)
+        return {'tags': self.tag_filter.get_tags(), 'start_date': dates[0], 'end_date': dates[1]}
 
     def filter(self, event=None):
         self.load_data(self.search_entry.get())
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
+        self.tag_filter.set_tags([])
+        self.start_entry.delete(0, 'end')
+        self.end_entry.delete(0, 'end')
         self.load_data()
 
     def view(self):
@@ -131,16 +191,16 @@ class ListUI:
         view_window.title(f"Entrada - {title}")
         view_window.geometry("700x500")
 
-        main_frame = ttk.Frame(view_window, style=f'{self.current_theme}.TFrame')
+        main_frame = ttk.Frame(view_window, style=self.theme.style_name('TFrame'))
         main_frame.pack(fill='both', expand=True, padx=20, pady=20)
 
-        header_frame = ttk.Frame(main_frame, style=f'{self.current_theme}.TFrame')
+        header_frame = ttk.Frame(main_frame, style=self.theme.style_name('TFrame'))
         header_frame.pack(fill='x', pady=(0, 10))
 
         ttk.Label(header_frame,
                   text=f"{formatted_date} - {title}",
                   font=('Segoe UI', 12, 'bold'),
-                  style=f'{self.current_theme}.TLabel').pack(side='left')
+                  style=self.theme.style_name('TLabel')).pack(side='left')
 
         text_frame = ttk.Frame(main_frame)
         text_frame.pack(fill='both', expand=True)
@@ -152,21 +212,98 @@ class ListUI:
                                          bg='#ffffff' if self.current_theme == 'light' else '#1e1e1e',
                                          fg='black' if self.current_theme == 'light' else 'white',
                                          insertbackground='black' if self.current_theme == 'light' else 'white')
-        text.insert('1.0', content)
         text.config(state='disabled')
         text.pack(fill='both', expand=True)
+        # Entradas longas entram em partes: a primeira tela aparece de imediato
+        load_text(text, content, readonly=True)
+
+        AttachmentsPanel(main_frame, self.db, self.user, self.theme, entry_id,
+                         self.thumbnails, writer=self.writer).pack(fill='x', pady=(10, 0))
+
+        ttk.Button(main_frame, text="Fechar", style=self.theme.style_name('TButton'), command=view_window.destroy).pack(pady=(10, 0))
+
+    def show_revisions(self):
+        """Lista as versões anteriores da entrada selecionada e permite restaurá-las"""
+        selected = self.get_selected()
+        if not selected:
+            return
+        entry_id, formatted_date, title, content = selected
+        revisions = self.db.get_revisions(entry_id, self.user['id'])
+        if not revisions:
+            messagebox.showinfo("Versões", "Esta entrada ainda não tem versões anteriores.")
+            return
 
-        ttk.Button(main_frame, text="Fechar", style=f'{self.current_theme}.TButton', command=view_window.destroy).pack(pady=(10, 0))
+        window = tk.Toplevel(self.parent)
+        window.title(f"Versões - {title}")
+        window.geometry("600x350")
+
+        main_frame = ttk.Frame(window, style=self.theme.style_name('TFrame'))
+        main_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        tree = ttk.Treeview(main_frame, columns=('revision', 'saved', 'title'),
+                            show='headings', style=self.theme.style_name('Treeview'))
+        tree.heading('revision', text='Versão')
+        tree.heading('saved', text='Substituída em')
+        tree.heading('title', text='Título')
+        tree.column('revision', width=60, stretch=False)
+        tree.column('saved', width=150, stretch=False)
+        tree.column('title', width=300, stretch=True)
+        tree.pack(fill='both', expand=True)
+        for revision, rev_title, entry_date, saved_at, size in revisions:
+            tree.insert('', 'end', iid=str(revision), values=(revision, saved_at, rev_title))
+
+        def selected_revision():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showwarning("Aviso", "Selecione uma versão", parent=window)
+                return None
+            return int(selection[0])
+
+        def view_revision():
+            revision = selected_revision()
+            if revision is None:
+                return
+            old = self.db.get_revision(entry_id, self.user['id'], revision)
+            if old is None:
+                messagebox.showerror("Erro", "Versão não encontrada", parent=window)
+                return
+            rev_title, rev_content, _ = old
+            view_window = tk.Toplevel(window)
+            view_window.title(f"Versão {revision} - {rev_title}")
+            view_window.geometry("700x500")
+            text = scrolledtext.ScrolledText(view_window, wrap='word', font=('Segoe UI', 11), padx=10, pady=10)
+            text.config(state='disabled')
+            text.pack(fill='both', expand=True)
+            self.theme.register_widget(text)
+            load_text(text, rev_content, readonly=True)
+
+        def restore_revision():
+            revision = selected_revision()
+            if revision is None:
+                return
+            if not messagebox.askyesno("Confirmar",
+                                       f"Restaurar a versão {revision}? A versão atual será mantida no histórico.",
+                                       parent=window):
+                return
+            if self.db.restore_revision(entry_id, self.user['id'], revision):
+                window.destroy()
+                self.load_data(self.search_entry.get())
+                self.select_entry(entry_id)
+            else:
+                messagebox.showerror("Erro", "Falha ao restaurar versão", parent=window)
+
+        btn_frame = ttk.Frame(main_frame, style=self.theme.style_name('TFrame'))
+        btn_frame.pack(pady=(10, 0))
+        ttk.Button(btn_frame, text="Visualizar", style=self.theme.style_name('TButton'), command=view_revision).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Restaurar", style=self.theme.style_name('TButton'), command=restore_revision).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Fechar", style=self.theme.style_name('TButton'), command=window.destroy).pack(side='left', padx=5)
 
     def edit(self):
         selected = self.get_selected()
         if not selected:
             return
         entry_id = selected[0]
-        self.clear()
-        from ui.entry_ui import EntryUI
-        entry_ui = EntryUI(parent=self.parent, db=self.db, user=self.user, theme_manager=self.theme)
-        entry_ui.show(entry_id=entry_id)
+        self.on_edit(entry_id)
 
     def delete(self):
         selected = self.get_selected()
@@ -177,7 +314,7 @@ class ListUI:
             success = self.db.delete_entry(entry_id, self.user['id'])
             if success:
                 messagebox.showinfo("Sucesso", "Entrada excluída com sucesso!")
-                self.load_data()
+                self.load_data(self.search_entry.get())
             else:
                 messagebox.showerror("Erro", "Falha ao excluir entrada")
 
@@ -202,11 +339,11 @@ class ListUI:
     def clear(self):
         if self.frame:
             self.frame.destroy()
+            self.frame = None
 
     def update_theme(self, new_theme):
+        # Os widgets usam os estilos 'current.*', atualizados pelo ThemeManager
         self.current_theme = new_theme
-        if self.frame:
-            self.show()
 
     def toggle_favorite(self):
         selected = self.tree.focus()
@@ -219,4 +356,14 @@ class ListUI:
         new_fav = 0 if current_star == '★' else 1
         if self.db.set_favorite(entry_id, new_fav):
             messagebox.showinfo("Sucesso", "Entrada atualizada.")
-            self.show()
+            self.load_data(self.search_entry.get())
+            self.select_entry(entry_id)
+
+    def select_entry(self, entry_id):
+        """Seleciona a linha da entrada informada, se ela estiver na listagem"""
+        for item in self.tree.get_children():
+            if self.tree.item(item)['values'][0] == entry_id:
+                self.tree.selection_set(item)
+                self.tree.focus(item)
+                self.tree.see(item)
+                break
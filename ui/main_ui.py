@@ -2,30 +2,38 @@ from tkinter import ttk, Menu, simpledialog, messagebox
 
 from ui.entry_ui import EntryUI
 from ui.list_ui import ListUI
-from export.export import ExportManager
+from ui.view_manager import ViewManager
+from ui.heatmap_ui import HeatmapUI
+from ui.stats_ui import StatsUI
 
 from datetime import datetime
 
 class MainUI:
-    def __init__(self, root, db, user, theme_manager, logout_callback):
+    def __init__(self, root, db, user, theme_manager, logout_callback, profiler=None, writer=None):
         self.root = root
+        self.writer = writer
         self.db = db
         self.user = user
         self.theme = theme_manager
         self.logout_callback = logout_callback
+        self.profiler = profiler
+        self.debug_panel = None
 
-        self.frame = ttk.Frame(root, style=f'{self.theme.current_theme}.TFrame')
+        self.frame = ttk.Frame(root, style=self.theme.style_name('TFrame'))
         self.frame.pack(fill='both', expand=True)
 
         self.create_widgets()
 
     def create_widgets(self):
         # Barra de menu
-        menu_bar = ttk.Frame(self.frame, style=f'{self.theme.current_theme}.TFrame')
+        menu_bar = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
         menu_bar.pack(fill='x', padx=5, pady=5)
 
         ttk.Button(menu_bar, text='Nova Entrada', command=self.show_new_entry).pack(side='left', padx=5)
         ttk.Button(menu_bar, text='Minhas Entradas', command=self.show_entries).pack(side='left', padx=5)
+        ttk.Button(menu_bar, text='Atividade', command=self.show_activity).pack(side='left', padx=5)
+        ttk.Button(menu_bar, text='Estatísticas', command=self.show_stats).pack(side='left', padx=5)
+        ttk.Button(menu_bar, text='Duplicadas', command=self.show_duplicates).pack(side='left', padx=5)
         ttk.Button(menu_bar, text='Alternar Tema', command=self.toggle_theme).pack(side='left', padx=5)
 
         # Botão com menu de exportação
@@ -44,33 +52,72 @@ class MainUI:
 
         ttk.Button(menu_bar, text='Sair', command=self.logout_callback).pack(side='right', padx=5)
 
+        # Painel de depuração oculto (Ctrl+Shift+D) quando o perfilador está ativo
+        if self.profiler:
+            from ui.debug_ui import DebugPanel
+            self.debug_panel = DebugPanel(self.frame, self.profiler, self.theme)
+            self.root.bind('<Control-D>', self.debug_panel.toggle)
+
         # Frame de conteúdo
-        self.content_frame = ttk.Frame(self.frame, style=f'{self.theme.current_theme}.TFrame')
+        self.content_frame = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
         self.content_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-        # Inicializa sub-interfaces
-        self.entry_ui = EntryUI(self.content_frame, self.db, self.user, self.theme)
-        self.list_ui = ListUI(self.content_frame, self.db, self.user, self.theme)
+        # Inicializa sub-interfaces; as telas são mantidas vivas e apenas alternadas
+        self.views = ViewManager(self.content_frame)
+        self.entry_ui = self.views.register('editor', EntryUI(self.content_frame, self.db, self.user, self.theme,
+                                                              on_done=self.show_entries, writer=self.writer))
+        self.list_ui = self.views.register('list', ListUI(self.content_frame, self.db, self.user, self.theme,
+                                                          on_edit=self.show_edit_entry, writer=self.writer))
+        self.heatmap_ui = self.views.register('heatmap', HeatmapUI(self.content_frame, self.db, self.user, self.theme))
+        self.stats_ui = self.views.register('stats', StatsUI(self.content_frame, self.db, self.user, self.theme))
 
         self.show_entries()
+        self.root.after_idle(self.recover_drafts)
+
+    def recover_drafts(self):
+        """Oferece recuperar rascunhos que ficaram sem salvar na última sessão"""
+        drafts = self.db.get_drafts(self.user['id'])
+        if not drafts:
+            return
+        if messagebox.askyesno("Rascunhos",
+                               f"Há {len(drafts)} rascunho(s) não salvo(s) da última sessão.\n"
+                               "Deseja recuperá-los? Responder \"Não\" descarta os rascunhos."):
+            # Abre o mais recente; os demais são carregados ao abrir a entrada correspondente
+            entry_id = drafts[0][0]
+            self.views.show('editor', entry_id=entry_id)
+        else:
+            self.db.delete_drafts(self.user['id'])
+
+    def save_pending_changes(self):
+        """Grava rascunhos ainda aguardando o autosave (logout ou fechamento)"""
+        self.entry_ui.flush_draft()
 
     def show_new_entry(self):
-        self.clear_content()
-        self.entry_ui.show()
+        self.views.show('editor')
+
+    def show_edit_entry(self, entry_id):
+        self.views.show('editor', entry_id=entry_id)
 
     def show_entries(self):
-        self.clear_content()
-        self.list_ui.show()
+        self.views.show('list')
+
+    def show_activity(self):
+        self.views.show('heatmap')
+
+    def show_stats(self):
+        self.views.show('stats')
+
+    def show_duplicates(self):
+        from ui.dedup_ui import DuplicatesDialog
+        DuplicatesDialog(self.root, self.db, self.user, self.theme,
+                         on_change=self.list_ui.load_data, writer=self.writer)
 
     def toggle_theme(self):
         new_theme = self.theme.toggle()
-        self.frame.configure(style=f'{new_theme}.TFrame')
         self.entry_ui.update_theme(new_theme)
         self.list_ui.update_theme(new_theme)
-
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        self.heatmap_ui.update_theme(new_theme)
+        self.stats_ui.update_theme(new_theme)
 
     def get_entries_all(self):
         return self.db.get_entries_by_user_id(self.user['id'])
@@ -93,7 +140,10 @@ class MainUI:
         if not entries:
             messagebox.showinfo("Sem dados", "Nenhuma entrada encontrada para exportar.")
             return
-        manager = ExportManager(entries, self.user['username'])
+        # Importado sob demanda: o fpdf só é carregado na primeira exportação
+        from export.export import ExportManager
+        from attachments import AttachmentReader
+        manager = ExportManager(entries, self.user['username'], AttachmentReader(self.db, self.user['id']))
         if format == "pdf":
             manager.to_pdf()
         else:
@@ -0,0 +1,65 @@
+from tkinter import ttk
+from datetime import date
+
+MAX_ITEMS = 5
+PREVIEW_CHARS = 80
+
+
+class OnThisDayPanel:
+    """
+    Painel "Neste dia": entradas escritas no mesmo dia e mês em anos
+    anteriores. A consulta é feita por load(), agendada pela listagem depois
+    que ela já foi desenhada, e repetida apenas quando o dia ou os dados mudam.
+    """
+
+    def __init__(self, parent, db, user, theme_manager, on_open=None):
+        self.db = db
+        self.user = user
+        self.theme = theme_manager
+        self.on_open = on_open
+        self.frame = ttk.Frame(parent, style=self.theme.style_name('TFrame'))
+        ttk.Label(self.frame, text='Neste dia', font=('Segoe UI', 10, 'bold'),
+                  style=self.theme.style_name('TLabel')).pack(anchor='w')
+        self.items = ttk.Frame(self.frame, style=self.theme.style_name('TFrame'))
+        self.items.pack(fill='x')
+        self.loaded_for = None  # (dia, versão do banco) da última consulta
+        self._job = None
+
+    def schedule_load(self):
+        """Consulta quando o Tk estiver ocioso, sem atrasar a exibição da tela"""
+        if self._job is None:
+            self._job = self.frame.after_idle(self.load)
+
+    def load(self):
+        self._job = None
+        today = date.today().isoformat()
+        state = (today, self.db.data_version())
+        if state == self.loaded_for:
+            return
+        self.loaded_for = state
+
+        for child in self.items.winfo_children():
+            child.destroy()
+        # Uma a mais só para saber se há outras; o total é contado à parte
+        entries = self.db.get_entries_on_this_day(self.user['id'], today, limit=MAX_ITEMS + 1,
+                                                  preview_chars=PREVIEW_CHARS * 2)
+        if not entries:
+            self.frame.grid_remove()
+            return
+
+        for entry_id, title, content, created_at in entries[:MAX_ITEMS]:
+            years = int(today[:4]) - int(created_at[:4])
+            preview = " ".join(content.split())[:PREVIEW_CHARS]
+            text = f"Há {years} ano{'s' if years > 1 else ''} — {title}: {preview}"
+            label = ttk.Label(self.items, text=text, cursor='hand2', style=self.theme.style_name('TLabel'))
+            label.pack(anchor='w', padx=5, pady=1)
+            label.bind('<Button-1>', lambda event, eid=entry_id: self.open(eid))
+        if len(entries) > MAX_ITEMS:
+            more = self.db.count_entries_on_this_day(self.user['id'], today) - MAX_ITEMS
+            ttk.Label(self.items, text=f"e mais {more} entrada(s)",
+                      style=self.theme.style_name('TLabel')).pack(anchor='w', padx=5, pady=1)
+        self.frame.grid()
+
+    def open(self, entry_id):
+        if self.on_open:
+            self.on_open(entry_id)
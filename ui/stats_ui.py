@@ -0,0 +1,209 @@
+import logging
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_NAMES = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+CHART_WIDTH = 560
+CHART_HEIGHT = 140
+POLL_MS = 100
+ACTIVITY_POLL_MS = 500
+
+
+class StatsUI:
+    """
+    Estatísticas de escrita (ver stats.py). Com o cache válido, a tela é
+    montada na hora; caso contrário o cálculo roda numa thread com conexão
+    própria e a tela é preenchida quando ele termina. Num banco antigo, o
+    cálculo espera os totais diários ficarem completos.
+    """
+
+    def __init__(self, parent, db, user, theme_manager):
+        self.parent = parent
+        self.db = db
+        self.user = user
+        self.theme = theme_manager
+        self.current_theme = theme_manager.current_theme
+        self.frame = None
+        self.stats = None
+        self._result = None
+        self._worker = None
+        self._activity_job = None
+
+    def show(self):
+        if self.frame is None:
+            self.build()
+        self.frame.pack(fill='both', expand=True, padx=10, pady=10)
+        self.refresh()
+
+    def hide(self):
+        if self.frame is not None:
+            self.frame.pack_forget()
+
+    def build(self):
+        style = self.theme.style_name
+        self.frame = ttk.Frame(self.parent, style=style('TFrame'))
+
+        self.status_label = ttk.Label(self.frame, style=style('TLabel'))
+        self.status_label.pack(anchor='w', pady=(0, 10))
+
+        summary = ttk.Frame(self.frame, style=style('TFrame'))
+        summary.pack(fill='x', pady=(0, 10))
+        self.summary_labels = {}
+        fields = [
+            ('entries', 'Entradas'), ('total_words', 'Palavras'), ('mean_words', 'Média por entrada'),
+            ('median_words', 'Mediana por entrada'), ('active_days', 'Dias com escrita'),
+            ('current_streak', 'Sequência atual'), ('longest_streak', 'Maior sequência'),
+            ('vocabulary', 'Vocabulário'),
+        ]
+        for index, (key, text) in enumerate(fields):
+            row, column = divmod(index, 4)
+            ttk.Label(summary, text=f"{text}:", style=style('TLabel')).grid(
+                row=row, column=column * 2, sticky='w', padx=(0, 5))
+            label = ttk.Label(summary, font=('Segoe UI', 10, 'bold'), style=style('TLabel'))
+            label.grid(row=row, column=column * 2 + 1, sticky='w', padx=(0, 20))
+            self.summary_labels[key] = label
+
+        ttk.Label(self.frame, text='Palavras por dia da semana', style=style('TLabel')).pack(anchor='w')
+        self.weekday_canvas = tk.Canvas(self.frame, width=CHART_WIDTH, height=CHART_HEIGHT, highlightthickness=0)
+        self.weekday_canvas.pack(anchor='w', pady=(0, 10))
+
+        ttk.Label(self.frame, text='Média móvel de palavras por dia (7 e 30 dias, último ano)',
+                  style=style('TLabel')).pack(anchor='w')
+        self.trend_canvas = tk.Canvas(self.frame, width=CHART_WIDTH, height=CHART_HEIGHT, highlightthickness=0)
+        self.trend_canvas.pack(anchor='w', pady=(0, 10))
+
+        ttk.Label(self.frame, text='Crescimento do vocabulário', style=style('TLabel')).pack(anchor='w')
+        self.vocabulary_canvas = tk.Canvas(self.frame, width=CHART_WIDTH, height=CHART_HEIGHT,
+                                           highlightthickness=0)
+        self.vocabulary_canvas.pack(anchor='w')
+
+    def refresh(self):
+        try:
+            import stats
+        except ImportError:
+            self.status_label.configure(text='As estatísticas requerem o pacote numpy.')
+            return
+
+        if not self.db.activity_ready():
+            self.status_label.configure(text='Calculando estatísticas...')
+            if self._activity_job is None:
+                self._activity_job = self.frame.after(ACTIVITY_POLL_MS, self._wait_activity)
+            return
+
+        cached = stats.get_cached_stats(self.db, self.user['id'])
+        if cached is not None:
+            self.stats = cached
+            self.draw()
+            return
+        if self._worker is None:
+            self.status_label.configure(text='Calculando estatísticas...')
+            self._worker = threading.Thread(target=self._compute, name='stats', daemon=True)
+            self._worker.start()
+            self.frame.after(POLL_MS, self._poll)
+
+    def _wait_activity(self):
+        self._activity_job = None
+        if self.frame is not None and self.frame.winfo_ismapped():
+            self.refresh()
+
+    def _compute(self):
+        """Roda na thread de cálculo, com uma conexão própria"""
+        import stats
+        db = DatabaseManager(self.db.db_name)
+        try:
+            self._result = stats.get_stats(db, self.user['id'])
+        except Exception as e:
+            logger.error(f"Erro ao calcular estatísticas: {e}")
+            self._result = e
+        finally:
+            db.close()
+
+    def _poll(self):
+        if self.frame is None:
+            return
+        if self._worker.is_alive():
+            self.frame.after(POLL_MS, self._poll)
+            return
+        self._worker = None
+        result, self._result = self._result, None
+        if isinstance(result, Exception):
+            self.status_label.configure(text='Não foi possível calcular as estatísticas.')
+            return
+        self.stats = result
+        if self.frame.winfo_ismapped():
+            # As entradas podem ter mudado durante o cálculo
+            self.refresh()
+
+    def draw(self):
+        stats = self.stats
+        if stats is None:
+            return
+        config = self.theme.get_theme_config()
+        if stats['entries']:
+            self.status_label.configure(text=f"Desde {stats['monthly'][0][0]}")
+        else:
+            self.status_label.configure(text='Nenhuma entrada ainda.')
+
+        values = dict(stats)
+        values['mean_words'] = f"{stats['mean_words']:.0f}"
+        values['median_words'] = f"{stats['median_words']:.0f}"
+        values['current_streak'] = f"{stats['current_streak']} dias"
+        values['longest_streak'] = f"{stats['longest_streak']} dias"
+        for key, label in self.summary_labels.items():
+            label.configure(text=str(values[key]))
+
+        accent = config.get('heatmap_3', '#30a14e')
+        self.draw_bars(self.weekday_canvas, config, WEEKDAY_NAMES, stats['weekday_words'], accent)
+        rolling = stats['rolling']
+        windows = sorted(rolling)
+        self.draw_lines(self.trend_canvas, config,
+                        [(rolling[windows[0]], config.get('heatmap_2', '#40c463')),
+                         (rolling[windows[-1]], accent)])
+        self.draw_lines(self.vocabulary_canvas, config,
+                        [([size for _, size in stats['vocabulary_growth']], accent)])
+
+    def draw_bars(self, canvas, config, names, values, color):
+        canvas.delete('all')
+        canvas.configure(bg=config['bg'])
+        top = max(values) if values and max(values) else 1
+        width = CHART_WIDTH // len(names)
+        for i, (name, value) in enumerate(zip(names, values)):
+            x = i * width + 10
+            height = (CHART_HEIGHT - 30) * value / top
+            canvas.create_rectangle(x, CHART_HEIGHT - 20 - height, x + width - 20, CHART_HEIGHT - 20,
+                                    fill=color, outline='')
+            canvas.create_text(x + (width - 20) // 2, CHART_HEIGHT - 10, text=name,
+                               fill=config['fg'], font=('Segoe UI', 8))
+
+    def draw_lines(self, canvas, config, series):
+        canvas.delete('all')
+        canvas.configure(bg=config['bg'])
+        top = max((max(values) for values, _ in series if values), default=0) or 1
+        for values, color in series:
+            if len(values) < 2:
+                continue
+            step = (CHART_WIDTH - 20) / (len(values) - 1)
+            points = []
+            for i, value in enumerate(values):
+                points.extend((10 + i * step, CHART_HEIGHT - 10 - (CHART_HEIGHT - 20) * value / top))
+            canvas.create_line(*points, fill=color, width=2)
+        canvas.create_text(CHART_WIDTH - 10, 10, text=f"{top:.0f}", anchor='ne',
+                           fill=config['fg'], font=('Segoe UI', 8))
+
+    def clear(self):
+        if self.frame:
+            if self._activity_job is not None:
+                self.frame.after_cancel(self._activity_job)
+                self._activity_job = None
+            self.frame.destroy()
+            self.frame = None
+
+    def update_theme(self, new_theme):
+        self.current_theme = new_theme
+        if self.frame is not None:
+            self.draw()
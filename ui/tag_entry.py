@@ -0,0 +1,101 @@
+import tkinter as tk
+from tkinter import ttk
+
+from tags import normalize_tag, parse_tags, format_tags
+
+MAX_SUGGESTIONS = 6
+
+
+class TagEntry:
+    """
+    Campo de tags separadas por vírgula, com sugestões para a tag que está
+    sendo digitada (a última). As sugestões vêm de um TagCompleter e
+    aparecem numa lista sobreposta logo abaixo do campo.
+    """
+
+    def __init__(self, parent, completer, on_change=None, **entry_options):
+        self.completer = completer
+        self.on_change = on_change
+        self.entry = ttk.Entry(parent, **entry_options)
+        self.entry.bind('<KeyRelease>', self.on_key)
+        self.entry.bind('<Down>', self.focus_suggestions)
+        self.entry.bind('<Escape>', lambda event: self.hide_suggestions())
+        self.entry.bind('<FocusOut>', self.on_focus_out)
+
+        self.listbox = tk.Listbox(self.entry.winfo_toplevel(), height=MAX_SUGGESTIONS,
+                                  exportselection=False, font=('Segoe UI', 10))
+        self.listbox.bind('<ButtonRelease-1>', self.accept)
+        self.listbox.bind('<Return>', self.accept)
+        self.listbox.bind('<Escape>', lambda event: self.hide_suggestions())
+
+    # Repassa o posicionamento para o campo
+    def pack(self, **options):
+        self.entry.pack(**options)
+
+    def grid(self, **options):
+        self.entry.grid(**options)
+
+    def get_tags(self):
+        return parse_tags(self.entry.get())
+
+    def set_tags(self, tags):
+        self.entry.delete(0, 'end')
+        self.entry.insert(0, format_tags(tags))
+        self.hide_suggestions()
+
+    def _split(self):
+        """(tags já completas, trecho da tag em digitação)"""
+        head, _, fragment = self.entry.get().rpartition(',')
+        return parse_tags(head), fragment.strip()
+
+    def on_key(self, event):
+        if event.keysym in ('Down', 'Escape', 'Return', 'Tab'):
+            return
+        typed, fragment = self._split()
+        suggestions = [tag for tag in self.completer.complete(fragment, MAX_SUGGESTIONS + len(typed))
+                       if tag not in typed and tag != normalize_tag(fragment)] if fragment else []
+        self.show_suggestions(suggestions[:MAX_SUGGESTIONS])
+        if self.on_change:
+            self.on_change()
+
+    def show_suggestions(self, suggestions):
+        self.listbox.delete(0, 'end')
+        if not suggestions:
+            self.hide_suggestions()
+            return
+        for tag in suggestions:
+            self.listbox.insert('end', tag)
+        self.listbox.configure(height=len(suggestions))
+        self.listbox.place(in_=self.entry, relx=0, rely=1, relwidth=1)
+        self.listbox.lift()
+
+    def hide_suggestions(self):
+        self.listbox.place_forget()
+
+    def focus_suggestions(self, event=None):
+        if self.listbox.winfo_ismapped():
+            self.listbox.focus_set()
+            self.listbox.selection_set(0)
+            return 'break'
+
+    def on_focus_out(self, event=None):
+        # Um clique na lista tira o foco do campo: espera o clique ser tratado
+        self.entry.after(150, self._hide_if_unfocused)
+
+    def _hide_if_unfocused(self):
+        if self.entry.focus_get() not in (self.entry, self.listbox):
+            self.hide_suggestions()
+
+    def accept(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        tags, _ = self._split()
+        tags.append(self.listbox.get(selection[0]))
+        self.entry.delete(0, 'end')
+        self.entry.insert(0, format_tags(tags) + ', ')
+        self.entry.icursor('end')
+        self.entry.focus_set()
+        self.hide_suggestions()
+        if self.on_change:
+            self.on_change()
@@ -0,0 +1,93 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# O primeiro bloco é inserido na hora e cobre com folga uma tela de texto;
+# o restante entra em blocos maiores, um por volta do loop de eventos
+FIRST_CHUNK_CHARS = 8 * 1024
+CHUNK_CHARS = 64 * 1024
+CHUNK_INTERVAL_MS = 1
+
+
+class ChunkedTextLoader:
+    """
+    Insere um texto longo em um widget Text em partes agendadas com after.
+
+    Entre um bloco e outro o Tk processa eventos normalmente, de modo que
+    entradas de vários megabytes não travam a interface ao serem abertas.
+    Quem precisar do conteúdo completo antes do fim (ex.: ao salvar) deve
+    chamar finish(), que insere o restante de uma vez.
+    """
+
+    def __init__(self, widget, text, on_done=None, readonly=False,
+                 first_chunk=FIRST_CHUNK_CHARS, chunk_size=CHUNK_CHARS):
+        self.widget = widget
+        self.text = text
+        self.on_done = on_done
+        self.readonly = readonly
+        self.first_chunk = first_chunk
+        self.chunk_size = chunk_size
+        self.position = 0
+        self._job = None
+        self.active = False
+
+    def start(self):
+        self.active = True
+        self._insert(self.first_chunk)
+        self.widget.mark_set('insert', '1.0')
+        self._continue()
+        return self
+
+    def finish(self):
+        """Insere imediatamente tudo o que ainda falta"""
+        if not self.active:
+            return
+        self._cancel_job()
+        self._insert(len(self.text) - self.position)
+        self._done()
+
+    def cancel(self):
+        self._cancel_job()
+        self.active = False
+
+    def _continue(self):
+        if self.position >= len(self.text):
+            self._done()
+        else:
+            self._job = self.widget.after(CHUNK_INTERVAL_MS, self._step)
+
+    def _step(self):
+        self._job = None
+        if not self.widget.winfo_exists():
+            # Janela fechada antes do fim do carregamento
+            self.active = False
+            return
+        self._insert(self.chunk_size)
+        self._continue()
+
+    def _insert(self, size):
+        chunk = self.text[self.position:self.position + size]
+        if not chunk:
+            return
+        if self.readonly:
+            self.widget.config(state='normal')
+        self.widget.insert('end-1c', chunk)
+        if self.readonly:
+            self.widget.config(state='disabled')
+        self.position += len(chunk)
+
+    def _cancel_job(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _done(self):
+        self.active = False
+        self.text = None
+        if self.on_done:
+            self.on_done()
+
+
+def load_text(widget, text, on_done=None, readonly=False):
+    """Preenche o widget com o texto, em partes se ele for grande"""
+    return ChunkedTextLoader(widget, text, on_done=on_done, readonly=readonly).start()
@@ -0,0 +1,43 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ViewManager:
+    """
+    Alterna entre as telas da área de conteúdo sem destruí-las.
+
+    Cada tela registrada precisa oferecer show(**kwargs) e hide(); a tela
+    constrói seus widgets na primeira exibição e depois apenas volta a ser
+    empacotada, preservando seleção, rolagem e dados já carregados.
+    """
+
+    def __init__(self, container):
+        self.container = container
+        self.views = {}
+        self.current = None
+
+    def register(self, name, view):
+        self.views[name] = view
+        return view
+
+    def get(self, name):
+        return self.views.get(name)
+
+    def show(self, name, **kwargs):
+        view = self.views.get(name)
+        if view is None:
+            logger.error(f"Tela não registrada: {name}")
+            return None
+
+        if self.current is not None and self.current != name:
+            self.views[self.current].hide()
+        self.current = name
+        view.show(**kwargs)
+        return view
+
+    def destroy(self):
+        for view in self.views.values():
+            view.clear()
+        self.views.clear()
+        self.current = None
@@ -0,0 +1,154 @@
+import time
+import zlib
+from collections import deque
+
+# Limite padrão de memória do histórico de cada entrada (em caracteres guardados)
+DEFAULT_MAX_CHARS = 512 * 1024
+# Alterações consecutivas dentro deste intervalo formam um único passo de desfazer
+MERGE_WINDOW = 1.0
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Tamanho do prefixo comum, por busca binária (as comparações rodam em C)"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def text_checksum(text: str) -> tuple:
+    return (len(text), zlib.crc32(text.encode('utf-8')))
+
+
+class Delta:
+    """Trecho substituído: em pos, 'removed' deu lugar a 'inserted'"""
+
+    __slots__ = ('pos', 'removed', 'inserted', 'time')
+
+    def __init__(self, pos, removed, inserted, timestamp):
+        self.pos = pos
+        self.removed = removed
+        self.inserted = inserted
+        self.time = timestamp
+
+    @classmethod
+    def between(cls, old: str, new: str, timestamp=None):
+        """Calcula a diferença entre dois textos; None se forem iguais"""
+        if old == new:
+            return None
+        prefix = _common_prefix(old, new)
+        suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+        return cls(prefix, old[prefix:len(old) - suffix], new[prefix:len(new) - suffix],
+                   time.monotonic() if timestamp is None else timestamp)
+
+    @property
+    def size(self):
+        return len(self.removed) + len(self.inserted)
+
+    def inverse(self):
+        return Delta(self.pos, self.inserted, self.removed, self.time)
+
+    def apply(self, text: str) -> str:
+        return text[:self.pos] + self.inserted + text[self.pos + len(self.removed):]
+
+    def merge(self, other) -> bool:
+        """Incorpora uma alteração seguinte se ela continua esta (digitação ou apagamento)"""
+        if other.time - self.time > MERGE_WINDOW or '\n' in other.inserted:
+            return False
+        if not self.removed and not other.removed and other.pos == self.pos + len(self.inserted):
+            self.inserted += other.inserted
+        elif not self.inserted and not other.inserted and other.pos + len(other.removed) == self.pos:
+            # Backspace
+            self.pos = other.pos
+            self.removed = other.removed + self.removed
+        elif not self.inserted and not other.inserted and other.pos == self.pos:
+            # Delete
+            self.removed += other.removed
+        else:
+            return False
+        self.time = other.time
+        return True
+
+
+class UndoHistory:
+    """
+    Histórico de desfazer/refazer de um texto, guardado como diferenças.
+
+    Cada passo registra apenas o trecho alterado (prefixo e sufixo comuns
+    são descartados), e o total guardado é limitado a max_chars: ao passar
+    do limite, os passos mais antigos são descartados primeiro.
+    """
+
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS):
+        self.max_chars = max_chars
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0
+        self.checksum = None
+
+    def record(self, old: str, new: str) -> bool:
+        delta = Delta.between(old, new)
+        if delta is None:
+            return False
+
+        self._clear_redo()
+        last = self.undo_stack[-1] if self.undo_stack else None
+        if last is not None and last.merge(delta):
+            self.size += delta.size
+        else:
+            self.undo_stack.append(delta)
+            self.size += delta.size
+        self._evict()
+        return True
+
+    def undo(self):
+        """Retorna a diferença a aplicar no texto para desfazer o último passo"""
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self.redo_stack.append(delta)
+        return delta.inverse()
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        self.undo_stack.append(delta)
+        return delta
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def mark(self, text: str):
+        """Guarda a identificação do texto em que o histórico parou"""
+        self.checksum = text_checksum(text)
+
+    def matches(self, text: str) -> bool:
+        return self.checksum is not None and self.checksum == text_checksum(text)
+
+    def _clear_redo(self):
+        for delta in self.redo_stack:
+            self.size -= delta.size
+        self.redo_stack.clear()
+
+    def _evict(self):
+        while self.size > self.max_chars and self.undo_stack:
+            self.size -= self.undo_stack.popleft().size